@@ -39,7 +39,7 @@ def get_branches():
     """
     
     try:
-        query = text("SELECT Branch_Name FROM Shopping_Mall;")
+        query = text("SELECT Branch_Name FROM Shopping_Mall /* explain-gate: full-scan-ok */;")
         results = db.session.execute(query).fetchall()
 
         branches = [row[0] for row in results]
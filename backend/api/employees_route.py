@@ -2,9 +2,51 @@ from flask import Blueprint, jsonify, request, make_response, json
 from models.models import db
 from sqlalchemy import text
 
+from api.pagination import decode_cursor, paginate, parse_limit
+from api.params import parse_bool, parse_clock, parse_date_range
+from services.employee_index import SLOT_MINUTES, get_duty_roster, get_employee_directory
+from services.staff_coverage import branch_coverage, sales_overlay, slot_labels
+
+# 在職判斷：一般班別 Start <= t <= End；跨夜班 (Start > End) 為 t >= Start 或 t <= End。
+# 以 Shift_Start_Min 是否 <= t 拆成兩段互斥的範圍查詢，兩段都走 (Store_Name, Shift_Start_Min, Shift_End_Min) 索引。
+SHOP_ON_DUTY_SQL = text("""
+    SELECT Name, Contact, Position
+    FROM Shop_Employee
+    WHERE Store_Name = :shop_name
+      AND Shift_Start_Min <= :minute
+      AND (Shift_End_Min >= :minute OR Shift_End_Min < Shift_Start_Min)
+
+    UNION ALL
+
+    SELECT Name, Contact, Position
+    FROM Shop_Employee
+    WHERE Store_Name = :shop_name
+      AND Shift_Start_Min > :minute
+      AND Shift_End_Min >= :minute
+      AND Shift_End_Min < Shift_Start_Min;
+""")
 
 employees_bp = Blueprint('employees', __name__)
 
+
+def directory_page(args, position=None):
+    """依 query string 的 branch / name / limit / cursor 查詢員工名錄，回傳 (本頁員工, next_cursor)"""
+    limit = parse_limit(args)
+    cursor = args.get('cursor')
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, 3)
+        if not all(isinstance(value, str) for value in after):
+            raise ValueError("Invalid cursor")
+    employees = get_employee_directory().search(
+        position=position,
+        branch=args.get('branch') or None,
+        name_prefix=args.get('name') or None,
+        after=after,
+        limit=limit + 1
+    )
+    return paginate(employees, limit, lambda employee: list(employee.sort_key()))
+
 @employees_bp.route('/employees/shop', methods=['GET'])
 def get_shop_employees():
     """
@@ -91,7 +133,8 @@ def get_employees_by_time():
     - shop_name：店鋪名稱
     - time：查詢的時間（建議格式 HH:MM）
 
-    系統會從 Shop_Employee 表取得該店鋪下所有員工的排班資訊，並判斷指定時間點是否落在員工的班表區間。如果員工當前正在上班，便將其資訊（姓名、聯絡方式、職位等）返回。
+    系統以 Shop_Employee 中由排班時段解析出的上下班分鐘數（Shift_Start_Min / Shift_End_Min）做索引範圍查詢，
+    只讀出指定時間點正在上班的員工並返回其資訊（姓名、聯絡方式、職位等）。跨夜班（例如 22:00-06:00）同樣支援。
     例如: 23區_台北忠孝館 + 13:30
     ---
     tags:
@@ -138,49 +181,28 @@ def get_employees_by_time():
 
     try:
         shop_name = request.args.get('shop_name')
-        query_time = request.args.get('time')  # 假設格式為 HH:MM，例如 '14:30'
+        query_time = request.args.get('time')
         if not shop_name or not query_time:
             return jsonify({"error": "Shop name and time are required"}), 400
 
-        # 查詢該店鋪下的所有員工
-        query = text("""
-            SELECT Name, Contact, Position, Shift_Time
-            FROM Shop_Employee
-            WHERE Store_Name = :shop_name;
-        """)
-        results = db.session.execute(query, {"shop_name": shop_name}).fetchall()
-
-        # 將 query_time（HH:MM）轉為以分鐘計算，方便比對
-        def time_to_minutes(t):
-            h, m = t.split(":")
-            return int(h)*60 + int(m)
+        # 上下班分鐘數已由資料庫在寫入時解析，這裡只讀出在職的員工（含跨夜班，例如 22:00-06:00）
+        results = db.session.execute(SHOP_ON_DUTY_SQL, {
+            "shop_name": shop_name,
+            "minute": parse_clock(query_time, 'time')
+        }).fetchall()
 
-        query_minutes = time_to_minutes(query_time)
-        
-        working_employees = []
-        for row in results:
-            name, contact, position, shift_str = row
-            # 假設 shift_str 格式為 'HH:MM-HH:MM'
-            # 例如 '9:00-16:30'
-            if shift_str and '-' in shift_str:
-                start_str, end_str = shift_str.split('-')
-                start_minutes = time_to_minutes(start_str)
-                end_minutes = time_to_minutes(end_str)
-                
-                # 簡化判斷：query_minutes 介於 start_minutes 與 end_minutes 之間
-                # 若跨天班表（例如 22:00-06:00）則需更複雜處理，這裡僅示範一般情況。
-                if start_minutes <= query_minutes <= end_minutes:
-                    working_employees.append({
-                        "name": name,
-                        "contact": contact,
-                        "position": position
-                    })
+        working_employees = [
+            {"name": name, "contact": contact, "position": position}
+            for name, contact, position in results
+        ]
 
         json_str = json.dumps(working_employees, ensure_ascii=False)
         response = make_response(json_str, 200)
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
         return response
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
@@ -278,38 +300,282 @@ def get_branch_employees():
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
 
+@employees_bp.route('/employees/branch/on-duty', methods=['GET'])
+def get_branch_on_duty():
+    """
+    取得分店在指定時間正在上班的所有員工（商場員工與所有商店員工）
+
+    由各 worker 記憶體中的分店在職索引回答：一天切成 15 分鐘時段，每個時段以 bitset 記錄在班員工，
+    查詢不需存取資料庫。員工排班、商店或分店異動後約 CACHE_VERSION_CHECK_SECONDS 秒內自動重建索引。
+    例如: 台北忠孝館 + 22:15
+    ---
+    tags:
+      - Employees API
+    summary: "查詢分店目前在班的所有員工"
+    description: "回傳指定分店於指定時間（HH:MM）在班的商場員工與各商店員工，跨夜班同樣支援。"
+    parameters:
+      - name: branch
+        in: query
+        type: string
+        required: true
+        description: 分店名稱
+      - name: time
+        in: query
+        type: string
+        required: true
+        description: 查詢的時間（格式 HH:MM）
+    responses:
+      200:
+        description: 成功返回在班員工列表（商場員工在前，其次依商店排序；可能為空陣列）
+        examples:
+          application/json:
+            [
+              {
+                "name": "陳智偉",
+                "contact": "0966-466166",
+                "position": "店長",
+                "working_hours": "11:00-21:30",
+                "source": "mall",
+                "location": "台北忠孝館"
+              },
+              {
+                "name": "陳家琪",
+                "contact": "0932-425789",
+                "position": "店長",
+                "working_hours": "11:00-21:30",
+                "source": "shop",
+                "location": "23區_台北忠孝館"
+              }
+            ]
+      400:
+        description: 缺少參數或請求無效
+        examples:
+          application/json:
+            {"error": "Branch name and time are required"}
+      404:
+        description: 找不到員工資料
+        examples:
+          application/json:
+            {"error": "No employee data found for branch: 台北忠孝館"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        branch = request.args.get('branch')
+        query_time = request.args.get('time')
+        if not branch or not query_time:
+            return jsonify({"error": "Branch name and time are required"}), 400
+
+        minute = parse_clock(query_time, 'time')
+        roster = get_duty_roster().get(branch)
+        if roster is None:
+            return jsonify({"error": f"No employee data found for branch: {branch}"}), 404
+
+        employees = [
+            {
+                "name": employee.name,
+                "contact": employee.contact,
+                "position": employee.position,
+                "working_hours": employee.shift_time,
+                "source": employee.source,
+                "location": employee.location
+            }
+            for employee in roster.on_duty(minute)
+        ]
+
+        json_str = json.dumps(employees, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@employees_bp.route('/employees/coverage', methods=['GET'])
+def get_staff_coverage():
+    """
+    分店人力覆蓋熱圖
+
+    回傳分店整體與商場、各商店依職位區分的每 15 分鐘在班人數（以各時段開始的時間點計算，跨夜班同樣支援）。
+    人數由各 worker 記憶體中的員工排班以 NumPy 差分陣列與 cumsum 計算。
+    sales=true 時另依 from / to 期間的交易資料附上各小時的平均交易筆數、營業額與每位在班人員分攤的交易筆數，
+    用來找出人力不足的尖峰時段。
+    例如: 台北忠孝館
+    ---
+    tags:
+      - Employees API
+    summary: "分店人力覆蓋熱圖"
+    description: "依職位回傳分店與各商店每 15 分鐘的在班人數，可疊加各小時的交易量。"
+    parameters:
+      - name: branch
+        in: query
+        type: string
+        required: true
+        description: 分店名稱
+      - name: sales
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: 是否疊加各小時交易量
+      - name: from
+        in: query
+        type: string
+        required: false
+        description: 交易量統計起日 (YYYY-MM-DD)，sales=true 時必填
+      - name: to
+        in: query
+        type: string
+        required: false
+        description: 交易量統計迄日 (YYYY-MM-DD，含當天)，sales=true 時必填
+    responses:
+      200:
+        description: 成功返回人力覆蓋資料（人數陣列與 slots 一一對應）
+        examples:
+          application/json:
+            {
+              "branch": "台北忠孝館",
+              "slot_minutes": 15,
+              "slots": ["00:00", "00:15", "..."],
+              "branch_total": {"positions": {"店長": [0, 0, "..."]}, "total": [0, 0, "..."]},
+              "locations": [
+                {"location": "台北忠孝館", "source": "mall", "positions": {"店長": [0, 0, "..."]}, "total": [0, 0, "..."]},
+                {"location": "23區_台北忠孝館", "source": "shop", "positions": {"店長": [0, 0, "..."]}, "total": [0, 0, "..."]}
+              ],
+              "sales": {
+                "from": "2024-06-01",
+                "to": "2024-06-30",
+                "days": 30,
+                "hourly": [
+                  {"hour": "14:00", "avg_txn_count": 182.5, "avg_revenue": 251320.0, "avg_staff": 41.0, "txn_per_staff": 4.45}
+                ]
+              }
+            }
+      400:
+        description: 缺少參數或請求無效
+        examples:
+          application/json:
+            {"error": "Branch name is required"}
+      404:
+        description: 找不到員工資料
+        examples:
+          application/json:
+            {"error": "No employee data found for branch: 台北忠孝館"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        branch = request.args.get('branch')
+        if not branch:
+            return jsonify({"error": "Branch name is required"}), 400
+        with_sales = parse_bool(request.args.get('sales'), 'sales')
+        if with_sales:
+            date_start, date_end = parse_date_range(request.args)
+
+        roster = get_duty_roster().get(branch)
+        if roster is None:
+            return jsonify({"error": f"No employee data found for branch: {branch}"}), 404
+
+        branch_total, locations = branch_coverage(branch, roster.employees)
+        data = {
+            "branch": branch,
+            "slot_minutes": SLOT_MINUTES,
+            "slots": slot_labels(),
+            "branch_total": branch_total,
+            "locations": locations
+        }
+        if with_sales:
+            data["sales"] = {
+                "from": request.args.get('from'),
+                "to": request.args.get('to'),
+                **sales_overlay(branch, date_start, date_end, branch_total["total"])
+            }
+
+        json_str = json.dumps(data, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
 @employees_bp.route('/employees/position', methods=['GET'])
 def get_position_employees():
     """
     取得指定職位的員工資料
     
-    從 Mall_Employee 與 Shop_Employee 資料表查詢指定職位 (Position) 的所有員工，並將兩者合併後返回 JSON 清單。
-    為了區分不同來源（分店員工或店舖員工），可在回傳結構中加入來源欄位（如 source），或依需求整併顯示。
+    從 Mall_Employee 與 Shop_Employee 合併的員工名錄查詢指定職位 (Position) 的所有員工，並返回 JSON 清單。
+    名錄保存在各 worker 記憶體中並依姓名排序，可再以 branch（商店員工依所屬分店）與姓名前綴 name 篩選；
+    結果以 cursor 分頁，每頁最多 limit 筆，以回應中的 next_cursor 取得下一頁。
     例如 : "正職人員"
     ---
     tags:
       - Employees API
     summary: "取得指定職位的員工資料"
-    description: "透過 query string 接收參數 position，從 Mall_Employee 與 Shop_Employee 各自找出符合該職位的員工，並返回統一格式的 JSON 資料。"
+    description: "透過 query string 接收參數 position，從商場員工與店舖員工合併的名錄找出符合該職位的員工，並返回統一格式的 JSON 資料。"
     parameters:
       - name: position
         in: query
         type: string
         required: true
         description: 職位名稱
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: 分店名稱（包含該分店各商店的員工）
+      - name: name
+        in: query
+        type: string
+        required: false
+        description: 姓名開頭
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+        description: "每頁筆數（1 ~ 1000）"
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: "上一頁回應中的 next_cursor"
     responses:
       200:
         description: 成功返回指定職位的員工資料列表
         examples:
           application/json:
-            [
-              {
-                "name": "陳家琪",
-                "contact": "0932-425789",
-                "work_time": "11:00-21:30",
-                "location": "台北忠孝館"
-              }
-            ]
+            {
+              "items": [
+                {
+                  "name": "陳家琪",
+                  "contact": "0932-425789",
+                  "work_time": "11:00-21:30",
+                  "location": "台北忠孝館"
+                }
+              ],
+              "next_cursor": null
+            }
       400:
         description: 缺少參數或請求無效
         examples:
@@ -335,37 +601,133 @@ def get_position_employees():
         if not position:
             return jsonify({"error": "Position is required"}), 400
 
-        # UNION Mall_Employee 與 Shop_Employee 兩個資料表
-        query = text("""
-            SELECT Name, Contact, Position, Shift_Time, Branch_Name AS location, 'mall' AS source
-            FROM Mall_Employee
-            WHERE Position = :pos
-
-            UNION ALL
-
-            SELECT Name, Contact, Position, Shift_Time, Store_Name AS location, 'shop' AS source
-            FROM Shop_Employee
-            WHERE Position = :pos;
-        """)
-        results = db.session.execute(query, {"pos": position}).fetchall()
-
-        if not results:
+        page, next_cursor = directory_page(request.args, position=position)
+        if not page and not request.args.get('cursor'):
             return jsonify({"error": f"No employee data found for position: {position}"}), 404
 
         employees = []
-        for row in results:
-            name, contact, pos, shift_time, location, source = row
+        for employee in page:
             employees.append({
-                "name": name,
-                "contact": contact,
-                "work_time": shift_time,
-                "location": location
+                "name": employee.name,
+                "contact": employee.contact,
+                "work_time": employee.shift_time,
+                "location": employee.location
             })
 
-        json_str = json.dumps(employees, ensure_ascii=False)
+        data = {
+            "items": employees,
+            "next_cursor": next_cursor
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@employees_bp.route('/employees/directory', methods=['GET'])
+def get_employee_directory_page():
+    """
+    查詢員工名錄
+
+    商場員工與各商店員工合併的名錄，依姓名排序，可用職位、分店（商店員工依所屬分店）與姓名前綴篩選，
+    以 cursor 分頁。名錄保存在各 worker 記憶體中，員工、商店或分店異動後約 CACHE_VERSION_CHECK_SECONDS 秒內自動重建。
+    ---
+    tags:
+      - Employees API
+    summary: "查詢員工名錄"
+    description: "依職位、分店與姓名前綴查詢商場與店舖員工，結果分頁返回。"
+    parameters:
+      - name: position
+        in: query
+        type: string
+        required: false
+        description: 職位名稱
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: 分店名稱（包含該分店各商店的員工）
+      - name: name
+        in: query
+        type: string
+        required: false
+        description: 姓名開頭
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+        description: "每頁筆數（1 ~ 1000）"
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: "上一頁回應中的 next_cursor"
+    responses:
+      200:
+        description: 成功返回員工列表（可能為空陣列）
+        examples:
+          application/json:
+            {
+              "items": [
+                {
+                  "name": "陳家琪",
+                  "contact": "0932-425789",
+                  "position": "店長",
+                  "working_hours": "11:00-21:30",
+                  "source": "shop",
+                  "location": "23區_台北忠孝館",
+                  "branch_name": "台北忠孝館"
+                }
+              ],
+              "next_cursor": "WyLpmbPlrrbnkKoiLCJzaG9wIiwiMjPljYBf5Y-w5YyX5b-g5a2d6aSoIl0"
+            }
+      400:
+        description: 參數格式錯誤
+        examples:
+          application/json:
+            {"error": "Invalid cursor"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        page, next_cursor = directory_page(request.args, position=request.args.get('position') or None)
+
+        data = {
+            "items": [
+                {
+                    "name": employee.name,
+                    "contact": employee.contact,
+                    "position": employee.position,
+                    "working_hours": employee.shift_time,
+                    "source": employee.source,
+                    "location": employee.location,
+                    "branch_name": employee.branch_name
+                }
+                for employee in page
+            ],
+            "next_cursor": next_cursor
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
         response = make_response(json_str, 200)
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
         return response
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
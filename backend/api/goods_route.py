@@ -1,15 +1,58 @@
 from flask import Blueprint, jsonify, request, make_response, json
-from models.models import db
-from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from api.pagination import parse_limit
+from api.params import parse_bool
+from services.goods_catalog import shop_goods, shops_goods
+from services.goods_search import get_goods_search_index
+from services.reorder import reorder_report
+from services.stock import GoodsNotFound, InsufficientStock, decrement_stock, replenish_stock
 
 goods_bp = Blueprint('goods', __name__)
 
+# 批次查詢一次最多的商店數
+MAX_BATCH_SHOPS = 50
+# 一次扣庫存 / 入庫最多的品項數
+MAX_STOCK_ITEMS = 200
+# 單一品項一次扣庫存 / 入庫的最大數量；同一商品重複 MAX_STOCK_ITEMS 次合計仍在 INT 範圍內
+MAX_STOCK_QUANTITY = 1000000
+
+
+def parse_stock_request(payload):
+    """驗證扣庫存 / 入庫的請求內容，回傳 (store_name, [(goods_name, quantity), ...])；格式錯誤時拋出 ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    store_name = payload.get('store_name')
+    if not store_name or not isinstance(store_name, str):
+        raise ValueError("store_name is required")
+    items = payload.get('items')
+    if not isinstance(items, list) or not items:
+        raise ValueError("items must be a non-empty list")
+    if len(items) > MAX_STOCK_ITEMS:
+        raise ValueError(f"At most {MAX_STOCK_ITEMS} items per request")
+
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"Invalid item at index {index}: must be a JSON object")
+        goods_name = item.get('goods_name')
+        quantity = item.get('quantity')
+        if not goods_name or not isinstance(goods_name, str):
+            raise ValueError(f"Invalid item at index {index}: goods_name is required")
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+            raise ValueError(f"Invalid item at index {index}: quantity must be a positive integer")
+        if quantity > MAX_STOCK_QUANTITY:
+            raise ValueError(f"Invalid item at index {index}: quantity must not exceed {MAX_STOCK_QUANTITY}")
+        parsed.append((goods_name, quantity))
+    return store_name, parsed
+
 @goods_bp.route('/goods/shop', methods=['GET'])
 def get_shop_goods():
     """
     取得指定店鋪的商品列表
     
-    從 Goods 與 g_Name 資料表中查詢特定店鋪 (Store_Name) 的所有商品資訊，包括名稱、價格、庫存數量等，並以 JSON 清單形式回傳。
+    從 Goods 資料表中查詢特定店鋪 (Store_Name) 的所有商品資訊，包括名稱、價格、庫存數量等，並以 JSON 清單形式回傳。
+    庫存以主鍵範圍即時讀取，價格取自各 worker 記憶體中的價格表（價格異動時自動重新載入）。
     例如: 23區_台北忠孝館
     ---
     tags:
@@ -24,7 +67,7 @@ def get_shop_goods():
         description: 店鋪名稱
     responses:
       200:
-        description: 成功返回指定店鋪的商品列表
+        description: 成功返回指定店鋪的商品列表（依商品名稱排序）
         examples:
           application/json:
             [
@@ -51,22 +94,7 @@ def get_shop_goods():
         if not shop_name:
             return jsonify({"error": "Shop name is required"}), 400
 
-        # 查詢指定店鋪的商品資訊
-        query = text("""
-            SELECT Name AS goods_name, Price AS price, Stock_Quantity AS stock
-            FROM Goods
-            WHERE Store_Name = :shop_name;
-        """)
-        results = db.session.execute(query, {"shop_name": shop_name}).fetchall()
-
-        goods_list = []
-        for row in results:
-            goods_list.append({
-                "name": row[0],
-                "price": float(row[1]),
-                "stock": row[2],
-                "price": row[1]  # 確保價格欄位正確返回
-            })
+        goods_list = shop_goods(shop_name)
 
         # JSON 序列化，確保中文正常顯示
         json_str = json.dumps(goods_list, ensure_ascii=False)
@@ -76,4 +104,370 @@ def get_shop_goods():
         return response
 
     except Exception as e:
-        return jsonify({"error": "Internal server error", "details": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@goods_bp.route('/goods/shops', methods=['GET'])
+def get_shops_goods():
+    """
+    一次取得多家店鋪的商品列表
+    ---
+    tags:
+      - Goods API
+    summary: "批次取得多家店鋪的商品列表"
+    description: "shop_name 可重複多次（最多 50 家），回傳以店鋪名稱為鍵的商品列表；所有店鋪共用同一份價格表，不存在的店鋪為空列表。"
+    parameters:
+      - name: shop_name
+        in: query
+        type: array
+        items:
+          type: string
+        collectionFormat: multi
+        required: true
+        description: 店鋪名稱，可重複
+    responses:
+      200:
+        description: 成功返回各店鋪的商品列表
+        examples:
+          application/json:
+            {
+              "shops": {
+                "23區_台北忠孝館": [{"name": "商品1", "price": 100, "stock": 50}],
+                "台隆手創館_廣三門市": [{"name": "商品2", "price": 200, "stock": 30}]
+              }
+            }
+      400:
+        description: 未提供店鋪名稱或超過上限
+      500:
+        description: 內部伺服器錯誤
+    """
+    try:
+        # 去除重複並保留傳入順序
+        shop_names = list(dict.fromkeys(name for name in request.args.getlist('shop_name') if name))
+        if not shop_names:
+            raise ValueError("At least one shop_name is required")
+        if len(shop_names) > MAX_BATCH_SHOPS:
+            raise ValueError(f"At most {MAX_BATCH_SHOPS} shops per request")
+
+        json_str = json.dumps({"shops": shops_goods(shop_names)}, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@goods_bp.route('/goods/search', methods=['GET'])
+def search_goods():
+    """
+    跨店鋪搜尋商品名稱
+    ---
+    tags:
+      - Goods API
+    summary: "依商品名稱搜尋販售的店鋪"
+    description: "以記憶體中的字元 n-gram 倒排索引比對所有店鋪的商品名稱（子字串、不分大小寫與全半形），回傳庫存與店鋪位置。完全相符者在前，其次為開頭相符。"
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: 商品名稱關鍵字
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: 只搜尋此分店的店鋪
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: 最多回傳筆數，預設 100，上限 1000
+    responses:
+      200:
+        description: 成功返回符合的商品；total 為符合的總筆數
+        examples:
+          application/json:
+            {
+              "query": "腮紅",
+              "total": 1,
+              "items": [
+                {
+                  "name": "巧麗腮紅組 Powder Cheeks",
+                  "store_name": "台隆手創館_廣三門市",
+                  "branch_name": "廣三SOGO",
+                  "floor_location": "7F",
+                  "stock": 8,
+                  "price": 295
+                }
+              ]
+            }
+      400:
+        description: 缺少關鍵字或參數格式錯誤
+      500:
+        description: 內部伺服器錯誤
+    """
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            raise ValueError("q is required")
+        limit = parse_limit(request.args)
+
+        index = get_goods_search_index()
+        total, entries = index.search(query, branch=request.args.get('branch') or None, limit=limit)
+        items = []
+        for entry in entries:
+            branch_name, floor_location = index.shops.get(entry.store_name, (None, None))
+            items.append({
+                "name": entry.name,
+                "store_name": entry.store_name,
+                "branch_name": branch_name,
+                "floor_location": floor_location,
+                "stock": entry.stock,
+                "price": entry.price
+            })
+
+        json_str = json.dumps({"query": query, "total": total, "items": items}, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@goods_bp.route('/goods/stock/decrement', methods=['POST'])
+def decrement_goods_stock():
+    """
+    扣除庫存（結帳）
+
+    購物籃中所有品項在同一個交易中以條件式 UPDATE 扣除，任一品項庫存不足時整筆回滾並返回 409。
+    ---
+    tags:
+      - Goods API
+    summary: "扣除商品庫存"
+    description: "每個品項以單一 UPDATE ... WHERE Stock_Quantity >= 數量 扣除，並行結帳不會超賣；同一商品的多筆會先合併。"
+    consumes:
+      - application/json
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [store_name, items]
+          properties:
+            store_name:
+              type: string
+              example: "台隆手創館_廣三門市"
+            items:
+              type: array
+              items:
+                type: object
+                required: [goods_name, quantity]
+                properties:
+                  goods_name:
+                    type: string
+                    example: "巧麗腮紅組 Powder Cheeks"
+                  quantity:
+                    type: integer
+                    minimum: 1
+                    maximum: 1000000
+                    example: 1
+    responses:
+      200:
+        description: 已扣除並提交
+        examples:
+          application/json: {"store_name": "台隆手創館_廣三門市", "items": 1}
+      400:
+        description: 請求格式錯誤
+      404:
+        description: 商店中沒有此商品
+      409:
+        description: 庫存不足，整筆未扣除
+        examples:
+          application/json:
+            {
+              "error": "Insufficient stock",
+              "goods_name": "巧麗腮紅組 Powder Cheeks",
+              "requested": 10,
+              "available": 8
+            }
+      500:
+        description: 內部伺服器錯誤
+    """
+    try:
+        store_name, items = parse_stock_request(request.get_json(silent=True))
+        count = decrement_stock(store_name, items)
+        return jsonify({"store_name": store_name, "items": count}), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except GoodsNotFound as e:
+        return jsonify({"error": "Goods not found", "goods_name": e.goods_name}), 404
+    except InsufficientStock as e:
+        return jsonify({
+            "error": "Insufficient stock",
+            "goods_name": e.goods_name,
+            "requested": e.requested,
+            "available": e.available
+        }), 409
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@goods_bp.route('/goods/stock/replenish', methods=['POST'])
+def replenish_goods_stock():
+    """
+    進貨入庫
+
+    增加各品項庫存並各寫入一筆 Purchase_Detail 進貨紀錄（時間為收到請求的時間），全部在同一個交易中完成。
+    ---
+    tags:
+      - Goods API
+    summary: "進貨入庫"
+    description: "以 UPDATE ... SET Stock_Quantity = Stock_Quantity + 數量 增加庫存，不需先讀取目前庫存。"
+    consumes:
+      - application/json
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [store_name, supplier, items]
+          properties:
+            store_name:
+              type: string
+              example: "台隆手創館_廣三門市"
+            supplier:
+              type: string
+              example: "台隆工業股份有限公司"
+            items:
+              type: array
+              items:
+                type: object
+                required: [goods_name, quantity]
+                properties:
+                  goods_name:
+                    type: string
+                    example: "巧麗腮紅組 Powder Cheeks"
+                  quantity:
+                    type: integer
+                    minimum: 1
+                    maximum: 1000000
+                    example: 24
+    responses:
+      201:
+        description: 已入庫並寫入進貨紀錄
+        examples:
+          application/json: {"store_name": "台隆手創館_廣三門市", "items": 1}
+      400:
+        description: 請求格式錯誤
+      404:
+        description: 商店中沒有此商品
+      409:
+        description: 資料庫拒絕寫入（例如供應商不存在）
+      500:
+        description: 內部伺服器錯誤
+    """
+    try:
+        payload = request.get_json(silent=True)
+        store_name, items = parse_stock_request(payload)
+        supplier = payload.get('supplier')
+        if not supplier or not isinstance(supplier, str):
+            raise ValueError("supplier is required")
+        count = replenish_stock(store_name, supplier, items)
+        return jsonify({"store_name": store_name, "items": count}), 201
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except GoodsNotFound as e:
+        return jsonify({"error": "Goods not found", "goods_name": e.goods_name}), 404
+    except IntegrityError as e:
+        return jsonify({"error": "Purchase rejected by database", "details": str(e.orig)}), 409
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@goods_bp.route('/goods/reorder', methods=['GET'])
+def get_reorder_report():
+    """
+    補貨建議與低庫存報表
+
+    由觀察期間（REORDER_HISTORY_DAYS 天）的進貨紀錄估計各商品每日消耗量與平均補貨間隔，
+    標記依目前消耗速度撐不到下一次照慣例補貨的商品。進貨彙總在新增進貨前會被快取，目前庫存每次即時讀取。
+    ---
+    tags:
+      - Goods API
+    summary: "補貨建議與低庫存報表"
+    description: "store 與 branch 擇一指定。預設只回傳有缺貨風險的商品（依可支撐天數排序），all=true 時回傳所有有進貨紀錄的商品。"
+    parameters:
+      - name: store
+        in: query
+        type: string
+        required: false
+        description: 店鋪名稱
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: 分店名稱
+      - name: all
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: 是否包含沒有缺貨風險的商品
+    responses:
+      200:
+        description: 成功返回補貨建議
+        examples:
+          application/json:
+            {
+              "as_of": "2024-06-01 10:00:00",
+              "history_days": 180,
+              "at_risk": 1,
+              "items": [
+                {
+                  "store_name": "台隆手創館_廣三門市",
+                  "goods_name": "巧麗腮紅組 Powder Cheeks",
+                  "stock": 8,
+                  "deliveries": 5,
+                  "daily_consumption": 1.25,
+                  "restock_interval_days": 20.0,
+                  "days_of_cover": 6.4,
+                  "days_until_restock": 9.5,
+                  "reorder_point": 25.0,
+                  "suggested_quantity": 17,
+                  "at_risk": true
+                }
+              ]
+            }
+      400:
+        description: 未指定或同時指定 store 與 branch
+      500:
+        description: 內部伺服器錯誤
+    """
+    try:
+        store = request.args.get('store')
+        branch = request.args.get('branch')
+        if bool(store) == bool(branch):
+            raise ValueError("Exactly one of store or branch is required")
+        include_all = parse_bool(request.args.get('all'), 'all')
+
+        report = reorder_report('store' if store else 'branch', store or branch, include_all=include_all)
+
+        json_str = json.dumps(report, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
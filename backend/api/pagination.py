@@ -0,0 +1,51 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_limit(args):
+    """讀取 query string 的 limit，未提供時使用預設值，並限制在 1 ~ MAX_PAGE_SIZE 之間"""
+    raw = args.get('limit')
+    if raw is None or raw == '':
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def encode_cursor(values):
+    """將排序鍵（最後一筆資料的值）編碼成不透明的 cursor 字串"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """解碼 cursor，還原成長度為 size 的排序鍵清單；格式錯誤時拋出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def paginate(rows, limit, key):
+    """
+    以「多查一筆」的方式切出本頁資料
+
+    查詢時 LIMIT 設為 limit + 1，若多出的那筆存在代表還有下一頁，
+    下一頁的 cursor 由本頁最後一筆的排序鍵 key(row) 產生。
+    """
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(key(page[-1]))
+    return page, next_cursor
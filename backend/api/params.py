@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+
+def parse_date(value, field):
+    """將 YYYY-MM-DD 字串轉為 date，格式錯誤時拋出 ValueError"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field}: expected YYYY-MM-DD")
+
+
+def parse_datetime(value, field):
+    """
+    將 YYYY-MM-DD、YYYY-MM-DD HH:MM[:SS] 或以 T 分隔的同格式字串轉為 datetime
+
+    回傳 (datetime, has_time)，has_time 為 False 代表只給了日期（時間為 00:00:00），呼叫端可據此決定是否視為整天。
+    """
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field}: expected YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS]")
+    return parsed, len(str(value).strip()) > 10
+
+
+def parse_clock(value, field):
+    """將 HH:MM 轉為自 00:00 起算的分鐘數（0 ~ 1439）"""
+    try:
+        hours, minutes = str(value).strip().split(':')
+        hours, minutes = int(hours), int(minutes)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field}: expected HH:MM")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid {field}: expected HH:MM")
+    return hours * 60 + minutes
+
+
+def parse_bool(value, field, default=False):
+    """將 true / false / 1 / 0（不分大小寫）轉為 bool；未提供時回傳 default"""
+    if value is None or value == '':
+        return default
+    lowered = str(value).strip().lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"Invalid {field}: expected true or false")
+
+
+def parse_date_range(args, required=True):
+    """
+    從 query string 讀取 from / to（皆為 YYYY-MM-DD，含首尾兩天）
+
+    回傳半開區間 (date_from, date_to)，date_to 為 to 的隔天，
+    方便直接組成 `Time >= :date_start AND Time < :date_end` 這類可用索引的條件。
+    兩者皆未提供且 required=False 時回傳 (None, None)。
+    """
+
+    raw_from = args.get('from')
+    raw_to = args.get('to')
+    if not raw_from and not raw_to and not required:
+        return None, None
+    if not raw_from or not raw_to:
+        raise ValueError("Both from and to are required (YYYY-MM-DD)")
+
+    date_from = parse_date(raw_from, 'from')
+    date_to = parse_date(raw_to, 'to') + timedelta(days=1)
+    if date_to <= date_from:
+        raise ValueError("from must not be later than to")
+    return date_from, date_to
@@ -1,9 +1,37 @@
+from datetime import datetime, time
+
 from flask import Blueprint, jsonify, request, make_response, json
 from models.models import db
 from sqlalchemy import text
 
+from api.params import parse_bool, parse_date, parse_datetime
+from services.promotion_effectiveness import get_effectiveness
+from services.promotion_index import find_conflicts, get_promotion_index
+
 promotions_bp = Blueprint('promotions', __name__)
 
+
+def campaign_json(campaign):
+    return {
+        "store_name": campaign.store_name,
+        "branch_name": campaign.branch_name,
+        "promotion_name": campaign.name,
+        "start_time": str(campaign.start),
+        "end_time": str(campaign.end),
+        "method": campaign.method
+    }
+
+
+def conflict_json(first, second):
+    return {
+        "store_name": first.store_name,
+        "branch_name": first.branch_name,
+        "overlap_start": str(max(first.start, second.start)),
+        "overlap_end": str(min(first.end, second.end)),
+        "campaigns": [campaign_json(first), campaign_json(second)]
+    }
+
+
 @promotions_bp.route('/promotions/shop', methods=['GET'])
 def get_shop_promotions():
     """
@@ -111,6 +139,7 @@ def get_promotions_by_method():
             [
               {
                 "store_name": "商店1",
+                "branch_name": "台北忠孝館",
                 "promotion_name": "夏日促銷",
                 "start_time": "2024-06-01 10:00:00",
                 "end_time": "2024-06-10 18:00:00"
@@ -176,6 +205,7 @@ def get_promotions_by_date():
     查詢特定日期正在進行的促銷活動
 
     透過 query string 接收參數 date（格式 YYYY-MM-DD），判斷該日期是否落在活動的 Start_Time 與 End_Time 區間內，並返回符合條件的促銷列表。
+    查詢由各 worker 記憶體中的促銷活動區間索引回答，活動資料異動後約 CACHE_VERSION_CHECK_SECONDS 秒內生效。
     例如: 2024-06-01
     ---
     tags:
@@ -196,6 +226,7 @@ def get_promotions_by_date():
             [
               {
                 "store_name": "商店1",
+                "branch_name": "台北忠孝館",
                 "promotion_name": "夏日促銷",
                 "start_time": "2024-06-01 10:00:00",
                 "end_time": "2024-06-10 18:00:00",
@@ -227,39 +258,409 @@ def get_promotions_by_date():
         if not input_date:
             return jsonify({"error": "Date is required"}), 400
         
-        # 由於 Promotional_Campaign 表中 Start_Time / End_Time 為 DATETIME
-        # 需要比較 input_date 是否落在 Start_Time 與 End_Time 之間
-        # 一般作法：Start_Time <= input_date的結束時刻 (23:59:59)，End_Time >= input_date的開始時刻 (00:00:00)
-        # SQL 可使用 between 或邏輯判斷
-        date_start = f"{input_date} 00:00:00"
-        date_end = f"{input_date} 23:59:59"
-
-        # 查詢指定日期的促銷活動
-        query = text("""
-            SELECT Store_Name, Name, Start_Time, End_Time, Method
-            FROM Promotional_Campaign
-            WHERE Start_Time <= :date_end
-              AND End_Time >= :date_start;
-        """)
-        results = db.session.execute(query, {"date_start": date_start, "date_end": date_end}).fetchall()
+        # 活動區間 [Start_Time, End_Time] 與當天 00:00:00 ~ 23:59:59 有交集即列出，由記憶體中的區間索引查詢
+        date_value = parse_date(input_date, 'date')
+        results = get_promotion_index().overlapping(
+            datetime.combine(date_value, time.min),
+            datetime.combine(date_value, time(23, 59, 59))
+        )
 
         if not results:
             return jsonify({"error": f"No promotions found for date: {input_date}"}), 404
 
-        promotions = []
-        for row in results:
-            promotions.append({
-                "store_name": row[0],
-                "promotion_name": row[1],
-                "start_time": str(row[2]),
-                "end_time": str(row[3]),
-                "method": row[4]
-            })
+        promotions = [campaign_json(campaign) for campaign in results]
 
         json_str = json.dumps(promotions, ensure_ascii=False)
         response = make_response(json_str, 200)
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
         return response
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": "Internal server error", "details": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@promotions_bp.route('/promotions/active', methods=['GET'])
+def get_active_promotions():
+    """
+    查詢指定時間點或時間區間內進行中的促銷活動
+
+    以 at 查詢該時間點進行中的活動（只給日期時視為整天），或以 from / to 查詢與該區間有交集的活動，
+    可再以 store 或 branch 限定範圍。查詢由各 worker 記憶體中的區間索引回答，成本為 O(log n + k)，
+    Promotional_Campaign 或 Shops 異動後約 CACHE_VERSION_CHECK_SECONDS 秒內自動重建索引。
+    例如: at=2024-06-01 12:30, branch=台北忠孝館
+    ---
+    tags:
+      - Promotions API
+    summary: "查詢進行中的促銷活動"
+    description: "依時間點（可含時分秒）或時間區間，回傳進行中的促銷活動，可限定商店或分店。"
+    parameters:
+      - name: at
+        in: query
+        type: string
+        required: false
+        description: "時間點 (YYYY-MM-DD 或 YYYY-MM-DD HH:MM[:SS])"
+      - name: from
+        in: query
+        type: string
+        required: false
+        description: "區間起點 (YYYY-MM-DD 或 YYYY-MM-DD HH:MM[:SS])，與 at 擇一"
+      - name: to
+        in: query
+        type: string
+        required: false
+        description: "區間終點（含）；只給日期時包含當天整天"
+      - name: store
+        in: query
+        type: string
+        required: false
+        description: "商店名稱"
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: "分店名稱"
+    responses:
+      200:
+        description: 成功返回進行中的促銷活動（依開始時間排序，可能為空陣列）
+        examples:
+          application/json:
+            [
+              {
+                "store_name": "台隆手創館_廣三門市",
+                "branch_name": "廣三門市",
+                "promotion_name": "夏日嘉年華",
+                "start_time": "2024-06-01 10:00:00",
+                "end_time": "2024-06-05 18:00:00",
+                "method": "折扣促銷"
+              }
+            ]
+      400:
+        description: 缺少參數或請求無效
+        examples:
+          application/json:
+            {"error": "Either at or both from and to are required"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        raw_at = request.args.get('at')
+        raw_from = request.args.get('from')
+        raw_to = request.args.get('to')
+        store = request.args.get('store') or None
+        branch = request.args.get('branch') or None
+
+        index = get_promotion_index()
+        if raw_at:
+            at, has_time = parse_datetime(raw_at, 'at')
+            if has_time:
+                results = index.active_at(at, store=store, branch=branch)
+            else:
+                results = index.overlapping(at, datetime.combine(at.date(), time.max), store=store, branch=branch)
+        elif raw_from and raw_to:
+            start, _ = parse_datetime(raw_from, 'from')
+            end, has_time = parse_datetime(raw_to, 'to')
+            if not has_time:
+                end = datetime.combine(end.date(), time.max)
+            if end < start:
+                return jsonify({"error": "from must not be later than to"}), 400
+            results = index.overlapping(start, end, store=store, branch=branch)
+        else:
+            return jsonify({"error": "Either at or both from and to are required"}), 400
+
+        json_str = json.dumps([campaign_json(campaign) for campaign in results], ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@promotions_bp.route('/promotions/effectiveness', methods=['GET'])
+def get_promotion_effectiveness():
+    """
+    促銷活動成效報表
+
+    一次計算所有促銷活動：比較活動期間（包含起訖日）與活動開始前同樣天數（基準期）該商店的營收與交易筆數。
+    由 Store_Daily_Revenue 日彙總以單一查詢算出，已封存月份同樣涵蓋。可用 method 與 branch 篩選。
+    結果快取於各 worker 中，促銷活動、商店或交易資料異動後約 CACHE_VERSION_CHECK_SECONDS 秒內失效。
+    ---
+    tags:
+      - Promotions API
+    summary: "促銷活動成效報表"
+    description: "回傳每個促銷活動在活動期間與活動前同長度基準期的營收、交易筆數與成長幅度。"
+    parameters:
+      - name: method
+        in: query
+        type: string
+        required: false
+        description: "促銷方式"
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: "分店名稱"
+    responses:
+      200:
+        description: 成功返回促銷活動成效（依開始時間排序，可能為空陣列）
+        examples:
+          application/json:
+            [
+              {
+                "store_name": "台隆手創館_廣三門市",
+                "branch_name": "廣三門市",
+                "promotion_name": "夏日嘉年華",
+                "method": "折扣促銷",
+                "start_time": "2024-06-01 10:00:00",
+                "end_time": "2024-06-05 18:00:00",
+                "days": 5,
+                "campaign_revenue": 152000.0,
+                "campaign_txn_count": 310,
+                "baseline_revenue": 120000.0,
+                "baseline_txn_count": 262,
+                "uplift": 32000.0,
+                "uplift_pct": 26.67
+              }
+            ]
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        method = request.args.get('method') or None
+        branch = request.args.get('branch') or None
+
+        report = get_effectiveness(method=method, branch=branch)
+
+        json_str = json.dumps(report, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@promotions_bp.route('/promotions/conflicts', methods=['GET'])
+def get_promotion_conflicts():
+    """
+    找出同一商店中時間重疊的促銷活動
+
+    以記憶體中的促銷活動資料對每家商店的起訖事件做掃描線，成本為 O(n log n + k)，k 為重疊組數。
+    預設只回報促銷方式相同的重疊（會造成重複折扣），same_method=false 時回報所有重疊；可用 branch 限定分店。
+    ---
+    tags:
+      - Promotions API
+    summary: "查詢重疊的促銷活動"
+    description: "回傳同一商店中活動期間重疊的活動組合，以及重疊的時間範圍。"
+    parameters:
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: "分店名稱"
+      - name: same_method
+        in: query
+        type: boolean
+        required: false
+        default: true
+        description: "是否只回報促銷方式相同的重疊"
+    responses:
+      200:
+        description: 成功返回重疊的活動組合（可能為空陣列）
+        examples:
+          application/json:
+            [
+              {
+                "store_name": "台隆手創館_廣三門市",
+                "branch_name": "廣三門市",
+                "overlap_start": "2024-06-03 10:00:00",
+                "overlap_end": "2024-06-05 18:00:00",
+                "campaigns": [
+                  {
+                    "store_name": "台隆手創館_廣三門市",
+                    "branch_name": "廣三門市",
+                    "promotion_name": "夏日嘉年華",
+                    "start_time": "2024-06-01 10:00:00",
+                    "end_time": "2024-06-05 18:00:00",
+                    "method": "折扣促銷"
+                  },
+                  {
+                    "store_name": "台隆手創館_廣三門市",
+                    "branch_name": "廣三門市",
+                    "promotion_name": "週年慶",
+                    "start_time": "2024-06-03 10:00:00",
+                    "end_time": "2024-06-10 22:00:00",
+                    "method": "折扣促銷"
+                  }
+                ]
+              }
+            ]
+      400:
+        description: 參數格式錯誤
+        examples:
+          application/json:
+            {"error": "Invalid same_method: expected true or false"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        branch = request.args.get('branch') or None
+        same_method = parse_bool(request.args.get('same_method'), 'same_method', default=True)
+
+        campaigns = get_promotion_index().campaigns
+        if branch is not None:
+            campaigns = [c for c in campaigns if c.branch_name == branch]
+        conflicts = [conflict_json(first, second) for first, second in find_conflicts(campaigns, same_method)]
+
+        json_str = json.dumps(conflicts, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@promotions_bp.route('/promotions/conflicts', methods=['POST'])
+def validate_promotion():
+    """
+    檢查預定新增的促銷活動是否與既有活動衝突
+
+    由該商店的區間索引找出期間重疊的既有活動，成本為 O(log n + k)。預設只有相同促銷方式的重疊算衝突，
+    same_method 為 false 時任何重疊皆算衝突；與新活動同名的既有活動（修改活動期間的情況）不列入比對。
+    有衝突時返回 409 與衝突的活動，否則返回 200。
+    ---
+    tags:
+      - Promotions API
+    summary: "驗證新促銷活動"
+    description: "檢查預定的促銷活動是否與同一商店的既有活動期間重疊。"
+    consumes:
+      - application/json
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [store_name, start_time, end_time, method]
+          properties:
+            store_name:
+              type: string
+              example: "台隆手創館_廣三門市"
+            promotion_name:
+              type: string
+              example: "中秋節特賣"
+            start_time:
+              type: string
+              example: "2024-06-03 10:00:00"
+            end_time:
+              type: string
+              example: "2024-06-10 22:00:00"
+            method:
+              type: string
+              example: "折扣促銷"
+            same_method:
+              type: boolean
+              example: true
+    responses:
+      200:
+        description: 沒有衝突
+        examples:
+          application/json:
+            {"conflicts": []}
+      400:
+        description: 請求格式錯誤
+        examples:
+          application/json:
+            {"error": "store_name is required"}
+      409:
+        description: 與既有活動衝突
+        examples:
+          application/json:
+            {
+              "error": "Campaign conflicts with existing promotions",
+              "conflicts": [
+                {
+                  "store_name": "台隆手創館_廣三門市",
+                  "branch_name": "廣三門市",
+                  "promotion_name": "夏日嘉年華",
+                  "start_time": "2024-06-01 10:00:00",
+                  "end_time": "2024-06-05 18:00:00",
+                  "method": "折扣促銷"
+                }
+              ]
+            }
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        for field in ('store_name', 'start_time', 'end_time', 'method'):
+            if not payload.get(field):
+                return jsonify({"error": f"{field} is required"}), 400
+
+        start, _ = parse_datetime(payload['start_time'], 'start_time')
+        end, has_time = parse_datetime(payload['end_time'], 'end_time')
+        if not has_time:
+            end = datetime.combine(end.date(), time.max)
+        if end < start:
+            return jsonify({"error": "start_time must not be later than end_time"}), 400
+        same_method = payload.get('same_method', True)
+        if not isinstance(same_method, bool):
+            same_method = parse_bool(same_method, 'same_method', default=True)
+
+        conflicts = get_promotion_index().conflicts_with(
+            payload['store_name'], start, end,
+            method=payload['method'] if same_method else None,
+            exclude_name=payload.get('promotion_name')
+        )
+
+        body = {"conflicts": [campaign_json(campaign) for campaign in conflicts]}
+        status = 200
+        if conflicts:
+            body["error"] = "Campaign conflicts with existing promotions"
+            status = 409
+        response = make_response(json.dumps(body, ensure_ascii=False), status)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
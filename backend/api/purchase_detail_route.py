@@ -1,15 +1,32 @@
+from datetime import timedelta
+
 from flask import Blueprint, jsonify, request, make_response, json
 from models.models import db
 from sqlalchemy import text
 
+from api.pagination import decode_cursor, paginate, parse_limit
+from api.params import parse_date
+
 purchase_detail_bp = Blueprint('purchase_detail', __name__)
 
+
+def purchase_key(row):
+    # 分頁排序鍵 (Time, Serial_Number)；Serial_Number 唯一，可區分同一時間的多筆進貨
+    return [str(row[2]), row[0]]
+
+
+def purchase_by_date_key(row):
+    # 依日期查詢的欄位多了 Store_Name，Time 位於第 4 欄
+    return [str(row[3]), row[0]]
+
+
 @purchase_detail_bp.route('/purchase-details/shop', methods=['GET'])
 def get_purchase_details():
     """
     查詢指定店鋪的進貨明細
     
     從 Purchase_Detail 資料表中查詢特定店鋪 (Store_Name) 的所有進貨紀錄，包括流水號、供應商、進貨時間、商品與進貨數量。
+    結果依 (Time, Serial_Number) 以 keyset 分頁，每頁最多 limit 筆，以回應中的 next_cursor 取得下一頁。
     例如: 0918_台北忠孝館
     ---
     tags:
@@ -22,20 +39,34 @@ def get_purchase_details():
         type: string
         required: true
         description: "店鋪名稱"
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+        description: "每頁筆數 (1 ~ 1000)"
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: "上一頁回應中的 next_cursor"
     responses:
       200:
         description: 成功返回指定店鋪的進貨明細列表
         examples:
           application/json:
-            [
-              {
-                "serial_number": "1",
-                "supplier": "義隆供應商",
-                "time": "2024-03-01 12:35:09",
-                "goods": "花漾戀愛修容組 GLOW FLEUR CHEEKS",
-                "amount": 50
-              }
-            ]
+            {
+              "items": [
+                {
+                  "serial_number": "1",
+                  "supplier": "義隆供應商",
+                  "time": "2024-03-01 12:35:09",
+                  "goods": "花漾戀愛修容組 GLOW FLEUR CHEEKS",
+                  "amount": 50
+                }
+              ],
+              "next_cursor": null
+            }
       400:
         description: 缺少參數或請求無效
         examples:
@@ -55,15 +86,37 @@ def get_purchase_details():
         if not shop_name:
             return jsonify({"error": "Shop name is required"}), 400
 
-        query = text("""
-            SELECT Serial_Number, Supplier, Time, Goods, Amount
-            FROM Purchase_Detail
-            WHERE Store_Name = :shop_name;
-        """)
-        results = db.session.execute(query, {"shop_name": shop_name}).fetchall()
+        limit = parse_limit(request.args)
+        cursor = request.args.get('cursor')
+        params = {"shop_name": shop_name, "limit": limit + 1}
+
+        # 以 (Store_Name, Time, Serial_Number) 索引做 keyset 分頁
+        # 列建構子比較無法用於分區修剪，另加 Time >= :cursor_time 讓之後的頁面略過較早的月份分區
+        if cursor:
+            params["cursor_time"], params["cursor_serial"] = decode_cursor(cursor, 2)
+            query = text("""
+                SELECT Serial_Number, Supplier, Time, Goods, Amount
+                FROM Purchase_Detail
+                WHERE Store_Name = :shop_name
+                  AND (Time, Serial_Number) > (:cursor_time, :cursor_serial)
+                  AND Time >= :cursor_time
+                ORDER BY Time, Serial_Number
+                LIMIT :limit;
+            """)
+        else:
+            query = text("""
+                SELECT Serial_Number, Supplier, Time, Goods, Amount
+                FROM Purchase_Detail
+                WHERE Store_Name = :shop_name
+                ORDER BY Time, Serial_Number
+                LIMIT :limit;
+            """)
+        results = db.session.execute(query, params).fetchall()
+
+        page, next_cursor = paginate(results, limit, purchase_key)
 
         purchase_details = []
-        for row in results:
+        for row in page:
             purchase_details.append({
                 "serial_number": row[0],
                 "supplier": row[1],
@@ -72,11 +125,18 @@ def get_purchase_details():
                 "amount": row[4]
             })
 
-        json_str = json.dumps(purchase_details, ensure_ascii=False)
+        data = {
+            "items": purchase_details,
+            "next_cursor": next_cursor
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
         response = make_response(json_str, 200)
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
         return response
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
@@ -86,8 +146,9 @@ def get_purchase_details_by_date():
     """
     查詢特定日期的進貨明細
     
-    透過 query string 接收參數 date（格式 YYYY-MM-DD），計算當天起訖時間 (00:00:00 ~ 23:59:59)，
+    透過 query string 接收參數 date（格式 YYYY-MM-DD），計算當天起始與隔天起始的半開區間，
     並從 Purchase_Detail 資料表中篩選時間落在此區間的所有進貨紀錄。若無查詢到任何結果則回傳 404。
+    結果依 (Time, Serial_Number) 以 keyset 分頁，每頁最多 limit 筆，以回應中的 next_cursor 取得下一頁。
     
     例如: 2024-03-01 
     ---
@@ -101,21 +162,35 @@ def get_purchase_details_by_date():
         type: string
         required: true
         description: "查詢的日期 (格式 YYYY-MM-DD)"
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+        description: "每頁筆數 (1 ~ 1000)"
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: "上一頁回應中的 next_cursor"
     responses:
       200:
         description: 成功返回該日期內所有進貨明細
         examples:
           application/json:
-            [
-              {
-                "serial_number": "1",
-                "store_name": "商店1",
-                "supplier": "供應商A",
-                "time": "2024-12-15 10:30:00",
-                "goods": "商品A",
-                "amount": 50
-              }
-            ]
+            {
+              "items": [
+                {
+                  "serial_number": "1",
+                  "store_name": "商店1",
+                  "supplier": "供應商A",
+                  "time": "2024-12-15 10:30:00",
+                  "goods": "商品A",
+                  "amount": 50
+                }
+              ],
+              "next_cursor": null
+            }
       400:
         description: 缺少參數或請求無效
         examples:
@@ -139,24 +214,49 @@ def get_purchase_details_by_date():
         input_date = request.args.get('date')
         if not input_date:
             return jsonify({"error": "Date is required"}), 400
-        
-        # 將 date 字串轉為當天的起止時間 (00:00:00 ~ 23:59:59)
-        date_start = f"{input_date} 00:00:00"
-        date_end = f"{input_date} 23:59:59"
-
-        query = text("""
-            SELECT Serial_Number, Store_Name, Supplier, Time, Goods, Amount
-            FROM Purchase_Detail
-            WHERE Time >= :date_start
-              AND Time <= :date_end;
-        """)
-        results = db.session.execute(query, {"date_start": date_start, "date_end": date_end}).fetchall()
-
-        if not results:
+
+        date_value = parse_date(input_date, 'date')
+        limit = parse_limit(request.args)
+        cursor = request.args.get('cursor')
+
+        # 將 date 字串轉為當天起始與隔天起始的半開區間
+        params = {
+            "date_start": str(date_value),
+            "date_end": str(date_value + timedelta(days=1)),
+            "limit": limit + 1
+        }
+
+        # 以 (Time, Serial_Number) 索引做 keyset 分頁
+        if cursor:
+            params["cursor_time"], params["cursor_serial"] = decode_cursor(cursor, 2)
+            query = text("""
+                SELECT Serial_Number, Store_Name, Supplier, Time, Goods, Amount
+                FROM Purchase_Detail
+                WHERE Time >= :date_start
+                  AND Time < :date_end
+                  AND (Time, Serial_Number) > (:cursor_time, :cursor_serial)
+                  AND Time >= :cursor_time
+                ORDER BY Time, Serial_Number
+                LIMIT :limit;
+            """)
+        else:
+            query = text("""
+                SELECT Serial_Number, Store_Name, Supplier, Time, Goods, Amount
+                FROM Purchase_Detail
+                WHERE Time >= :date_start
+                  AND Time < :date_end
+                ORDER BY Time, Serial_Number
+                LIMIT :limit;
+            """)
+        results = db.session.execute(query, params).fetchall()
+
+        if not results and not cursor:
             return jsonify({"error": f"No purchase details found for date: {input_date}"}), 404
 
+        page, next_cursor = paginate(results, limit, purchase_by_date_key)
+
         purchase_details = []
-        for row in results:
+        for row in page:
             purchase_details.append({
                 "serial_number": row[0],
                 "store_name": row[1],
@@ -166,10 +266,17 @@ def get_purchase_details_by_date():
                 "amount": row[5]
             })
 
-        json_str = json.dumps(purchase_details, ensure_ascii=False)
+        data = {
+            "items": purchase_details,
+            "next_cursor": next_cursor
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
         response = make_response(json_str, 200)
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
         return response
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
\ No newline at end of file
@@ -2,17 +2,233 @@ from flask import Blueprint, jsonify, request, current_app, Response, make_respo
 from models.models import db
 from sqlalchemy import text
 
+from datetime import date
+
+from api.params import parse_bool, parse_date_range
+from services.cache import latest_transaction_id, report_cache
+from services.time_buckets import GRANULARITIES, count_buckets, iter_bucket_keys
+from services.transaction_archive import get_archive
+
 import json
 
 revenue_bp = Blueprint('revenue', __name__)
 
+# 單次時間序列回應的時間桶上限（例如 hour 粒度約可查詢 200 天）
+MAX_SERIES_BUCKETS = 5000
+
+# 時間序列查詢：hour 粒度直接以半開區間掃描 Shopping_Sheet.Time，
+# day / week / month 則由每日彙總表 Store_Daily_Revenue 加總，兩者回傳列數都只與時間桶數量相關
+SERIES_BUCKET_SQL = {
+    'day': "Sale_Date",
+    'week': "DATE_SUB(Sale_Date, INTERVAL WEEKDAY(Sale_Date) DAY)",
+    'month': "DATE_FORMAT(Sale_Date, '%Y-%m-01')",
+}
+SERIES_ROLLUP_FILTER_SQL = {
+    'store': "AND Store_Name = :name",
+    'branch': "AND Branch_Name = :name",
+    'mall': "",
+}
+SERIES_QUERIES = {
+    (scope, granularity): text(f"""
+        SELECT {bucket} AS bucket, SUM(Revenue) AS revenue, SUM(Txn_Count) AS txn_count
+        FROM Store_Daily_Revenue
+        WHERE Sale_Date >= :date_start
+          AND Sale_Date < :date_end
+          {scope_filter}
+        GROUP BY bucket
+        ORDER BY bucket;
+    """)
+    for granularity, bucket in SERIES_BUCKET_SQL.items()
+    for scope, scope_filter in SERIES_ROLLUP_FILTER_SQL.items()
+}
+SERIES_QUERIES[('store', 'hour')] = text("""
+    SELECT DATE_FORMAT(Time, '%Y-%m-%d %H:00:00') AS bucket, SUM(Price) AS revenue, COUNT(*) AS txn_count
+    FROM Shopping_Sheet
+    WHERE Store_Name = :name
+      AND Time >= :date_start
+      AND Time < :date_end
+    GROUP BY bucket
+    ORDER BY bucket;
+""")
+SERIES_QUERIES[('branch', 'hour')] = text("""
+    SELECT DATE_FORMAT(SS.Time, '%Y-%m-%d %H:00:00') AS bucket, SUM(SS.Price) AS revenue, COUNT(*) AS txn_count
+    FROM Shops S
+    JOIN Shopping_Sheet SS ON SS.Store_Name = S.Store_Name
+    WHERE S.Branch_Name = :name
+      AND SS.Time >= :date_start
+      AND SS.Time < :date_end
+    GROUP BY bucket
+    ORDER BY bucket;
+""")
+SERIES_QUERIES[('mall', 'hour')] = text("""
+    SELECT DATE_FORMAT(Time, '%Y-%m-%d %H:00:00') AS bucket, SUM(Price) AS revenue, COUNT(*) AS txn_count
+    FROM Shopping_Sheet
+    WHERE Time >= :date_start
+      AND Time < :date_end
+    GROUP BY bucket
+    ORDER BY bucket;
+""")
+BRANCH_STORES_SQL = text("""
+    SELECT Store_Name
+    FROM Shops
+    WHERE Branch_Name = :name;
+""")
+
+
+# 星期 × 小時熱圖：WEEKDAY() 以星期一為 0，與時間序列的週起點一致
+HEATMAP_QUERIES = {
+    'store': text("""
+        SELECT WEEKDAY(Time) AS weekday, HOUR(Time) AS hour, SUM(Price) AS revenue, COUNT(*) AS txn_count
+        FROM Shopping_Sheet
+        WHERE Store_Name = :name
+          AND Time >= :date_start
+          AND Time < :date_end
+        GROUP BY weekday, hour;
+    """),
+    'branch': text("""
+        SELECT WEEKDAY(SS.Time) AS weekday, HOUR(SS.Time) AS hour, SUM(SS.Price) AS revenue, COUNT(*) AS txn_count
+        FROM Shops S
+        JOIN Shopping_Sheet SS ON SS.Store_Name = S.Store_Name
+        WHERE S.Branch_Name = :name
+          AND SS.Time >= :date_start
+          AND SS.Time < :date_end
+        GROUP BY weekday, hour;
+    """),
+    'mall': text("""
+        SELECT WEEKDAY(Time) AS weekday, HOUR(Time) AS hour, SUM(Price) AS revenue, COUNT(*) AS txn_count
+        FROM Shopping_Sheet
+        WHERE Time >= :date_start
+          AND Time < :date_end
+        GROUP BY weekday, hour;
+    """),
+}
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# 分店 → 商店（→ 付款方式）的階層彙總，WITH ROLLUP 一次產生每一層的小計，GROUPING() 區分小計列與 NULL 值
+ROLLUP_LEVELS = {
+    False: ("Branch_Name, Store_Name", "GROUPING(Branch_Name), GROUPING(Store_Name), 1"),
+    True: ("Branch_Name, Store_Name, Payment", "GROUPING(Branch_Name), GROUPING(Store_Name), GROUPING(Payment)"),
+}
+# 不限日期時加總整個彙總表（列數為商店數 × 天數 × 付款方式數，與交易筆數無關）
+ROLLUP_RANGE_SQL = {
+    True: """FROM Store_Daily_Revenue
+        WHERE Sale_Date >= :date_start
+          AND Sale_Date < :date_end""",
+    False: "FROM Store_Daily_Revenue /* explain-gate: full-scan-ok */",
+}
+ROLLUP_QUERIES = {
+    (by_payment, ranged): text(f"""
+        SELECT {columns}{'' if by_payment else ', NULL'}, SUM(Revenue) AS revenue, SUM(Txn_Count) AS txn_count,
+               {groupings}
+        {range_sql}
+        GROUP BY {columns} WITH ROLLUP;
+    """)
+    for by_payment, (columns, groupings) in ROLLUP_LEVELS.items()
+    for ranged, range_sql in ROLLUP_RANGE_SQL.items()
+}
+
+FORECAST_SQL = text("""
+    SELECT Forecast_Date, Holt_Winters, Moving_Average, As_Of
+    FROM Revenue_Forecast
+    WHERE Store_Name = :name
+      AND Forecast_Date >= :date_start
+    ORDER BY Forecast_Date
+    LIMIT :limit;
+""")
+FORECAST_MODEL_SQL = text("""
+    SELECT Alpha, Beta, Gamma, Fitted_On
+    FROM Forecast_State
+    WHERE Store_Name = :name;
+""")
+
+
+def scope_stores(scope, name):
+    """封存檔查詢用的商店清單；mall 為 None（不限）"""
+    if scope == 'store':
+        return [name]
+    if scope == 'branch':
+        return [row[0] for row in db.session.execute(BRANCH_STORES_SQL, {"name": name})]
+    return None
+
+
+def compute_heatmap(scope, name, date_start, date_end):
+    """[date_start, date_end) 的 7 × 24 交易筆數與營業額，封存 horizon 之前的部分由封存檔計算"""
+    counts = [[0] * 24 for _ in range(7)]
+    revenue = [[0.0] * 24 for _ in range(7)]
+
+    archive = get_archive(current_app._get_current_object())
+    horizon = archive.horizon
+    if horizon is not None and date_start < horizon:
+        hourly = archive.hourly(date_start, min(date_end, horizon), scope_stores(scope, name))
+        for key, (amount, count) in hourly.items():
+            weekday, hour = date.fromisoformat(key[:10]).weekday(), int(key[11:13])
+            counts[weekday][hour] += count
+            revenue[weekday][hour] += amount
+        date_start = max(date_start, horizon)
+
+    if date_start < date_end:
+        rows = db.session.execute(HEATMAP_QUERIES[scope], {
+            "name": name,
+            "date_start": str(date_start),
+            "date_end": str(date_end)
+        }).fetchall()
+        for weekday, hour, amount, count in rows:
+            counts[weekday][hour] += int(count)
+            revenue[weekday][hour] += float(amount or 0)
+
+    return counts, [[round(value, 2) for value in row] for row in revenue]
+
+
+def compute_rollup(date_start, date_end, by_payment):
+    """
+    以單一 WITH ROLLUP 查詢建出 商場 → 分店 → 商店（→ 付款方式）的樹，每層附營業額與交易筆數小計
+
+    同層依營業額由大到小排序；沒有付款方式的交易在彙總表中記為空字串，回傳為 None。
+    """
+    query = ROLLUP_QUERIES[(by_payment, date_start is not None)]
+    params = {"date_start": str(date_start), "date_end": str(date_end)} if date_start is not None else {}
+
+    tree = {"revenue": 0.0, "count": 0, "branches": {}}
+    for branch, store, payment, revenue, count, g_branch, g_store, g_payment in db.session.execute(query, params):
+        totals = {"revenue": float(revenue or 0), "count": int(count or 0)}
+        if g_branch:
+            tree.update(totals)
+            continue
+        branch_node = tree["branches"].setdefault(branch, {"branch_name": branch, "revenue": 0.0, "count": 0, "stores": {}})
+        if g_store:
+            branch_node.update(totals)
+            continue
+        store_node = branch_node["stores"].setdefault(store, {"store_name": store, "revenue": 0.0, "count": 0, "payments": []})
+        if g_payment:
+            store_node.update(totals)
+        else:
+            store_node["payments"].append({"payment": payment or None, **totals})
+
+    def by_revenue(nodes):
+        return sorted(nodes, key=lambda node: node["revenue"], reverse=True)
+
+    branches = []
+    for branch_node in by_revenue(tree["branches"].values()):
+        stores = []
+        for store_node in by_revenue(branch_node["stores"].values()):
+            if by_payment:
+                store_node["payments"] = by_revenue(store_node["payments"])
+            else:
+                del store_node["payments"]
+            stores.append(store_node)
+        branch_node["stores"] = stores
+        branches.append(branch_node)
+    tree["branches"] = branches
+    return tree
+
 
 @revenue_bp.route('/revenue/top-stores', methods=['GET'])
 def get_top_stores():
     """
     查詢營業額最高的 10 家商店
 
-    從 Shopping_Sheet 資料表中統計各家商店的累計營業額（Price 加總），依照營業額由大到小排序並限前 10 筆，返回 JSON。
+    從 Store_Daily_Revenue 每日彙總表中統計各家商店的累計營業額，依照營業額由大到小排序並限前 10 筆，返回 JSON。
+    彙總表由 Shopping_Sheet 的觸發器增量維護，查詢成本只與商店數與天數相關，與交易筆數無關。
     ---
     tags:
       - Revenue API
@@ -46,10 +262,10 @@ def get_top_stores():
     """
     
     try:
-        # 針對 Shopping_Sheet 統計各家商店總營業額，並選取前 10 名
+        # 針對每日彙總表統計各家商店總營業額，並選取前 10 名
         query = text("""
-            SELECT Store_Name, SUM(Price) AS revenue
-            FROM Shopping_Sheet
+            SELECT Store_Name, SUM(Revenue) AS revenue
+            FROM Store_Daily_Revenue
             GROUP BY Store_Name
             ORDER BY revenue DESC
             LIMIT 10;
@@ -85,7 +301,7 @@ def get_branch_revenue():
     """
     查詢指定分店的總營業額
     
-    從 Shopping_Sheet、Shops 與 Shopping_Mall 表格關聯，彙整指定分店 (Branch_Name) 底下所有商店的總營業額。
+    從 Store_Daily_Revenue 每日彙總表（以 Branch_Name 索引），彙整指定分店 (Branch_Name) 底下所有商店的總營業額。
     若資料不存在則回傳 0。
 
     例如: 台北忠孝館
@@ -131,12 +347,10 @@ def get_branch_revenue():
 
         # 統計該分店（Branch_Name）底下所有商店的總營業額
         query = text("""
-            SELECT SM.Branch_Name, SUM(SS.Price) AS total_revenue
-            FROM Shopping_Sheet SS
-            JOIN Shops S ON SS.Store_Name = S.Store_Name
-            JOIN Shopping_Mall SM ON S.Branch_Name = SM.Branch_Name
-            WHERE SM.Branch_Name = :branch
-            GROUP BY SM.Branch_Name;
+            SELECT Branch_Name, SUM(Revenue) AS total_revenue
+            FROM Store_Daily_Revenue
+            WHERE Branch_Name = :branch
+            GROUP BY Branch_Name;
         """)
         result = db.session.execute(query, {"branch": branch}).fetchone()
 
@@ -166,7 +380,7 @@ def get_branch_stores_revenue():
     """
     查詢指定分店內商店的營業額排名
     
-    透過 query string 接收參數 branch，從 Shops 與 Shopping_Sheet 資料表中統計該分店內各商店的營業額，並依降序排序後列出排名。
+    透過 query string 接收參數 branch，從 Shops 與 Store_Daily_Revenue 每日彙總表中統計該分店內各商店的營業額，並依降序排序後列出排名。
     
     例如: 台北忠孝館
     ---
@@ -223,12 +437,17 @@ def get_branch_stores_revenue():
             return jsonify({"error": "Branch name is required"}), 400
 
         # 查詢該分店內所有商店的營業額，並依照營業額降序排序
+        # 沒有任何交易的商店在彙總表中沒有資料列，以 LEFT JOIN 補 0
         query = text("""
-            SELECT S.Store_Name, COALESCE(SUM(SS.Price), 0) AS revenue
+            SELECT S.Store_Name, COALESCE(R.revenue, 0) AS revenue
             FROM Shops S
-            LEFT JOIN Shopping_Sheet SS ON S.Store_Name = SS.Store_Name
+            LEFT JOIN (
+                SELECT Store_Name, SUM(Revenue) AS revenue
+                FROM Store_Daily_Revenue
+                WHERE Branch_Name = :branch
+                GROUP BY Store_Name
+            ) R ON S.Store_Name = R.Store_Name
             WHERE S.Branch_Name = :branch
-            GROUP BY S.Store_Name
             ORDER BY revenue DESC;
         """)
         results = db.session.execute(query, {"branch": branch}).fetchall()
@@ -258,4 +477,481 @@ def get_branch_stores_revenue():
         return response
 
     except Exception as e:
-        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+
+@revenue_bp.route('/revenue/series', methods=['GET'])
+def get_revenue_series():
+    """
+    查詢營業額時間序列
+
+    依 scope（store / branch / mall）與 name 篩選，在 from ~ to 區間內以指定粒度（hour / day / week / month）分桶加總營業額與交易筆數，
+    一次查詢即返回完整且連續的時間序列，沒有交易的時間桶補 0。
+    hour 粒度直接以半開區間 (Time >= from AND Time < to 的隔天) 查詢 Shopping_Sheet（封存 horizon 之前的部分讀取封存檔），
+    其餘粒度由每日彙總表計算，回應大小只與時間桶數量相關，與交易筆數無關。
+
+    例如: scope=branch, name=台北忠孝館, from=2024-05-01, to=2024-05-31, granularity=day
+    ---
+    tags:
+      - Revenue API
+    summary: "查詢營業額時間序列"
+    description: "依範圍與粒度分桶統計營業額，返回連續的時間序列，週以星期一為起點。"
+    parameters:
+      - name: scope
+        in: query
+        type: string
+        required: true
+        enum: [store, branch, mall]
+        description: "統計範圍"
+      - name: name
+        in: query
+        type: string
+        required: false
+        description: "商店或分店名稱（scope 為 mall 時不需要）"
+      - name: from
+        in: query
+        type: string
+        required: true
+        description: "起始日期 (格式 YYYY-MM-DD，含)"
+      - name: to
+        in: query
+        type: string
+        required: true
+        description: "結束日期 (格式 YYYY-MM-DD，含)"
+      - name: granularity
+        in: query
+        type: string
+        required: false
+        enum: [hour, day, week, month]
+        default: day
+        description: "時間桶粒度"
+    responses:
+      200:
+        description: 成功返回時間序列
+        examples:
+          application/json:
+            {
+              "scope": "branch",
+              "name": "台北忠孝館",
+              "granularity": "day",
+              "from": "2024-05-28",
+              "to": "2024-05-29",
+              "series": [
+                {"bucket": "2024-05-28", "revenue": 25480.0, "count": 12},
+                {"bucket": "2024-05-29", "revenue": 0, "count": 0}
+              ]
+            }
+      400:
+        description: 缺少參數或請求無效
+        examples:
+          application/json:
+            {"error": "Invalid granularity: minute"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        scope = request.args.get('scope')
+        name = request.args.get('name')
+        granularity = request.args.get('granularity', 'day')
+
+        if scope not in ('store', 'branch', 'mall'):
+            return jsonify({"error": "scope must be one of store, branch, mall"}), 400
+        if scope != 'mall' and not name:
+            return jsonify({"error": "Name is required for scope: " + scope}), 400
+        if granularity not in GRANULARITIES:
+            return jsonify({"error": f"Invalid granularity: {granularity}"}), 400
+
+        date_start, date_end = parse_date_range(request.args)
+        if count_buckets(date_start, date_end, granularity) > MAX_SERIES_BUCKETS:
+            return jsonify({"error": f"Too many buckets, at most {MAX_SERIES_BUCKETS} per request"}), 400
+
+        query = SERIES_QUERIES[(scope, granularity)]
+        params = {"name": name, "date_start": str(date_start), "date_end": str(date_end)}
+
+        # day / week / month 的每日彙總表保留完整歷史；hour 粒度在封存 horizon 之前的部分改由封存檔計算
+        totals = {}
+        archive = get_archive(current_app._get_current_object())
+        horizon = archive.horizon
+        if granularity == 'hour' and horizon is not None and date_start < horizon:
+            if scope == 'store':
+                stores = [name]
+            elif scope == 'branch':
+                stores = [row[0] for row in db.session.execute(BRANCH_STORES_SQL, {"name": name})]
+            else:
+                stores = None
+            totals = archive.hourly(date_start, min(date_end, horizon), stores)
+            params["date_start"] = str(max(date_start, horizon))
+
+        results = db.session.execute(query, params).fetchall()
+        for row in results:
+            totals[str(row[0])] = (float(row[1] or 0), int(row[2] or 0))
+
+        # 以 Python 依序產生所有時間桶，補齊沒有交易的時段
+        series = []
+        for key in iter_bucket_keys(date_start, date_end, granularity):
+            revenue, count = totals.get(key, (0, 0))
+            series.append({
+                "bucket": key,
+                "revenue": revenue,
+                "count": count
+            })
+
+        data = {
+            "scope": scope,
+            "name": name if scope != 'mall' else None,
+            "granularity": granularity,
+            "from": request.args.get('from'),
+            "to": request.args.get('to'),
+            "series": series
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+
+@revenue_bp.route('/revenue/heatmap', methods=['GET'])
+def get_revenue_heatmap():
+    """
+    查詢星期 × 小時的銷售熱圖
+
+    依 scope（store / branch / mall）與 name 篩選，統計 from ~ to 區間內每個星期幾（星期一為第一列）與每個小時的交易筆數與營業額，
+    以單一 GROUP BY WEEKDAY(Time), HOUR(Time) 查詢 Shopping_Sheet 的時間範圍（封存 horizon 之前的部分讀取封存檔）。
+    to 早於今天的已結束區間會快取在各 worker 中；當天的新交易不影響已結束的區間，
+    只有補傳過去日期的交易（Shopping_Sheet_Backdated 版本號）、交易被修改 / 刪除或大量載入後才會重新計算。
+
+    例如: scope=store, name=23區_台北忠孝館, from=2024-05-01, to=2024-05-31
+    ---
+    tags:
+      - Revenue API
+    summary: "查詢銷售熱圖（星期 × 小時）"
+    description: "返回 7 × 24 的交易筆數與營業額矩陣，用來找出尖峰營業時段。"
+    parameters:
+      - name: scope
+        in: query
+        type: string
+        required: true
+        enum: [store, branch, mall]
+        description: "統計範圍"
+      - name: name
+        in: query
+        type: string
+        required: false
+        description: "商店或分店名稱（scope 為 mall 時不需要）"
+      - name: from
+        in: query
+        type: string
+        required: true
+        description: "起始日期 (格式 YYYY-MM-DD，含)"
+      - name: to
+        in: query
+        type: string
+        required: true
+        description: "結束日期 (格式 YYYY-MM-DD，含)"
+    responses:
+      200:
+        description: 成功返回熱圖，count / revenue 的第一維為星期（與 weekdays 對應），第二維為 0 ~ 23 時
+        examples:
+          application/json:
+            {
+              "scope": "store",
+              "name": "23區_台北忠孝館",
+              "from": "2024-05-01",
+              "to": "2024-05-31",
+              "weekdays": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+              "count": [[0, 0, "..."], "..."],
+              "revenue": [[0.0, 0.0, "..."], "..."]
+            }
+      400:
+        description: 缺少參數或請求無效
+        examples:
+          application/json:
+            {"error": "scope must be one of store, branch, mall"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        scope = request.args.get('scope')
+        name = request.args.get('name')
+        if scope not in HEATMAP_QUERIES:
+            return jsonify({"error": "scope must be one of store, branch, mall"}), 400
+        if scope != 'mall' and not name:
+            return jsonify({"error": "Name is required for scope: " + scope}), 400
+        if scope == 'mall':
+            name = None
+        date_start, date_end = parse_date_range(request.args)
+
+        # 只快取已結束的區間；包含今天的區間幾乎每次請求都有新交易，快取沒有意義。
+        # 收銀端可能在隔天才補傳前一天的交易，由 INSERT 觸發器遞增 Shopping_Sheet_Backdated 的版本號使快取失效
+        key = (scope, name, date_start, date_end)
+        cache = None
+        if date_end <= date.today():
+            cache = report_cache(current_app._get_current_object(), 'revenue_heatmap',
+                                 ('Shopping_Sheet', 'Shopping_Sheet_Backdated', 'Shops'))
+        grid = cache.get(key) if cache is not None else None
+        if grid is None:
+            grid = compute_heatmap(scope, name, date_start, date_end)
+            if cache is not None:
+                cache.put(key, grid)
+        counts, revenue = grid
+
+        data = {
+            "scope": scope,
+            "name": name,
+            "from": request.args.get('from'),
+            "to": request.args.get('to'),
+            "weekdays": WEEKDAY_NAMES,
+            "count": counts,
+            "revenue": revenue
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+
+
+@revenue_bp.route('/revenue/rollup', methods=['GET'])
+def get_revenue_rollup():
+    """
+    查詢階層式營業額彙總（商場 → 分店 → 商店 → 付款方式）
+
+    以每日彙總表 Store_Daily_Revenue 執行單一 GROUP BY ... WITH ROLLUP 查詢，一次取得商場總計、各分店小計與各商店小計，
+    payment=true 時再細分到付款方式。可用 from / to 限定日期（未提供時為全部歷史，包含已封存月份）。
+    結果依 (區間, payment) 快取在各 worker 中：已結束的區間只在補傳過去日期的交易、交易被修改 / 刪除或彙總表重建後失效，
+    包含今天（或不限日期）的區間在有新交易寫入後重新計算。
+    ---
+    tags:
+      - Revenue API
+    summary: "查詢階層式營業額彙總"
+    description: "一次返回商場、各分店、各商店（與付款方式）的營業額與交易筆數小計。"
+    parameters:
+      - name: from
+        in: query
+        type: string
+        required: false
+        description: "起始日期 (格式 YYYY-MM-DD，含)，與 to 需同時提供"
+      - name: to
+        in: query
+        type: string
+        required: false
+        description: "結束日期 (格式 YYYY-MM-DD，含)"
+      - name: payment
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: "是否細分到付款方式"
+    responses:
+      200:
+        description: 成功返回彙總樹，同層依營業額由大到小排序
+        examples:
+          application/json:
+            {
+              "from": "2024-05-01",
+              "to": "2024-05-31",
+              "revenue": 1250000.0,
+              "count": 3210,
+              "branches": [
+                {
+                  "branch_name": "台北忠孝館",
+                  "revenue": 820000.0,
+                  "count": 2011,
+                  "stores": [
+                    {
+                      "store_name": "23區_台北忠孝館",
+                      "revenue": 152000.0,
+                      "count": 310,
+                      "payments": [
+                        {"payment": "credit card", "revenue": 120000.0, "count": 220},
+                        {"payment": "cash", "revenue": 32000.0, "count": 90}
+                      ]
+                    }
+                  ]
+                }
+              ]
+            }
+      400:
+        description: 參數格式錯誤
+        examples:
+          application/json:
+            {"error": "Both from and to are required (YYYY-MM-DD)"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        date_start, date_end = parse_date_range(request.args, required=False)
+        by_payment = parse_bool(request.args.get('payment'), 'payment')
+
+        # 已結束的區間只會因補傳過去日期的交易而改變（Shopping_Sheet_Backdated 版本號），當天的新交易不使其失效；
+        # 其餘區間另以最大 Transaction_ID 判斷新交易
+        app = current_app._get_current_object()
+        tables = ('Shopping_Sheet', 'Shops', 'Store_Daily_Revenue')
+        if date_end is not None and date_end <= date.today():
+            cache = report_cache(app, 'revenue_rollup', tables + ('Shopping_Sheet_Backdated',))
+        else:
+            cache = report_cache(app, 'revenue_rollup_live', tables, probe=latest_transaction_id)
+        key = (date_start, date_end, by_payment)
+        tree = cache.get(key)
+        if tree is None:
+            tree = compute_rollup(date_start, date_end, by_payment)
+            cache.put(key, tree)
+
+        data = {
+            "from": request.args.get('from'),
+            "to": request.args.get('to'),
+            **tree
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+
+
+@revenue_bp.route('/revenue/forecast', methods=['GET'])
+def get_revenue_forecast():
+    """
+    查詢商店未來每日營業額預測
+
+    預測由 flask forecast refresh 每天批次計算後存入 Revenue_Forecast，查詢只讀取已存好的結果。
+    每天提供兩種預測：加法季節（週）、阻尼趨勢的 Holt-Winters，以及最近幾週同一星期的移動平均。
+    as_of 為預測使用的最後一個完整營業日。
+    例如: store=23區_台北忠孝館, horizon=14
+    ---
+    tags:
+      - Revenue API
+    summary: "查詢商店營業額預測"
+    description: "返回指定商店未來 horizon 天的每日營業額預測。"
+    parameters:
+      - name: store
+        in: query
+        type: string
+        required: true
+        description: "商店名稱"
+      - name: horizon
+        in: query
+        type: integer
+        required: false
+        default: 14
+        description: "預測天數（1 ~ FORECAST_HORIZON_DAYS）"
+    responses:
+      200:
+        description: 成功返回預測
+        examples:
+          application/json:
+            {
+              "store_name": "23區_台北忠孝館",
+              "as_of": "2024-06-30",
+              "model": {"alpha": 0.3, "beta": 0.01, "gamma": 0.2, "fitted_on": "2024-06-15"},
+              "forecast": [
+                {"date": "2024-07-01", "holt_winters": 25480.0, "moving_average": 24120.5}
+              ]
+            }
+      400:
+        description: 缺少參數或請求無效
+        examples:
+          application/json:
+            {"error": "horizon must be between 1 and 28"}
+      404:
+        description: 尚無預測資料
+        examples:
+          application/json:
+            {"error": "No forecast found for store: 23區_台北忠孝館"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        store = request.args.get('store')
+        if not store:
+            return jsonify({"error": "Store name is required"}), 400
+        max_horizon = current_app.config['FORECAST_HORIZON_DAYS']
+        try:
+            horizon = int(request.args.get('horizon', 14))
+        except ValueError:
+            return jsonify({"error": "horizon must be an integer"}), 400
+        if horizon < 1 or horizon > max_horizon:
+            return jsonify({"error": f"horizon must be between 1 and {max_horizon}"}), 400
+
+        # 預測自最近一次 refresh 的日期起存放，略過已經過去的日子
+        results = db.session.execute(FORECAST_SQL, {
+            "name": store,
+            "date_start": str(date.today()),
+            "limit": horizon
+        }).fetchall()
+        if not results:
+            return jsonify({"error": f"No forecast found for store: {store}"}), 404
+        model = db.session.execute(FORECAST_MODEL_SQL, {"name": store}).fetchone()
+
+        data = {
+            "store_name": store,
+            "as_of": str(results[0][3]),
+            "model": {
+                "alpha": model[0],
+                "beta": model[1],
+                "gamma": model[2],
+                "fitted_on": str(model[3])
+            } if model else None,
+            "forecast": [
+                {
+                    "date": str(row[0]),
+                    "holt_winters": float(row[1]),
+                    "moving_average": float(row[2])
+                }
+                for row in results
+            ]
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
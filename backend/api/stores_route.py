@@ -40,7 +40,7 @@ def get_stores():
     
     try:
         # 從 Shops 資料表選取 Store_Name 欄位
-        query = text("SELECT Store_Name FROM Shops;")
+        query = text("SELECT Store_Name FROM Shops /* explain-gate: full-scan-ok */;")
         results = db.session.execute(query).fetchall()
 
         # 將 SQL 查詢結果整理成 list
@@ -2,6 +2,9 @@ from flask import Blueprint, jsonify, request, current_app, Response, make_respo
 from models.models import db
 from sqlalchemy import text
 
+from api.params import parse_date_range
+from services.supplier_analytics import get_supplier_stats, get_supply_graph
+
 suppliers_bp = Blueprint('suppliers', __name__)
 
 @suppliers_bp.route('/supplier', methods=['GET'])
@@ -79,4 +82,150 @@ def get_supplier_info():
         return response
     
     except Exception as e:
-        return jsonify({"error": "Internal server error", "details": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+def node_totals(edges, key):
+    """依 key（supplier 或 store_name）加總邊的進貨次數與總量，回傳依名稱排序的節點清單"""
+    nodes = {}
+    for edge in edges:
+        node = nodes.setdefault(edge[key], {"name": edge[key], "degree": 0, "deliveries": 0, "amount": 0})
+        node["degree"] += 1
+        node["deliveries"] += edge["deliveries"]
+        node["amount"] += edge["amount"]
+    return [nodes[name] for name in sorted(nodes)]
+
+
+@suppliers_bp.route('/supplier/stats', methods=['GET'])
+def get_supplier_stats_report():
+    """
+    供應商進貨統計
+
+    以 Purchase_Detail 的分組查詢計算期間內各供應商的進貨次數、總量、進貨頻率、最後一次進貨與服務的商店。
+    結果快取到有新的進貨或進貨紀錄被修改為止。
+    ---
+    tags:
+      - Supplier API
+    summary: "供應商進貨統計"
+    description: "from / to 為必填的日期區間（含首尾兩天）；supplier_name 可只查詢單一供應商。"
+    parameters:
+      - name: from
+        in: query
+        type: string
+        required: true
+        description: "起始日期 (YYYY-MM-DD)"
+      - name: to
+        in: query
+        type: string
+        required: true
+        description: "結束日期 (YYYY-MM-DD)"
+      - name: supplier_name
+        in: query
+        type: string
+        required: false
+        description: "供應商名稱"
+    responses:
+      200:
+        description: 成功返回各供應商的統計
+        examples:
+          application/json:
+            [
+              {
+                "supplier": "義隆供應商",
+                "deliveries": 12,
+                "amount": 480,
+                "store_count": 2,
+                "goods_count": 5,
+                "delivery_days": 10,
+                "frequency_per_week": 2.8,
+                "avg_interval_days": 3.2,
+                "first_delivery": "2024-05-01 10:00:00",
+                "last_delivery": "2024-05-30 09:30:00",
+                "stores": [
+                  {"store_name": "23區_台北忠孝館", "deliveries": 7, "amount": 280, "last_delivery": "2024-05-30 09:30:00"}
+                ]
+              }
+            ]
+      400:
+        description: 日期格式錯誤或缺少參數
+      500:
+        description: 內部伺服器錯誤
+    """
+    try:
+        date_start, date_end = parse_date_range(request.args)
+        stats = get_supplier_stats(date_start, date_end, request.args.get('supplier_name') or None)
+
+        json_str = json.dumps(stats, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@suppliers_bp.route('/supplier/graph', methods=['GET'])
+def get_supplier_graph():
+    """
+    供應商 ↔ 商店供應關係圖
+
+    各 worker 在記憶體中保存全期間的供應商 ↔ 商店鄰接表（邊上為進貨次數、總量與首末次進貨時間），
+    新增的進貨依 Serial_Number 增量累加，不需重新彙總。
+    ---
+    tags:
+      - Supplier API
+    summary: "供應商與商店的供應關係圖"
+    description: "supplier_name 或 shop_name 可只取某個節點的鄰接邊；節點的 degree 為相連的另一側節點數。"
+    parameters:
+      - name: supplier_name
+        in: query
+        type: string
+        required: false
+        description: "供應商名稱"
+      - name: shop_name
+        in: query
+        type: string
+        required: false
+        description: "店鋪名稱"
+    responses:
+      200:
+        description: 成功返回供應關係圖
+        examples:
+          application/json:
+            {
+              "suppliers": [{"name": "義隆供應商", "degree": 1, "deliveries": 7, "amount": 280}],
+              "stores": [{"name": "23區_台北忠孝館", "degree": 1, "deliveries": 7, "amount": 280}],
+              "edges": [
+                {
+                  "supplier": "義隆供應商",
+                  "store_name": "23區_台北忠孝館",
+                  "deliveries": 7,
+                  "amount": 280,
+                  "first_delivery": "2024-01-05 10:00:00",
+                  "last_delivery": "2024-05-30 09:30:00"
+                }
+              ]
+            }
+      500:
+        description: 內部伺服器錯誤
+    """
+    try:
+        edges = get_supply_graph().edges(
+            supplier=request.args.get('supplier_name') or None,
+            store_name=request.args.get('shop_name') or None
+        )
+        graph = {
+            "suppliers": node_totals(edges, "supplier"),
+            "stores": node_totals(edges, "store_name"),
+            "edges": edges
+        }
+
+        json_str = json.dumps(graph, ensure_ascii=False)
+        response = make_response(json_str, 200)
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        return response
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
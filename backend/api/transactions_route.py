@@ -1,16 +1,90 @@
-from flask import Blueprint, jsonify, request, current_app, Response, make_response, json
+import csv
+import io
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, jsonify, request, current_app, Response, make_response, json, stream_with_context
 from models.models import db
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from api.pagination import decode_cursor, paginate, parse_limit
+from api.params import parse_date, parse_date_range
+from services.ingest_batcher import IngestQueueFull, IngestTimeout, get_batcher
+from services.transaction_archive import get_archive
 
 transactions_bp = Blueprint('transactions', __name__)
 
+# 匯出時每次自伺服器端游標取回並輸出的列數
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_COLUMNS = ["transaction_id", "store_name", "branch_name", "time", "price", "payment"]
+# 尚未封存任何月份時 MySQL 查詢的 Time 下限（DATETIME 的最小值）
+HOT_START_FLOOR = '1000-01-01 00:00:00'
+
+
+def transaction_key(row):
+    # 分頁排序鍵 (Time, Transaction_ID)，與 ORDER BY 一致；次要索引隱含主鍵，(Time) 索引即可依此順序掃描
+    return [str(row[2]), row[0]]
+
+
+def cursor_after(params):
+    """把 keyset cursor 轉成封存檔查詢用的 (datetime, Transaction_ID)"""
+    try:
+        return datetime.fromisoformat(str(params["cursor_time"])), int(params["cursor_id"])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def archived_rows(archive, limit, **filters):
+    """依 (Time, Transaction_ID) 順序從封存檔取出最多 limit 筆，欄位順序與 MySQL 查詢相同"""
+    rows = []
+    for chunk in archive.scan(chunk_rows=limit, **filters):
+        rows.extend(chunk)
+        if len(rows) >= limit:
+            break
+    return rows[:limit]
+
+
+def parse_sale(item):
+    """驗證並轉換一筆 POS 交易，格式錯誤時拋出 ValueError"""
+    if not isinstance(item, dict):
+        raise ValueError("Each transaction must be a JSON object")
+
+    store_name = item.get('store_name')
+    payment = item.get('payment')
+    if not store_name or not isinstance(store_name, str):
+        raise ValueError("store_name is required")
+    if not payment or not isinstance(payment, str):
+        raise ValueError("payment is required")
+
+    try:
+        sale_time = datetime.fromisoformat(str(item.get('time')))
+    except ValueError:
+        raise ValueError("time must be formatted as YYYY-MM-DD HH:MM:SS[.ffffff]")
+
+    try:
+        price = Decimal(str(item.get('price')))
+    except InvalidOperation:
+        raise ValueError("price must be a number")
+    if not price.is_finite() or price < 0:
+        raise ValueError("price must be a non-negative number")
+
+    return {
+        "store_name": store_name,
+        "time": sale_time,
+        "price": price,
+        "payment": payment
+    }
+
 @transactions_bp.route('/transactions-by-date', methods=['GET'])
 def get_transactions_by_date():
     """
     查詢特定日期的交易
     
-    透過 query string 接收參數 date（格式 YYYY-MM-DD），自動組合出當天的起始與結束時間 (00:00:00 ~ 23:59:59)，
-    並從 Shopping_Sheet 資料表中篩選所有落在該日期的交易記錄。
+    透過 query string 接收參數 date（格式 YYYY-MM-DD），自動組合出當天的起始時間與隔天的起始時間（半開區間），
+    並從 Shopping_Sheet 資料表中篩選所有落在該日期的交易記錄；日期早於封存 horizon 時改由冷資料層的封存檔讀取。
+    結果依 (Time, Transaction_ID) 排序並以 keyset 分頁：每頁最多 limit 筆，回應中的 next_cursor 帶入下一次請求的 cursor 即可取得下一頁，
+    任何一頁的查詢成本都與第一頁相同。
     例如: 2024-05-28
     ---
     tags:
@@ -23,19 +97,34 @@ def get_transactions_by_date():
         type: string
         required: true
         description: "欲查詢的日期 (格式 YYYY-MM-DD)"
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+        description: "每頁筆數 (1 ~ 1000)"
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: "上一頁回應中的 next_cursor"
     responses:
       200:
         description: 成功返回該日期的交易記錄列表
         examples:
           application/json:
-            [
-              {
-                "store_name": "商店1",
-                "time": "2024-12-15 12:20:48",
-                "price": 3590,
-                "payment": "credit card"
-              }
-            ]
+            {
+              "items": [
+                {
+                  "transaction_id": 1024,
+                  "store_name": "商店1",
+                  "time": "2024-12-15 12:20:48",
+                  "price": 3590,
+                  "payment": "credit card"
+                }
+              ],
+              "next_cursor": "WyIyMDI0LTEyLTE1IDEyOjIwOjQ4Iiwi5ZWG5bqXMSJd"
+            }
       400:
         description: 缺少參數或請求無效
         examples:
@@ -60,37 +149,81 @@ def get_transactions_by_date():
         input_date = request.args.get('date')
         if not input_date:
             return jsonify({"error": "Date is required"}), 400
-        
-        # 組合當天的起止時間
-        date_start = f"{input_date} 00:00:00"
-        date_end = f"{input_date} 23:59:59"
-
-        # Shopping_Sheet 表中包含交易紀錄
-        query = text("""
-            SELECT Store_Name, Time, Price, Payment
-            FROM Shopping_Sheet
-            WHERE Time BETWEEN :date_start AND :date_end
-            ORDER BY Time;
-        """)
-        results = db.session.execute(query, {"date_start": date_start, "date_end": date_end}).fetchall()
 
-        if not results:
+        date_value = parse_date(input_date, 'date')
+        limit = parse_limit(request.args)
+        cursor = request.args.get('cursor')
+
+        # 組合當天起始與隔天起始的半開區間
+        params = {
+            "date_start": str(date_value),
+            "date_end": str(date_value + timedelta(days=1)),
+            "limit": limit + 1
+        }
+
+        if cursor:
+            params["cursor_time"], params["cursor_id"] = decode_cursor(cursor, 2)
+
+        archive = get_archive(current_app._get_current_object())
+        if archive.covers(date_value):
+            # 封存 horizon 為月初，同一天的交易不是全部在封存檔就是全部在 MySQL
+            results = archived_rows(
+                archive, limit + 1,
+                date_start=date_value, date_end=date_value + timedelta(days=1),
+                after=cursor_after(params) if cursor else None
+            )
+        # Shopping_Sheet 表中包含交易紀錄，以 (Time) 索引做 keyset 分頁
+        # 列建構子比較無法用於分區修剪，另加 Time >= :cursor_time 讓之後的頁面略過較早的月份分區
+        elif cursor:
+            query = text("""
+                SELECT Transaction_ID, Store_Name, Time, Price, Payment
+                FROM Shopping_Sheet
+                WHERE Time >= :date_start
+                  AND Time < :date_end
+                  AND (Time, Transaction_ID) > (:cursor_time, :cursor_id)
+                  AND Time >= :cursor_time
+                ORDER BY Time, Transaction_ID
+                LIMIT :limit;
+            """)
+            results = db.session.execute(query, params).fetchall()
+        else:
+            query = text("""
+                SELECT Transaction_ID, Store_Name, Time, Price, Payment
+                FROM Shopping_Sheet
+                WHERE Time >= :date_start
+                  AND Time < :date_end
+                ORDER BY Time, Transaction_ID
+                LIMIT :limit;
+            """)
+            results = db.session.execute(query, params).fetchall()
+
+        if not results and not cursor:
             return jsonify({"error": f"No transactions found for date: {input_date}"}), 404
 
+        page, next_cursor = paginate(results, limit, transaction_key)
+
         transactions = []
-        for row in results:
+        for row in page:
             transactions.append({
-                "store_name": row[0],
-                "time": str(row[1]),
-                "price": float(row[2]),
-                "payment": row[3]
+                "transaction_id": row[0],
+                "store_name": row[1],
+                "time": str(row[2]),
+                "price": float(row[3]),
+                "payment": row[4]
             })
 
-        json_str = json.dumps(transactions, ensure_ascii=False)
+        data = {
+            "items": transactions,
+            "next_cursor": next_cursor
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
         response = make_response(json_str, 200)
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
         return response
-    
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
@@ -101,7 +234,8 @@ def get_transactions_by_payment():
     查詢特定付款方式的交易
 
     透過 query string 接收參數 payment（例如 "credit card", "cash" 等），
-    從 Shopping_Sheet 資料表中篩選對應付款方式的交易紀錄並按時間排序返回。
+    從封存檔與 Shopping_Sheet 資料表中篩選對應付款方式的交易紀錄並按時間排序返回。
+    結果依 (Time, Transaction_ID) 以 keyset 分頁，每頁最多 limit 筆，以回應中的 next_cursor 取得下一頁。
     例如: credit card
     ---
     tags:
@@ -114,19 +248,34 @@ def get_transactions_by_payment():
         type: string
         required: true
         description: "付款方式"
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+        description: "每頁筆數 (1 ~ 1000)"
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: "上一頁回應中的 next_cursor"
     responses:
       200:
         description: 成功返回特定付款方式的交易記錄
         examples:
           application/json:
-            [
-              {
-                "store_name": "商店1",
-                "time": "2024-12-15 12:20:48",
-                "price": 3590,
-                "payment": "credit card"
-              }
-            ]
+            {
+              "items": [
+                {
+                  "transaction_id": 1024,
+                  "store_name": "商店1",
+                  "time": "2024-12-15 12:20:48",
+                  "price": 3590,
+                  "payment": "credit card"
+                }
+              ],
+              "next_cursor": null
+            }
       400:
         description: 缺少參數或請求無效
         examples:
@@ -151,31 +300,354 @@ def get_transactions_by_payment():
         payment = request.args.get('payment')
         if not payment:
             return jsonify({"error": "Payment method is required"}), 400
-        
-        query = text("""
-            SELECT Store_Name, Time, Price, Payment
-            FROM Shopping_Sheet
-            WHERE Payment = :payment
-            ORDER BY Time;
-        """)
-        results = db.session.execute(query, {"payment": payment}).fetchall()
 
-        if not results:
+        limit = parse_limit(request.args)
+        cursor = request.args.get('cursor')
+        params = {"payment": payment}
+        if cursor:
+            params["cursor_time"], params["cursor_id"] = decode_cursor(cursor, 2)
+
+        # 封存 horizon 之前的交易全部排在 MySQL 中的交易之前：先讀封存檔，不足一頁再由 MySQL 補齊
+        archive = get_archive(current_app._get_current_object())
+        horizon = archive.horizon
+        results = []
+        if horizon is not None:
+            results = archived_rows(archive, limit + 1, payment=payment,
+                                    after=cursor_after(params) if cursor else None)
+        params["hot_start"] = str(horizon) if horizon else HOT_START_FLOOR
+        params["limit"] = limit + 1 - len(results)
+
+        # 以 (Payment, Time) 索引做 keyset 分頁
+        if params["limit"] > 0:
+            if cursor:
+                query = text("""
+                    SELECT Transaction_ID, Store_Name, Time, Price, Payment
+                    FROM Shopping_Sheet
+                    WHERE Payment = :payment
+                      AND Time >= :hot_start
+                      AND (Time, Transaction_ID) > (:cursor_time, :cursor_id)
+                      AND Time >= :cursor_time
+                    ORDER BY Time, Transaction_ID
+                    LIMIT :limit;
+                """)
+            else:
+                query = text("""
+                    SELECT Transaction_ID, Store_Name, Time, Price, Payment
+                    FROM Shopping_Sheet
+                    WHERE Payment = :payment
+                      AND Time >= :hot_start
+                    ORDER BY Time, Transaction_ID
+                    LIMIT :limit;
+                """)
+            results += db.session.execute(query, params).fetchall()
+
+        if not results and not cursor:
             return jsonify({"error": f"No transactions found for payment: {payment}"}), 404
 
+        page, next_cursor = paginate(results, limit, transaction_key)
+
         transactions = []
-        for row in results:
+        for row in page:
             transactions.append({
-                "store_name": row[0],
-                "time": str(row[1]),
-                "price": float(row[2]),
-                "payment": row[3]
+                "transaction_id": row[0],
+                "store_name": row[1],
+                "time": str(row[2]),
+                "price": float(row[3]),
+                "payment": row[4]
             })
 
-        json_str = json.dumps(transactions, ensure_ascii=False)
+        data = {
+            "items": transactions,
+            "next_cursor": next_cursor
+        }
+
+        json_str = json.dumps(data, ensure_ascii=False)
         response = make_response(json_str, 200)
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
         return response
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": "Internal server error", "details": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@transactions_bp.route('/transactions/export', methods=['GET'])
+def export_transactions():
+    """
+    匯出指定區間的交易明細（串流輸出）
+
+    依 from ~ to 日期區間（可再以 store、branch、payment 篩選）匯出 Shopping_Sheet 的交易明細，
+    以 NDJSON（每行一筆 JSON）或 CSV 格式分段串流回傳。
+    查詢使用不緩衝的伺服器端游標 (stream_results)，每次只取回 EXPORT_CHUNK_ROWS 筆並立即輸出，
+    不論區間內有一千筆還是五千萬筆，記憶體用量都維持固定。區間早於封存 horizon 的部分先由封存檔依序輸出。
+    例如: from=2024-05-01, to=2024-05-31, format=csv
+    ---
+    tags:
+      - Transactions API
+    summary: "串流匯出交易明細"
+    description: "依日期區間與選用的商店、分店、付款方式篩選，以 NDJSON 或 CSV 串流匯出交易明細，依交易時間排序。"
+    produces:
+      - application/x-ndjson
+      - text/csv
+    parameters:
+      - name: from
+        in: query
+        type: string
+        required: true
+        description: "起始日期 (格式 YYYY-MM-DD，含)"
+      - name: to
+        in: query
+        type: string
+        required: true
+        description: "結束日期 (格式 YYYY-MM-DD，含)"
+      - name: store
+        in: query
+        type: string
+        required: false
+        description: "商店名稱"
+      - name: branch
+        in: query
+        type: string
+        required: false
+        description: "分店名稱"
+      - name: payment
+        in: query
+        type: string
+        required: false
+        description: "付款方式"
+      - name: format
+        in: query
+        type: string
+        required: false
+        enum: [ndjson, csv]
+        default: ndjson
+        description: "輸出格式"
+    responses:
+      200:
+        description: 成功開始串流輸出交易明細
+        examples:
+          application/x-ndjson: |
+            {"transaction_id": 1024, "store_name": "商店1", "branch_name": "台北忠孝館", "time": "2024-05-28 12:20:48", "price": 3590.0, "payment": "credit card"}
+      400:
+        description: 缺少參數或請求無效
+        examples:
+          application/json:
+            {"error": "Both from and to are required (YYYY-MM-DD)"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        date_start, date_end = parse_date_range(request.args)
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({"error": "format must be ndjson or csv"}), 400
+
+        store = request.args.get('store')
+        branch = request.args.get('branch')
+        payment = request.args.get('payment')
+
+        # 只組合白名單內的篩選條件，參數一律以 bind parameter 傳入
+        conditions = ["SS.Time >= :date_start", "SS.Time < :date_end"]
+        params = {"date_start": str(date_start), "date_end": str(date_end)}
+        if store:
+            conditions.append("SS.Store_Name = :store")
+            params["store"] = store
+        if branch:
+            conditions.append("S.Branch_Name = :branch")
+            params["branch"] = branch
+        if payment:
+            conditions.append("SS.Payment = :payment")
+            params["payment"] = payment
+
+        query = text(f"""
+            SELECT SS.Transaction_ID, SS.Store_Name, S.Branch_Name, SS.Time, SS.Price, SS.Payment
+            FROM Shopping_Sheet SS
+            JOIN Shops S ON SS.Store_Name = S.Store_Name
+            WHERE {" AND ".join(conditions)}
+            ORDER BY SS.Time, SS.Transaction_ID;
+        """)
+
+        # 封存 horizon 之前的部分由封存檔輸出，MySQL 只查詢 horizon 之後；horizon 只讀一次，避免兩邊重疊
+        archive = get_archive(current_app._get_current_object())
+        horizon = archive.horizon
+        archive_end = None
+        if horizon is not None and date_start < horizon:
+            archive_end = min(date_end, horizon)
+            params["date_start"] = str(max(date_start, horizon))
+            branches = dict(db.session.execute(text("SELECT Store_Name, Branch_Name FROM Shops;")).fetchall())
+            if store:
+                archive_stores = [store] if not branch or branches.get(store) == branch else []
+            elif branch:
+                archive_stores = [name for name, branch_name in branches.items() if branch_name == branch]
+            else:
+                archive_stores = None
+
+        def format_rows(rows):
+            buffer = io.StringIO()
+            if export_format == 'csv':
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow([row[0], row[1], row[2], str(row[3]), row[4], row[5]])
+            else:
+                for row in rows:
+                    buffer.write(json.dumps({
+                        "transaction_id": row[0],
+                        "store_name": row[1],
+                        "branch_name": row[2],
+                        "time": str(row[3]),
+                        "price": float(row[4]) if row[4] is not None else None,
+                        "payment": row[5]
+                    }, ensure_ascii=False))
+                    buffer.write('\n')
+            return buffer.getvalue()
+
+        def generate():
+            if export_format == 'csv':
+                # 加上 BOM 讓試算表軟體以 UTF-8 正確顯示中文
+                yield '\ufeff' + ','.join(EXPORT_COLUMNS) + '\r\n'
+            if archive_end is not None:
+                for chunk in archive.scan(date_start, archive_end, stores=archive_stores,
+                                          payment=payment or None, chunk_rows=EXPORT_CHUNK_ROWS):
+                    # 與 MySQL 查詢的 JOIN Shops 一致，略過已刪除的商店
+                    yield format_rows([(row[0], row[1], branches[row[1]], row[2], row[3], row[4])
+                                       for row in chunk if row[1] in branches])
+            # 自行取得連線並在串流結束（或用戶端中斷）時釋放
+            with db.engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS).execute(query, params)
+                for rows in result.partitions():
+                    yield format_rows(rows)
+
+        if export_format == 'csv':
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            content_type = 'application/x-ndjson; charset=utf-8'
+        filename = f"transactions_{date_start}_{date_end - timedelta(days=1)}.{export_format}"
+
+        response = Response(stream_with_context(generate()), content_type=content_type)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # 避免 nginx 將整個回應緩衝後才送出
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@transactions_bp.route('/transactions', methods=['POST'])
+def create_transactions():
+    """
+    寫入 POS 交易（單筆或多筆）
+
+    接收單筆交易物件或交易陣列，放入本 worker 的群組提交佇列。背景執行緒每累積 INGEST_BATCH_SIZE 筆
+    或等待超過 INGEST_FLUSH_MS 毫秒即以一個多列 INSERT 寫入並提交，請求在所屬批次提交後才返回 201。
+    佇列滿載時返回 503 並附 Retry-After，收銀端應稍後重送。
+    ---
+    tags:
+      - Transactions API
+    summary: "寫入 POS 交易"
+    description: "以群組提交批次寫入 Shopping_Sheet，回應代表資料已提交。"
+    consumes:
+      - application/json
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: array
+          items:
+            type: object
+            required: [store_name, time, price, payment]
+            properties:
+              store_name:
+                type: string
+                example: "23區_台北忠孝館"
+              time:
+                type: string
+                example: "2024-05-29 19:24:05.250000"
+              price:
+                type: number
+                example: 8680
+              payment:
+                type: string
+                example: "credit card"
+    responses:
+      201:
+        description: 交易已寫入並提交
+        examples:
+          application/json:
+            {"accepted": 2}
+      400:
+        description: 請求格式錯誤
+        examples:
+          application/json:
+            {"error": "Invalid transaction at index 0: store_name is required"}
+      409:
+        description: 資料庫拒絕寫入（例如商店不存在）
+        examples:
+          application/json:
+            {"error": "Transaction rejected by database", "details": "詳細錯誤資訊"}
+      503:
+        description: 寫入佇列已滿，請稍後重試
+        examples:
+          application/json:
+            {"error": "Ingest queue is full (20000 rows pending)"}
+      500:
+        description: 內部伺服器錯誤
+        examples:
+          application/json:
+            {
+              "error": "Internal server error",
+              "details": "詳細錯誤資訊"
+            }
+    """
+
+    try:
+        payload = request.get_json(silent=True)
+        if payload is None:
+            return jsonify({"error": "Request body must be JSON"}), 400
+
+        items = payload if isinstance(payload, list) else [payload]
+        if not items:
+            return jsonify({"error": "No transactions provided"}), 400
+        max_rows = current_app.config['INGEST_MAX_ROWS_PER_REQUEST']
+        if len(items) > max_rows:
+            return jsonify({"error": f"At most {max_rows} transactions per request"}), 400
+
+        # 已封存的月份在 MySQL 中不再被查詢，寫入的交易會讀不到，因此直接拒絕
+        horizon = get_archive(current_app._get_current_object()).horizon
+        rows = []
+        for index, item in enumerate(items):
+            try:
+                sale = parse_sale(item)
+                if horizon is not None and sale["time"].date() < horizon:
+                    raise ValueError(f"time falls in an archived month (before {horizon})")
+                rows.append(sale)
+            except ValueError as e:
+                return jsonify({"error": f"Invalid transaction at index {index}: {e}"}), 400
+
+        batcher = get_batcher(current_app._get_current_object())
+        accepted = batcher.submit(rows, ack_timeout=current_app.config['INGEST_ACK_TIMEOUT'])
+
+        return jsonify({"accepted": accepted}), 201
+
+    except IngestQueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    except IngestTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except IntegrityError as e:
+        # 例如商店不存在（外鍵）
+        return jsonify({"error": "Transaction rejected by database", "details": str(e.orig)}), 409
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
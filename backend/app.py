@@ -4,6 +4,7 @@ from flask import Flask, render_template
 from flasgger import Swagger
 
 from api.routes import register_blueprints  # Blueprint 註冊器
+from commands.cli import register_commands  # CLI 指令註冊器
 from config import config
 from models.models import db
 
@@ -17,6 +18,7 @@ def create_app(config_name='default'):
     db.init_app(app)
 
     register_blueprints(app)
+    register_commands(app)
 
     swagger = Swagger(app)
 
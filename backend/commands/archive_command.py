@@ -0,0 +1,37 @@
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from services.partitions import month_start
+from services.transaction_archive import archive_closed_partitions, get_archive
+
+archive_cli = AppGroup('archive', help='歷史交易冷資料層 (ARCHIVE_DIR) 維護指令')
+
+
+@archive_cli.command('transactions')
+@click.option('--hot-days', default=None, type=int, help='保留在 MySQL 的天數，預設取 ARCHIVE_HOT_DAYS')
+@click.option('--today', default=None, help='以指定日期 (YYYY-MM-DD) 計算，預設為今天')
+@click.option('--dry-run', is_flag=True, help='只列出將搬移的分區')
+def archive_transactions(hot_days, today, dry_run):
+    """
+    將完全落在熱資料窗口之前的 Shopping_Sheet 月份分區搬到欄式封存檔，並刪除該分區
+
+    交易 API 查詢到 horizon 之前的區間時會自動讀取封存檔。建議每月以排程執行一次：
+    flask --app app archive transactions
+    """
+    app = current_app._get_current_object()
+    try:
+        today = date.fromisoformat(today) if today else datetime.now().date()
+    except ValueError:
+        raise click.BadParameter("Invalid date format. Use YYYY-MM-DD.", param_hint='--today')
+    hot_days = hot_days if hot_days is not None else app.config['ARCHIVE_HOT_DAYS']
+
+    archive = get_archive(app)
+    cutoff = month_start(today - timedelta(days=hot_days))
+    moved = archive_closed_partitions(archive, cutoff, dry_run=dry_run, echo=click.echo)
+    if not moved:
+        click.echo(f"Nothing to archive before {cutoff}")
+    elif not dry_run:
+        click.echo(f"Archive horizon is now {archive.horizon}")
@@ -0,0 +1,181 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from models.models import db
+from services.ingest_batcher import INSERT_TRANSACTIONS_SQL, GroupCommitBatcher
+from services.stock import InsufficientStock, decrement_stock
+
+bench_cli = AppGroup('bench', help='效能基準測試（會寫入並清除測試資料，請勿在正式環境執行）')
+
+# 測試資料以此付款方式與遠未來時間標記，結束後一併刪除
+BENCH_PAYMENT = '__bench__'
+BENCH_EPOCH = datetime(2099, 1, 1)
+BENCH_GOODS = '__bench_stock__'
+
+
+def _run_clients(clients, work):
+    """啟動 clients 個執行緒各自執行 work(client_index)，回傳總耗時（秒）"""
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def _bench_rows(store_name, offset, count):
+    return [{
+        "store_name": store_name,
+        "time": BENCH_EPOCH + timedelta(seconds=offset + i),
+        "price": Decimal('100.00'),
+        "payment": BENCH_PAYMENT
+    } for i in range(count)]
+
+
+def _cleanup_ingest():
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM Shopping_Sheet WHERE Payment = :payment AND Time >= :epoch;"),
+                     {"payment": BENCH_PAYMENT, "epoch": BENCH_EPOCH})
+        conn.execute(text("DELETE FROM Store_Daily_Revenue WHERE Payment = :payment;"),
+                     {"payment": BENCH_PAYMENT})
+
+
+@bench_cli.command('ingest')
+@click.option('--rows', default=5000, show_default=True, help='每種寫入方式的總筆數')
+@click.option('--clients', default=16, show_default=True, help='同時送出交易的用戶端數量')
+@click.option('--batch-size', default=None, type=int, help='群組提交每批筆數，預設取 INGEST_BATCH_SIZE')
+@click.option('--flush-ms', default=None, type=int, help='群組提交最長等待毫秒數，預設取 INGEST_FLUSH_MS')
+def bench_ingest(rows, clients, batch_size, flush_ms):
+    """
+    比較「每筆交易一個 INSERT + COMMIT」與群組提交的寫入吞吐量
+
+    兩種方式都由 clients 個執行緒各送出 rows / clients 筆單筆交易，模擬收銀機逐筆上傳。
+    """
+    app = current_app._get_current_object()
+    store_name = db.session.execute(text("SELECT Store_Name FROM Shops LIMIT 1;")).scalar()
+    if store_name is None:
+        raise click.ClickException("Shops table is empty")
+    per_client = rows // clients
+
+    def single_insert(client):
+        with app.app_context():
+            for row in _bench_rows(store_name, client * per_client, per_client):
+                with db.engine.begin() as conn:
+                    conn.execute(INSERT_TRANSACTIONS_SQL, row)
+
+    batcher = GroupCommitBatcher(
+        app,
+        batch_size=batch_size or app.config['INGEST_BATCH_SIZE'],
+        flush_ms=flush_ms if flush_ms is not None else app.config['INGEST_FLUSH_MS'],
+        max_queued_rows=app.config['INGEST_MAX_QUEUED_ROWS'],
+        enqueue_timeout=app.config['INGEST_ENQUEUE_TIMEOUT'],
+    )
+    batched_offset = clients * per_client
+
+    def group_commit(client):
+        for row in _bench_rows(store_name, batched_offset + client * per_client, per_client):
+            batcher.submit([row])
+
+    total = clients * per_client
+    try:
+        single_elapsed = _run_clients(clients, single_insert)
+        batched_elapsed = _run_clients(clients, group_commit)
+    finally:
+        _cleanup_ingest()
+
+    click.echo(f"{total} rows, {clients} clients")
+    click.echo(f"one INSERT per request : {single_elapsed:8.2f}s  {total / single_elapsed:10.0f} rows/s")
+    click.echo(f"group commit           : {batched_elapsed:8.2f}s  {total / batched_elapsed:10.0f} rows/s")
+    click.echo(f"speedup                : {single_elapsed / batched_elapsed:8.1f}x")
+
+
+def _bench_stock(store_name, stock):
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO Goods (Store_Name, Name, Stock_Quantity, Price)
+            VALUES (:store_name, :goods_name, :stock, 0)
+            ON DUPLICATE KEY UPDATE Stock_Quantity = VALUES(Stock_Quantity);
+        """), {"store_name": store_name, "goods_name": BENCH_GOODS, "stock": stock})
+
+
+def _read_bench_stock(store_name):
+    with db.engine.connect() as conn:
+        return conn.execute(text("SELECT Stock_Quantity FROM Goods WHERE Store_Name = :store_name AND Name = :goods_name;"),
+                            {"store_name": store_name, "goods_name": BENCH_GOODS}).scalar()
+
+
+def _cleanup_stock(store_name):
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM Goods WHERE Store_Name = :store_name AND Name = :goods_name;"),
+                     {"store_name": store_name, "goods_name": BENCH_GOODS})
+
+
+@bench_cli.command('stock')
+@click.option('--ops', default=5000, show_default=True, help='每種寫入方式的總扣除次數')
+@click.option('--clients', default=32, show_default=True, help='同時扣同一商品庫存的用戶端數量')
+def bench_stock(ops, clients):
+    """
+    比較熱門商品在大量並行結帳下的扣庫存吞吐量
+
+    所有用戶端對同一個測試商品每次扣 1：條件式 UPDATE（POST /goods/stock/decrement 的做法）與
+    SELECT ... FOR UPDATE 後寫回的讀取-修改-寫入。結束後檢查剩餘庫存，確認沒有遺失或重複扣除。
+    """
+    app = current_app._get_current_object()
+    store_name = db.session.execute(text("SELECT Store_Name FROM Shops LIMIT 1;")).scalar()
+    if store_name is None:
+        raise click.ClickException("Shops table is empty")
+    per_client = ops // clients
+    total = clients * per_client
+    rejected = [0] * clients
+
+    def conditional_update(client):
+        with app.app_context():
+            for _ in range(per_client):
+                try:
+                    decrement_stock(store_name, [(BENCH_GOODS, 1)])
+                except InsufficientStock:
+                    rejected[client] += 1
+
+    def locking_read(client):
+        with app.app_context():
+            for _ in range(per_client):
+                with db.engine.begin() as conn:
+                    params = {"store_name": store_name, "goods_name": BENCH_GOODS}
+                    stock = conn.execute(text("""
+                        SELECT Stock_Quantity FROM Goods
+                        WHERE Store_Name = :store_name AND Name = :goods_name
+                        FOR UPDATE;
+                    """), params).scalar()
+                    if stock < 1:
+                        rejected[client] += 1
+                        continue
+                    conn.execute(text("""
+                        UPDATE Goods SET Stock_Quantity = :stock
+                        WHERE Store_Name = :store_name AND Name = :goods_name;
+                    """), dict(params, stock=stock - 1))
+
+    results = []
+    try:
+        for label, work in (("conditional UPDATE     ", conditional_update),
+                            ("SELECT FOR UPDATE + set", locking_read)):
+            _bench_stock(store_name, total)
+            rejected[:] = [0] * clients
+            elapsed = _run_clients(clients, work)
+            remaining = _read_bench_stock(store_name)
+            results.append((label, elapsed, remaining, sum(rejected)))
+    finally:
+        _cleanup_stock(store_name)
+
+    click.echo(f"{total} decrements of one SKU, {clients} clients")
+    for label, elapsed, remaining, rejected_count in results:
+        consistent = "ok" if remaining == rejected_count else f"MISMATCH (remaining {remaining})"
+        click.echo(f"{label}: {elapsed:8.2f}s  {total / elapsed:10.0f} ops/s  rejected {rejected_count}  {consistent}")
+    click.echo(f"speedup                : {results[1][1] / results[0][1]:8.1f}x")
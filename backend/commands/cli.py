@@ -0,0 +1,19 @@
+from commands.archive_command import archive_cli
+from commands.bench_command import bench_cli
+from commands.explain_command import explain_cli
+from commands.forecast_command import forecast_cli
+from commands.goods_command import goods_cli
+from commands.load_command import load_cli
+from commands.partition_command import partitions_cli
+from commands.rollup_command import rollup_cli
+
+
+def register_commands(app):
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(bench_cli)
+    app.cli.add_command(load_cli)
+    app.cli.add_command(explain_cli)
+    app.cli.add_command(partitions_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(forecast_cli)
+    app.cli.add_command(goods_cli)
@@ -0,0 +1,72 @@
+import os
+
+import click
+from flask.cli import AppGroup
+
+from models.models import db
+from services.explain_gate import collect_queries, explain, load_samples
+from services.partitions import partition_counts
+
+explain_cli = AppGroup('explain', help='API 查詢的執行計畫檢查')
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(BACKEND_DIR, 'api')
+SERVICES_DIR = os.path.join(BACKEND_DIR, 'services')
+
+
+@explain_cli.command('gate')
+@click.option('--max-rows', default=1000, show_default=True, help='全表掃描允許的最大估計列數')
+@click.option('--include-index-scans', is_flag=True, help='完整索引掃描 (type=index) 也視為違規')
+@click.option('--check-pruning/--no-check-pruning', default=True, show_default=True,
+              help='以 Time 範圍篩選分區表的查詢，EXPLAIN 必須只讀取部分分區')
+@click.option('--verbose', is_flag=True, help='列出每個查詢的 EXPLAIN 結果')
+def gate(max_rows, include_index_scans, check_pruning, verbose):
+    """
+    對所有 blueprint 與 services 中的 text() 查詢執行 EXPLAIN，任一查詢全表掃描超過 --max-rows 列，
+    或以 Time 範圍篩選分區表卻未修剪分區即失敗
+
+    需連線至已載入種子資料的資料庫，適合放在 CI 中：
+    flask --app app explain gate --max-rows 1000
+    """
+    # 端點的查詢多半放在 services 的模組中，兩個套件都要收集；相同的 SQL 只檢查一次
+    queries, skipped = collect_queries(API_DIR, 'api')
+    seen = {query.sql for query in queries}
+    service_queries, service_skipped = collect_queries(SERVICES_DIR, 'services')
+    queries += [query for query in service_queries if query.sql not in seen]
+    skipped += service_skipped
+    samples = load_samples()
+    counts = partition_counts() if check_pruning else None
+
+    failures = 0
+    for query in queries:
+        try:
+            violations, unknown, rows = explain(query, samples, max_rows, include_index_scans, counts)
+        except Exception as e:
+            db.session.rollback()
+            failures += 1
+            click.echo(f"ERROR {query.origin}: {e}")
+            continue
+
+        if unknown:
+            click.echo(f"WARN  {query.origin}: no sample value for {', '.join(sorted(unknown))}, used NULL")
+        if verbose:
+            click.echo(f"----  {query.origin}")
+            for row in rows:
+                click.echo(f"      {row.get('table')}: type={row.get('type')} key={row.get('key')} "
+                           f"rows={row.get('rows')} partitions={row.get('partitions')}")
+        for violation in violations:
+            failures += 1
+            suggestion = f", suggested {violation['suggestion']}" if violation['suggestion'] else ''
+            if violation['kind'] == 'no_pruning':
+                click.echo(f"FAIL  {query.origin}: no partition pruning on {violation['table']} "
+                           f"(partitions={violation['partitions']}){suggestion}")
+            else:
+                click.echo(f"FAIL  {query.origin}: full scan of {violation['table']} "
+                           f"(type={violation['type']}, ~{violation['rows']} rows){suggestion}")
+
+    for origin in skipped:
+        click.echo(f"SKIP  {origin}: query text is built at runtime")
+
+    click.echo(f"{len(queries)} queries checked, {failures} failed, {len(skipped)} skipped")
+    if failures:
+        raise SystemExit(1)
@@ -0,0 +1,31 @@
+import time
+from datetime import date, datetime
+
+import click
+from flask.cli import AppGroup
+
+from services.revenue_forecast import refresh_forecasts
+
+forecast_cli = AppGroup('forecast', help='各商店營業額預測 (Revenue_Forecast) 維護指令')
+
+
+@forecast_cli.command('refresh')
+@click.option('--today', default=None, help='預測起點 (YYYY-MM-DD)，只使用前一天以前的資料，預設為今天')
+@click.option('--full', is_flag=True, help='忽略既有模型狀態，所有商店重新挑選參數並擬合')
+def refresh(today, full):
+    """
+    更新所有商店的每日營業額預測（Holt-Winters 與移動平均）
+
+    已有模型狀態的商店只吸收上次執行後新結束的日子，建議每天營業結束後以排程執行一次：
+    flask --app app forecast refresh
+    """
+    try:
+        today = date.fromisoformat(today) if today else datetime.now().date()
+    except ValueError:
+        raise click.BadParameter("Invalid date format. Use YYYY-MM-DD.", param_hint='--today')
+
+    started = time.perf_counter()
+    result = refresh_forecasts(today, full=full, echo=click.echo)
+    elapsed = time.perf_counter() - started
+    click.echo(f"Forecast {result['stores']} stores as of {result['as_of']} "
+               f"({result['refit']} refit, {result['incremental']} incremental) in {elapsed:.2f}s")
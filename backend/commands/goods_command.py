@@ -0,0 +1,23 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from services.goods_search import prune_goods_changes
+
+goods_cli = AppGroup('goods', help='商品資料 (Goods) 維護指令')
+
+
+@goods_cli.command('prune-changes')
+@click.option('--hours', type=int, default=None, help='保留的小時數，預設為 GOODS_CHANGE_RETENTION_HOURS')
+def prune_changes(hours):
+    """
+    清除過期的 Goods_Change 異動紀錄
+
+    各 worker 的商品搜尋索引只需要上次追趕之後的紀錄，建議以排程每小時執行一次：
+    flask --app app goods prune-changes
+    """
+    hours = hours if hours is not None else current_app.config['GOODS_CHANGE_RETENTION_HOURS']
+    if hours < 1:
+        raise click.BadParameter("must be at least 1", param_hint='--hours')
+    deleted = prune_goods_changes(hours)
+    click.echo(f"Deleted {deleted} goods change rows older than {hours}h")
@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import create_engine, text
+
+from services.bulk_loader import TARGETS, BulkLoader
+from services.transaction_archive import get_archive
+
+load_cli = AppGroup('load', help='以 CSV / NDJSON 檔案大量載入交易與進貨明細')
+
+
+def _detect_format(path, file_format):
+    if file_format:
+        return file_format
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def _run(target_name, path, file_format, batch_size, parallel, local_infile, job, rejects):
+    uri = current_app.config['SQLALCHEMY_DATABASE_URI']
+    engine = create_engine(uri, pool_size=max(parallel, 1) + 1,
+                           connect_args={'local_infile': True} if local_infile else {})
+
+    if local_infile:
+        with engine.connect() as conn:
+            enabled = conn.execute(text("SELECT @@GLOBAL.local_infile;")).scalar()
+        if not enabled:
+            click.echo("local_infile is disabled on the server, falling back to batched INSERT")
+            local_infile = False
+
+    # 預設以檔案絕對路徑與大小識別同一次載入，續傳時需使用相同的 --parallel
+    stat = os.stat(path)
+    path_digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    job = job or f"{target_name}:{os.path.basename(path)[:100]}:{path_digest}:{stat.st_size}"
+
+    # 封存分界日在整次載入中只讀取一次；之前的交易與 POST /transactions 一樣視為驗證失敗
+    horizon = get_archive(current_app._get_current_object()).horizon if target_name == 'transactions' else None
+
+    loader = BulkLoader(engine, TARGETS[target_name], batch_size=batch_size,
+                        use_local_infile=local_infile, echo=click.echo)
+    try:
+        summary = loader.run(path, _detect_format(path, file_format), job, parallel=parallel, rejects_path=rejects,
+                             horizon=horizon)
+    finally:
+        engine.dispose()
+
+    click.echo(
+        f"Loaded {summary['loaded']} rows in {summary['seconds']:.1f}s "
+        f"({summary['rows_per_second']:.0f} rows/s), "
+        f"skipped {summary['skipped']} already loaded, rejected {summary['rejected']}"
+    )
+    if summary['rejected']:
+        click.echo(f"Rejected rows written to {summary['rejects_path']}")
+
+
+def load_options(command):
+    command = click.argument('path', type=click.Path(exists=True, dir_okay=False))(command)
+    command = click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), default=None,
+                           help='檔案格式，預設依副檔名判斷')(command)
+    command = click.option('--batch-size', default=10000, show_default=True, help='每個交易寫入的筆數')(command)
+    command = click.option('--parallel', default=1, show_default=True, help='依商店切分後平行載入的份數')(command)
+    command = click.option('--local-infile', is_flag=True, help='伺服器允許時改用 LOAD DATA LOCAL INFILE')(command)
+    command = click.option('--job', default=None, help='續傳用的工作名稱，預設由檔案路徑與大小產生')(command)
+    command = click.option('--rejects', default=None, help='驗證失敗資料的輸出檔，預設為 <path>.rejects.ndjson')(command)
+    return command
+
+
+@load_cli.command('transactions')
+@load_options
+def load_transactions(path, file_format, batch_size, parallel, local_infile, job, rejects):
+    """
+    載入交易資料至 Shopping_Sheet
+
+    欄位: store_name, time, price, payment；時間早於封存分界日的交易會寫入 rejects 檔
+    例如: flask --app app load transactions sales_2024.csv --parallel 4
+    """
+    _run('transactions', path, file_format, batch_size, parallel, local_infile, job, rejects)
+
+
+@load_cli.command('purchases')
+@load_options
+def load_purchases(path, file_format, batch_size, parallel, local_infile, job, rejects):
+    """
+    載入進貨明細至 Purchase_Detail
+
+    欄位: serial_number（選填）, supplier, time, store_name, goods, amount
+    例如: flask --app app load purchases purchases_2024.ndjson
+    """
+    _run('purchases', path, file_format, batch_size, parallel, local_infile, job, rejects)
@@ -0,0 +1,56 @@
+from datetime import date
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from services.partitions import PARTITIONED_TABLES, apply_action, list_partitions, plan_maintenance
+
+partitions_cli = AppGroup('partitions', help='Shopping_Sheet / Purchase_Detail 月份分區維護指令')
+
+
+@partitions_cli.command('maintain')
+@click.option('--months-ahead', default=None, type=int, help='預先建立的未來月份數，預設取 PARTITION_MONTHS_AHEAD')
+@click.option('--action', type=click.Choice(['drop', 'archive']), default=None,
+              help='過期分區的處理方式，預設取 PARTITION_EXPIRE_ACTION')
+@click.option('--today', default=None, help='以指定日期 (YYYY-MM-DD) 計算，預設為今天')
+@click.option('--dry-run', is_flag=True, help='只列出將執行的 DDL')
+def maintain(months_ahead, action, today, dry_run):
+    """
+    預先建立未來月份的分區，並刪除或封存超過保留期限的分區
+
+    保留月份數由 PARTITION_RETENTION_MONTHS 設定。建議每月以排程執行一次：
+    flask --app app partitions maintain
+    """
+    config = current_app.config
+    try:
+        today = date.fromisoformat(today) if today else None
+    except ValueError:
+        raise click.BadParameter("Invalid date format. Use YYYY-MM-DD.", param_hint='--today')
+
+    actions = plan_maintenance(
+        today=today,
+        months_ahead=months_ahead if months_ahead is not None else config['PARTITION_MONTHS_AHEAD'],
+        retention_months=config['PARTITION_RETENTION_MONTHS'],
+        action=action or config['PARTITION_EXPIRE_ACTION'],
+    )
+    if not actions:
+        click.echo("Partitions are up to date")
+        return
+
+    for partition_action in actions:
+        click.echo(f"{partition_action.table}: {partition_action.kind} {', '.join(partition_action.partitions)}")
+        for statement in partition_action.statements:
+            click.echo(f"  {statement};")
+        if not dry_run:
+            apply_action(partition_action)
+
+
+@partitions_cli.command('list')
+def list_command():
+    """列出各分區的上界與估計列數（TABLE_ROWS 為統計值，非精確筆數）"""
+    for table_name in PARTITIONED_TABLES:
+        click.echo(table_name)
+        for partition in list_partitions(table_name):
+            bound = partition.upper_bound.isoformat() if partition.upper_bound else 'MAXVALUE'
+            click.echo(f"  {partition.name:<10} < {bound:<10} ~{partition.rows} rows")
@@ -0,0 +1,23 @@
+import time
+
+import click
+from flask.cli import AppGroup
+
+from services.revenue_rollup import rebuild_store_daily_revenue
+
+rollup_cli = AppGroup('rollup', help='每日營業額彙總表 (Store_Daily_Revenue) 維護指令')
+
+
+@rollup_cli.command('rebuild')
+@click.option('--from', 'date_from', default=None, help='起始日期 (YYYY-MM-DD，含)，預設為最早交易日')
+@click.option('--to', 'date_to', default=None, help='結束日期 (YYYY-MM-DD，不含)，預設為最晚交易日的隔天')
+def rebuild(date_from, date_to):
+    """
+    由 Shopping_Sheet 批次重建每日營業額彙總
+
+    例如: flask --app app rollup rebuild --from 2024-05-01 --to 2024-06-01
+    """
+    started = time.perf_counter()
+    rows = rebuild_store_daily_revenue(date_from, date_to)
+    elapsed = time.perf_counter() - started
+    click.echo(f"Rebuilt {rows} rollup rows in {elapsed:.2f}s")
@@ -1,8 +1,48 @@
+import os
+
+
 class Config:
     """Base configuration."""
     SECRET_KEY = "your_secret_key"  # 替換為實際密鑰
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # POST /transactions 群組提交設定：每批最多筆數、最長等待毫秒數、佇列上限（筆數）與背壓等待秒數
+    INGEST_BATCH_SIZE = 500
+    INGEST_FLUSH_MS = 20
+    INGEST_MAX_QUEUED_ROWS = 20000
+    INGEST_ENQUEUE_TIMEOUT = 0.5
+    INGEST_ACK_TIMEOUT = 10.0
+    INGEST_MAX_ROWS_PER_REQUEST = 1000
+
+    # flask partitions maintain：預先建立的未來月份數、各事實表保留的月份數與過期分區的處理方式 (drop / archive)
+    PARTITION_MONTHS_AHEAD = 3
+    PARTITION_RETENTION_MONTHS = {
+        'Shopping_Sheet': 84,
+        'Purchase_Detail': 84,
+    }
+    PARTITION_EXPIRE_ACTION = 'archive'
+
+    # 冷資料層：超過 ARCHIVE_HOT_DAYS 天的已結束月份由 flask archive transactions 搬到 ARCHIVE_DIR 的欄式檔案
+    # （各 backend 需掛載同一個目錄）
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', '/archive')
+    ARCHIVE_HOT_DAYS = 90
+
+    # 記憶體快取（例如促銷活動區間索引）檢查 Table_Version 的最短間隔秒數
+    CACHE_VERSION_CHECK_SECONDS = 1.0
+    # 報表（熱圖、階層彙總、供應商與補貨統計）結果快取的最大筆數，每組快取在每個 worker 各自保存
+    REPORT_CACHE_SIZE = 256
+    # Goods_Change 異動紀錄保留的小時數（flask goods prune-changes）；閒置超過一半時間的 worker 會整份重建商品搜尋索引
+    GOODS_CHANGE_RETENTION_HOURS = 24
+    # /goods/reorder 估計消耗速度與補貨間隔所使用的進貨紀錄天數
+    REORDER_HISTORY_DAYS = 180
+
+    # flask forecast refresh：擬合使用的歷史天數、移動平均的週數、趨勢阻尼係數、重新挑選參數的間隔天數與預測天數
+    FORECAST_HISTORY_DAYS = 364
+    FORECAST_MA_WEEKS = 4
+    FORECAST_DAMPING = 0.98
+    FORECAST_REFIT_DAYS = 28
+    FORECAST_HORIZON_DAYS = 28
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.mysql import DATETIME
 
 db = SQLAlchemy()
 
@@ -35,6 +36,7 @@ class Goods(db.Model):
     name = db.Column(db.String(100), primary_key=True)
     store_name = db.Column(db.String(100), db.ForeignKey('shops.store_name', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True)
     stock_quantity = db.Column(db.Integer)
+    price = db.Column(db.Integer)
 
     purchase_details = db.relationship('PurchaseDetail', backref='goods', cascade="all, delete-orphan")
 
@@ -54,11 +56,13 @@ class Supplier(db.Model):
     purchase_details = db.relationship('PurchaseDetail', backref='supplier', cascade="all, delete-orphan")
 
 
+# Purchase_Detail 與 Shopping_Sheet 依 Time 按月分區，分區鍵必須在主鍵中；資料庫端沒有外鍵（改由觸發器維護），
+# 這裡保留 ForeignKey 只供 ORM 推導關聯
 class PurchaseDetail(db.Model):
     __tablename__ = 'purchase_detail'
     serial_number = db.Column(db.Integer, primary_key=True, autoincrement=True)
     supplier = db.Column(db.String(100), db.ForeignKey('supplier.name', ondelete='SET NULL', onupdate='CASCADE'))
-    time = db.Column(db.DateTime)
+    time = db.Column(db.DateTime, primary_key=True)
     store_name = db.Column(db.String(100), db.ForeignKey('shops.store_name', ondelete='CASCADE', onupdate='CASCADE'))
     goods = db.Column(db.String(100), db.ForeignKey('goods.name', ondelete='SET NULL', onupdate='CASCADE'))
     amount = db.Column(db.Integer)
@@ -73,12 +77,29 @@ class PromotionalCampaign(db.Model):
     method = db.Column(db.String(50))
 
 
+_SHIFT_NORMALIZED = "REPLACE(REPLACE(shift_time, ' ', ''), '~', '-')"
+_SHIFT_PATTERN = "'^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'"
+SHIFT_START_MIN_SQL = (
+    f"CASE WHEN {_SHIFT_NORMALIZED} REGEXP {_SHIFT_PATTERN} "
+    f"THEN CAST(SUBSTRING_INDEX({_SHIFT_NORMALIZED}, ':', 1) AS UNSIGNED) * 60 "
+    f"+ CAST(RIGHT(SUBSTRING_INDEX({_SHIFT_NORMALIZED}, '-', 1), 2) AS UNSIGNED) END"
+)
+SHIFT_END_MIN_SQL = (
+    f"CASE WHEN {_SHIFT_NORMALIZED} REGEXP {_SHIFT_PATTERN} "
+    f"THEN CAST(SUBSTRING_INDEX(SUBSTRING_INDEX({_SHIFT_NORMALIZED}, '-', -1), ':', 1) AS UNSIGNED) * 60 "
+    f"+ CAST(RIGHT({_SHIFT_NORMALIZED}, 2) AS UNSIGNED) END"
+)
+
+
 class MallEmployee(db.Model):
     __tablename__ = 'mall_employee'
     name = db.Column(db.String(100), primary_key=True)
     contact = db.Column(db.String(20))
     position = db.Column(db.String(50))
     shift_time = db.Column(db.String(50))
+    # 由 Shift_Time 解析出的上下班分鐘數，資料庫端的 STORED 生成欄位
+    shift_start_min = db.Column(db.SmallInteger, db.Computed(SHIFT_START_MIN_SQL, persisted=True))
+    shift_end_min = db.Column(db.SmallInteger, db.Computed(SHIFT_END_MIN_SQL, persisted=True))
     branch_name = db.Column(db.String(100), db.ForeignKey('shopping_mall.branch_name', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True)
 
 
@@ -88,12 +109,26 @@ class ShopEmployee(db.Model):
     contact = db.Column(db.String(20))
     position = db.Column(db.String(50))
     shift_time = db.Column(db.String(50))
+    # 由 Shift_Time 解析出的上下班分鐘數，資料庫端的 STORED 生成欄位
+    shift_start_min = db.Column(db.SmallInteger, db.Computed(SHIFT_START_MIN_SQL, persisted=True))
+    shift_end_min = db.Column(db.SmallInteger, db.Computed(SHIFT_END_MIN_SQL, persisted=True))
     store_name = db.Column(db.String(100), db.ForeignKey('shops.store_name', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True)
 
 
 class ShoppingSheet(db.Model):
     __tablename__ = 'shopping_sheet'
-    store_name = db.Column(db.String(100), db.ForeignKey('shops.store_name', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True)
-    time = db.Column(db.DateTime, primary_key=True)
+    transaction_id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    store_name = db.Column(db.String(100), db.ForeignKey('shops.store_name', ondelete='CASCADE', onupdate='CASCADE'), index=True)
+    time = db.Column(DATETIME(fsp=6), primary_key=True, index=True)
     price = db.Column(db.Numeric(10, 2))
     payment = db.Column(db.String(50))
+
+
+class StoreDailyRevenue(db.Model):
+    __tablename__ = 'store_daily_revenue'
+    store_name = db.Column(db.String(100), db.ForeignKey('shops.store_name', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True)
+    branch_name = db.Column(db.String(100))
+    sale_date = db.Column(db.Date, primary_key=True)
+    payment = db.Column(db.String(50), primary_key=True, default='')
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    txn_count = db.Column(db.Integer, nullable=False, default=0)
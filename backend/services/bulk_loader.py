@@ -0,0 +1,349 @@
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import text
+
+
+class ReferenceKeys:
+    """
+    載入時用來驗證外鍵的鍵集合，整個載入過程只向資料庫查詢一次
+
+    horizon 為交易封存的分界日，之前的月份已搬到封存檔，寫入 MySQL 的交易會被所有查詢略過，因此一律拒絕。
+    """
+
+    def __init__(self, conn, horizon=None):
+        self.horizon = horizon
+        self.shops = {row[0] for row in conn.execute(
+            text("SELECT Store_Name FROM Shops /* explain-gate: full-scan-ok */;"))}
+        self.suppliers = {row[0] for row in conn.execute(
+            text("SELECT Name FROM Supplier /* explain-gate: full-scan-ok */;"))}
+        self.goods = {(row[0], row[1]) for row in conn.execute(
+            text("SELECT Store_Name, Name FROM Goods /* explain-gate: full-scan-ok */;"))}
+
+
+def _required(record, field):
+    value = record.get(field)
+    if value is None or value == '':
+        raise ValueError(f"{field} is required")
+    return value
+
+
+def _parse_time(value):
+    try:
+        # 也接受 init.sql 中使用的 YYYY/MM/DD 格式
+        return datetime.fromisoformat(str(value).strip().replace('/', '-'))
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+
+
+def validate_transaction(record, keys):
+    store_name = _required(record, 'store_name')
+    if store_name not in keys.shops:
+        raise ValueError(f"Unknown store: {store_name}")
+    try:
+        price = Decimal(str(_required(record, 'price')))
+    except InvalidOperation:
+        raise ValueError(f"Invalid price: {record.get('price')}")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"Invalid price: {record.get('price')}")
+    sale_time = _parse_time(_required(record, 'time'))
+    if keys.horizon is not None and sale_time.date() < keys.horizon:
+        raise ValueError(f"time falls in an archived month (before {keys.horizon})")
+    return (store_name, sale_time, price, _required(record, 'payment'))
+
+
+def validate_purchase(record, keys):
+    store_name = _required(record, 'store_name')
+    goods = _required(record, 'goods')
+    supplier = record.get('supplier') or None
+    if store_name not in keys.shops:
+        raise ValueError(f"Unknown store: {store_name}")
+    if (store_name, goods) not in keys.goods:
+        raise ValueError(f"Unknown goods for store {store_name}: {goods}")
+    if supplier is not None and supplier not in keys.suppliers:
+        raise ValueError(f"Unknown supplier: {supplier}")
+    serial_number = record.get('serial_number')
+    try:
+        amount = int(_required(record, 'amount'))
+        serial_number = int(serial_number) if serial_number not in (None, '') else None
+    except ValueError:
+        raise ValueError("serial_number and amount must be integers")
+    return (serial_number, supplier, _parse_time(_required(record, 'time')), store_name, goods, amount)
+
+
+class LoadTarget:
+    def __init__(self, table, columns, validate):
+        self.table = table
+        self.columns = columns
+        self.validate = validate
+
+    @property
+    def insert_sql(self):
+        names = ", ".join(self.columns)
+        binds = ", ".join(f":p{i}" for i in range(len(self.columns)))
+        return text(f"INSERT INTO {self.table} ({names}) VALUES ({binds});")
+
+
+TARGETS = {
+    'transactions': LoadTarget('Shopping_Sheet', ('Store_Name', 'Time', 'Price', 'Payment'), validate_transaction),
+    'purchases': LoadTarget('Purchase_Detail', ('Serial_Number', 'Supplier', 'Time', 'Store_Name', 'Goods', 'Amount'),
+                            validate_purchase),
+}
+
+GET_CHECKPOINT_SQL = text("""
+    SELECT Last_Record, Rows_Loaded
+    FROM Load_Checkpoint
+    WHERE Load_Key = :load_key;
+""")
+
+SAVE_CHECKPOINT_SQL = text("""
+    INSERT INTO Load_Checkpoint (Load_Key, Target_Table, Last_Record, Rows_Loaded)
+    VALUES (:load_key, :target_table, :last_record, :rows_loaded)
+    ON DUPLICATE KEY UPDATE
+        Last_Record = VALUES(Last_Record),
+        Rows_Loaded = VALUES(Rows_Loaded);
+""")
+
+# 補入的歷史資料可能落在已快取的區間，每個批次提交時一併遞增目標資料表的版本號
+BUMP_VERSION_SQL = text("""
+    CALL bump_table_version(:table_name);
+""")
+
+
+def read_records(path, file_format):
+    """
+    逐筆讀取 CSV / NDJSON，產生 (行號, 資料)
+
+    CSV 的欄位名稱在此轉為小寫（Store_Name 與 store_name 皆可）；NDJSON 產生原始的一行文字，
+    由 parse_record 在驗證時解析，格式錯誤的行和其他不合格的資料一樣寫入 rejects 檔，不會中斷整個載入。
+    """
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, {k.strip().lower(): v for k, v in record.items() if k}
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_no, line.rstrip('\r\n')
+
+
+def parse_record(record):
+    """NDJSON 的一行解析為欄位名稱小寫的 dict；不是 JSON 物件時拋出 ValueError"""
+    if isinstance(record, dict):
+        return record
+    record = json.loads(record)
+    if not isinstance(record, dict):
+        raise ValueError("Each line must be a JSON object")
+    return {str(k).lower(): v for k, v in record.items()}
+
+
+def recorded_rejects(path, job):
+    """
+    讀取 rejects 檔中本次工作 (job) 已寫入的拒絕紀錄，回傳 {load_key: {序號, ...}}
+
+    中途當機時最後一行可能只寫了一半，無法解析的行直接略過。
+    """
+    recorded = {}
+    if not os.path.exists(path):
+        return recorded
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                load_key, seq = entry["load"], entry["seq"]
+            except (ValueError, TypeError, KeyError):
+                continue
+            if isinstance(load_key, str) and load_key.startswith(f"{job}:"):
+                recorded.setdefault(load_key, set()).add(seq)
+    return recorded
+
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class BulkLoader:
+    """
+    大量載入 Shopping_Sheet / Purchase_Detail
+
+    每 batch_size 筆驗證通過的資料在同一個交易中寫入，並同時更新 Load_Checkpoint 的進度，
+    中途當機後以相同參數重新執行，會從最後一個已提交的批次之後繼續，不會重複寫入。
+    parallel > 1 時先依商店名稱把輸入切成 parallel 份，每份由獨立的連線平行載入並各自記錄進度。
+    """
+
+    def __init__(self, engine, target, batch_size=10000, use_local_infile=False, echo=print):
+        self.engine = engine
+        self.target = target
+        self.batch_size = batch_size
+        self.use_local_infile = use_local_infile
+        self.echo = echo
+        self._lock = threading.Lock()
+        self.loaded = 0
+        self.skipped = 0
+        self.rejected = 0
+
+    def _write_batch(self, conn, rows):
+        if not self.use_local_infile:
+            conn.execute(self.target.insert_sql, [{f"p{i}": v for i, v in enumerate(row)} for row in rows])
+            return
+
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', delete=False) as f:
+            for row in rows:
+                f.write('\t'.join(_tsv_value(v) for v in row))
+                f.write('\n')
+        try:
+            conn.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.target.table} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(self.target.columns)})",
+                (f.name,)
+            )
+        finally:
+            os.unlink(f.name)
+
+    def _commit(self, load_key, rows, last_record, rows_loaded):
+        with self.engine.begin() as conn:
+            if rows:
+                self._write_batch(conn, rows)
+            conn.execute(SAVE_CHECKPOINT_SQL, {
+                "load_key": load_key,
+                "target_table": self.target.table,
+                "last_record": last_record,
+                "rows_loaded": rows_loaded
+            })
+            if rows:
+                conn.execute(BUMP_VERSION_SQL, {"table_name": self.target.table})
+
+    def _write_rejects(self, rejects, pending):
+        if not pending:
+            return
+        with self._lock:
+            rejects.writelines(pending)
+            rejects.flush()
+            os.fsync(rejects.fileno())
+
+    def load_stream(self, load_key, records, keys, rejects, recorded=frozenset()):
+        """
+        載入一串 (序號, 行號, 資料)；序號在每次執行間必須固定，作為續傳的依據
+
+        被拒絕的資料暫存在批次中，在該批次的進度提交之前寫入並同步到 rejects 檔，當機也不會遺失；
+        提交前當機時續傳會重新驗證該批次，recorded 為 rejects 檔中此 load_key 已寫入的序號，這些拒絕紀錄不會重複寫入。
+        """
+        with self.engine.connect() as conn:
+            checkpoint = conn.execute(GET_CHECKPOINT_SQL, {"load_key": load_key}).fetchone()
+        last_done, rows_loaded = checkpoint if checkpoint else (-1, 0)
+
+        batch = []
+        pending = []
+        last_record = last_done
+        for seq, line_no, record in records:
+            if seq <= last_done:
+                with self._lock:
+                    self.skipped += 1
+                continue
+            try:
+                batch.append(self.target.validate(parse_record(record), keys))
+            except (ValueError, TypeError) as e:
+                with self._lock:
+                    self.rejected += 1
+                if seq not in recorded:
+                    pending.append(json.dumps({"load": load_key, "seq": seq, "line": line_no, "error": str(e),
+                                               "record": record}, ensure_ascii=False, default=str) + '\n')
+            last_record = seq
+            # 拒絕的資料也計入批次大小，大部分不合格的輸入同樣會定期提交進度並寫出 rejects
+            if len(batch) + len(pending) >= self.batch_size:
+                rows_loaded += len(batch)
+                self._write_rejects(rejects, pending)
+                self._commit(load_key, batch, last_record, rows_loaded)
+                self._report(len(batch))
+                batch = []
+                pending = []
+
+        if last_record > last_done:
+            rows_loaded += len(batch)
+            self._write_rejects(rejects, pending)
+            self._commit(load_key, batch, last_record, rows_loaded)
+            self._report(len(batch))
+
+    def _report(self, count):
+        with self._lock:
+            self.loaded += count
+            elapsed = time.perf_counter() - self._started
+            self.echo(f"  {self.loaded} rows loaded, {self.loaded / max(elapsed, 1e-9):.0f} rows/s")
+
+    def run(self, path, file_format, job, parallel=1, rejects_path=None, horizon=None):
+        self._started = time.perf_counter()
+        rejects_path = rejects_path or f"{path}.rejects.ndjson"
+        with self.engine.connect() as conn:
+            keys = ReferenceKeys(conn, horizon)
+
+        recorded = recorded_rejects(rejects_path, job)
+        with open(rejects_path, 'a', encoding='utf-8') as rejects:
+            # 上次當機時寫了一半的最後一行，補上換行避免與新紀錄接在同一行
+            if rejects.tell() > 0:
+                with open(rejects_path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        rejects.write('\n')
+            if parallel <= 1:
+                load_key = f"{job}:p0of1"
+                records = ((seq, line_no, record)
+                           for seq, (line_no, record) in enumerate(read_records(path, file_format)))
+                self.load_stream(load_key, records, keys, rejects, recorded.get(load_key, frozenset()))
+            else:
+                with tempfile.TemporaryDirectory() as workdir:
+                    parts = self._split_by_store(path, file_format, parallel, workdir)
+                    with ThreadPoolExecutor(max_workers=parallel) as pool:
+                        futures = [
+                            pool.submit(self.load_stream, f"{job}:p{i}of{parallel}", self._read_part(part), keys, rejects,
+                                        recorded.get(f"{job}:p{i}of{parallel}", frozenset()))
+                            for i, part in enumerate(parts)
+                        ]
+                        for future in futures:
+                            future.result()
+
+        elapsed = time.perf_counter() - self._started
+        return {
+            "loaded": self.loaded,
+            "skipped": self.skipped,
+            "rejected": self.rejected,
+            "seconds": elapsed,
+            "rows_per_second": self.loaded / max(elapsed, 1e-9),
+            "rejects_path": rejects_path
+        }
+
+    @staticmethod
+    def _split_by_store(path, file_format, parallel, workdir):
+        """依 store_name 的 CRC32 將輸入分成 parallel 份；同一份輸入的切分結果固定，因此可續傳"""
+        parts = [os.path.join(workdir, f"part{i}.ndjson") for i in range(parallel)]
+        handles = [open(part, 'w', encoding='utf-8') for part in parts]
+        try:
+            for line_no, record in read_records(path, file_format):
+                try:
+                    store_name = str(parse_record(record).get('store_name') or '')
+                except ValueError:
+                    # 無法解析的行仍照常分派，由 load_stream 寫入 rejects 檔
+                    store_name = ''
+                index = zlib.crc32(store_name.encode('utf-8')) % parallel
+                handles[index].write(json.dumps([line_no, record], ensure_ascii=False) + '\n')
+        finally:
+            for handle in handles:
+                handle.close()
+        return parts
+
+    @staticmethod
+    def _read_part(part):
+        with open(part, encoding='utf-8') as f:
+            for seq, line in enumerate(f):
+                line_no, record = json.loads(line)
+                yield seq, line_no, record
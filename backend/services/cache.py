@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from models.models import db
+
+TABLE_VERSIONS_SQL = text("""
+    SELECT Table_Name, Version
+    FROM Table_Version;
+""")
+
+# 新增交易只會讓 Transaction_ID 變大；修改與刪除由觸發器遞增 Shopping_Sheet 的版本號
+MAX_TRANSACTION_SQL = text("""
+    SELECT MAX(Transaction_ID)
+    FROM Shopping_Sheet;
+""")
+
+MAX_PURCHASE_SQL = text("""
+    SELECT MAX(Serial_Number)
+    FROM Purchase_Detail;
+""")
+
+# 由快照建立增量結構時，cursor 從最大編號往回退的筆數；涵蓋建立當下已配發編號但尚未提交的交易
+CURSOR_REWIND = 1000
+
+
+def table_versions(tables):
+    """回傳 tables 目前的版本號組合；尚未有任何寫入的資料表版本視為 0"""
+    versions = dict(db.session.execute(TABLE_VERSIONS_SQL).fetchall())
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def latest_transaction_id():
+    """作為 VersionedResource 的 probe，讓新增交易也會使快取失效"""
+    return db.session.execute(MAX_TRANSACTION_SQL).scalar()
+
+
+def latest_purchase_serial():
+    """作為 VersionedResource 的 probe，讓新增進貨紀錄也會使快取失效"""
+    return db.session.execute(MAX_PURCHASE_SQL).scalar()
+
+
+class VersionedResource:
+    """
+    依 Table_Version 版本號快取由資料庫建出的物件（每個 worker 行程一份）
+
+    get() 最多每 check_interval 秒查詢一次版本號，版本與建立時不同才呼叫 build() 重建，
+    因此資料異動最慢 check_interval 秒後生效。版本號在 build() 之前讀取，重建期間發生的異動會在下一次檢查時被發現。
+    probe 為額外的版本來源（例如只新增不修改的資料表以 MAX(id) 判斷），其回傳值與版本號一併比較。
+    """
+
+    def __init__(self, tables, build, check_interval=1.0, probe=None):
+        self.tables = tuple(tables)
+        self._build = build
+        self._probe = probe
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._versions = None
+        self._checked_at = 0.0
+
+    def get(self):
+        if self._value is not None and time.monotonic() - self._checked_at < self._check_interval:
+            return self._value
+        with self._lock:
+            # 等待鎖期間可能已有其他執行緒完成檢查
+            if self._value is not None and time.monotonic() - self._checked_at < self._check_interval:
+                return self._value
+            versions = table_versions(self.tables)
+            if self._probe is not None:
+                versions += (self._probe(),)
+            if self._value is None or versions != self._versions:
+                self._value = self._build()
+                self._versions = versions
+            self._checked_at = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+class AppendCursor:
+    """
+    依 AUTO_INCREMENT 編號增量讀取新資料列的位置（position 以前的列都已處理）
+
+    編號依配發順序而非提交順序遞增，讀到的編號中間若有缺號，可能是尚未提交的交易：缺號出現後 grace 秒內
+    position 停在缺號之前，下次由該處重讀，已處理過的編號由 consume() 略過；超過 grace 秒仍未出現則視為
+    已回滾的編號跳過。
+
+    由快照建立時 position 應往回退 CURSOR_REWIND 筆，seen 傳入快照中該範圍內已可見的編號，
+    其間的缺號（建立當下尚未提交的交易）同樣適用 grace，不會因為低於最大編號而永遠漏讀。
+    """
+
+    def __init__(self, position, grace=5.0, seen=()):
+        self.position = position or 0
+        self._grace = grace
+        self._seen = {row_id for row_id in seen if row_id > self.position}
+        self._gap_since = None
+        self._advance()
+
+    def consume(self, rows, key=lambda row: row[0]):
+        """回傳 rows 中尚未處理過的列（保持原順序）並推進 position"""
+        fresh = []
+        for row in rows:
+            row_id = key(row)
+            if row_id > self.position and row_id not in self._seen:
+                self._seen.add(row_id)
+                fresh.append(row)
+        self._advance()
+        return fresh
+
+    def _advance(self):
+        while self._seen:
+            if self.position + 1 in self._seen:
+                self.position += 1
+                self._seen.discard(self.position)
+                self._gap_since = None
+                continue
+            now = time.monotonic()
+            if self._gap_since is None:
+                self._gap_since = now
+            if now - self._gap_since < self._grace:
+                break
+            self.position = min(self._seen) - 1
+            self._gap_since = None
+
+
+class LRUCache:
+    """執行緒安全、最多保存 maxsize 筆的 LRU 快取"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+_registry_lock = threading.Lock()
+
+
+def versioned_resource(app, name, tables, build, probe=None):
+    """取得（必要時建立）此 worker 行程中名為 name 的 VersionedResource"""
+    registry = app.extensions.setdefault('versioned_resources', {})
+    resource = registry.get(name)
+    if resource is None:
+        with _registry_lock:
+            resource = registry.get(name)
+            if resource is None:
+                resource = VersionedResource(tables, build, app.config['CACHE_VERSION_CHECK_SECONDS'], probe)
+                registry[name] = resource
+    return resource
+
+
+def report_cache(app, name, tables, probe=None):
+    """名為 name 的報表結果 LRU 快取（最多 REPORT_CACHE_SIZE 筆）；tables 的版本號（或 probe 的回傳值）變動時整個快取被換成新的"""
+    return versioned_resource(app, name, tables, lambda: LRUCache(app.config['REPORT_CACHE_SIZE']), probe).get()
@@ -0,0 +1,166 @@
+from bisect import bisect_left, bisect_right
+
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.cache import versioned_resource
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+EMPLOYEE_TABLES = ('Mall_Employee', 'Shop_Employee', 'Shops')
+
+# 商場員工與各商店員工，商店員工經由 Shops 取得所屬分店
+ALL_EMPLOYEES_SQL = text("""
+    SELECT 'mall' AS Source, Name, Contact, Position, Shift_Time, Shift_Start_Min, Shift_End_Min,
+           NULL AS Store_Name, Branch_Name
+    FROM Mall_Employee /* explain-gate: full-scan-ok */
+
+    UNION ALL
+
+    SELECT 'shop' AS Source, SE.Name, SE.Contact, SE.Position, SE.Shift_Time, SE.Shift_Start_Min, SE.Shift_End_Min,
+           SE.Store_Name, S.Branch_Name
+    FROM Shop_Employee SE /* explain-gate: full-scan-ok */
+    LEFT JOIN Shops S ON SE.Store_Name = S.Store_Name;
+""")
+
+
+class Employee:
+    __slots__ = ('source', 'name', 'contact', 'position', 'shift_time', 'shift_start', 'shift_end',
+                 'store_name', 'branch_name')
+
+    def __init__(self, source, name, contact, position, shift_time, shift_start, shift_end, store_name, branch_name):
+        self.source = source
+        self.name = name
+        self.contact = contact
+        self.position = position
+        self.shift_time = shift_time
+        self.shift_start = shift_start
+        self.shift_end = shift_end
+        self.store_name = store_name
+        self.branch_name = branch_name
+
+    @property
+    def location(self):
+        return self.store_name if self.source == 'shop' else self.branch_name
+
+    def sort_key(self):
+        return self.name or '', self.source, self.location or ''
+
+    def shift_intervals(self):
+        """上班時間的閉區間（分鐘），跨夜班拆成當天結束前與隔天開始後兩段；排班無法解析時為空"""
+        if self.shift_start is None or self.shift_end is None:
+            return []
+        if self.shift_start <= self.shift_end:
+            return [(self.shift_start, self.shift_end)]
+        return [(self.shift_start, 24 * 60 - 1), (0, self.shift_end)]
+
+    def on_duty(self, minute):
+        return any(start <= minute <= end for start, end in self.shift_intervals())
+
+
+def load_employees():
+    return [Employee(*row) for row in db.session.execute(ALL_EMPLOYEES_SQL).fetchall()]
+
+
+class BranchRoster:
+    """
+    單一分店（商場員工與所有商店員工）的在職索引
+
+    一天切成 SLOTS_PER_DAY 個 SLOT_MINUTES 分鐘的時段，每個時段保存兩個以 int 表示的 bitset：
+    整個時段都在班的員工 (full) 與時段中任一分鐘在班的員工 (partial)。查詢時 full 直接採用，
+    只有在時段中途上下班的少數員工需要以實際分鐘數確認。
+    """
+
+    def __init__(self, employees):
+        self.employees = employees
+        self.full = [0] * SLOTS_PER_DAY
+        self.partial = [0] * SLOTS_PER_DAY
+        for i, employee in enumerate(employees):
+            bit = 1 << i
+            for start, end in employee.shift_intervals():
+                for slot in range(start // SLOT_MINUTES, min(end // SLOT_MINUTES, SLOTS_PER_DAY - 1) + 1):
+                    slot_start = slot * SLOT_MINUTES
+                    if start <= slot_start and end >= slot_start + SLOT_MINUTES - 1:
+                        self.full[slot] |= bit
+                    else:
+                        self.partial[slot] |= bit
+
+    def on_duty(self, minute):
+        slot = minute // SLOT_MINUTES
+        bits = self.full[slot]
+        edge = self.partial[slot] & ~bits
+        while edge:
+            low = edge & -edge
+            if self.employees[low.bit_length() - 1].on_duty(minute):
+                bits |= low
+            edge ^= low
+
+        found = []
+        while bits:
+            low = bits & -bits
+            found.append(self.employees[low.bit_length() - 1])
+            bits ^= low
+        return found
+
+
+def build_duty_roster():
+    by_branch = {}
+    for employee in load_employees():
+        if employee.branch_name is not None:
+            by_branch.setdefault(employee.branch_name, []).append(employee)
+    for employees in by_branch.values():
+        # 商場員工在前，其次依商店、姓名排序；bit 順序即查詢結果的順序
+        employees.sort(key=lambda e: (e.source, e.location or '', e.name or ''))
+    return {branch: BranchRoster(employees) for branch, employees in by_branch.items()}
+
+
+def get_duty_roster():
+    """目前 worker 的 {分店: BranchRoster}；員工、商店或分店異動時自動重建"""
+    app = current_app._get_current_object()
+    return versioned_resource(app, 'duty_roster', EMPLOYEE_TABLES, build_duty_roster).get()
+
+
+class EmployeeDirectory:
+    """
+    商場員工與商店員工合併的員工名錄，依 (姓名, 來源, 地點) 排序
+
+    全體、各職位、各分店（商店員工歸入其所屬分店）以及職位 + 分店的組合各保存一份依排序位置遞增的索引清單，
+    姓名前綴與 cursor 都對應到排序位置的區間，以二分搜尋定位。一次查詢的成本為 O(log n + limit)。
+    """
+
+    def __init__(self, employees):
+        self.employees = sorted(employees, key=Employee.sort_key)
+        self.keys = [employee.sort_key() for employee in self.employees]
+        self._lists = {(None, None): list(range(len(self.employees)))}
+        for i, employee in enumerate(self.employees):
+            for key in ((employee.position, None), (None, employee.branch_name),
+                        (employee.position, employee.branch_name)):
+                self._lists.setdefault(key, []).append(i)
+
+    def search(self, position=None, branch=None, name_prefix=None, after=None, limit=100):
+        """
+        依條件回傳最多 limit 筆員工；after 為上一頁最後一筆的 sort_key()，由其之後開始
+
+        position / branch 為 None 代表不限；name_prefix 為姓名開頭。
+        """
+        candidates = self._lists.get((position, branch), [])
+        lo, hi = 0, len(self.employees)
+        if name_prefix:
+            lo = bisect_left(self.keys, (name_prefix,))
+            hi = bisect_left(self.keys, (name_prefix + '\U0010ffff',))
+        if after is not None:
+            lo = max(lo, bisect_right(self.keys, tuple(after)))
+        start = bisect_left(candidates, lo)
+        stop = bisect_left(candidates, hi)
+        return [self.employees[i] for i in candidates[start:min(stop, start + limit)]]
+
+
+def build_employee_directory():
+    return EmployeeDirectory(load_employees())
+
+
+def get_employee_directory():
+    """目前 worker 的員工名錄；員工、商店或分店異動時自動重建"""
+    app = current_app._get_current_object()
+    return versioned_resource(app, 'employee_directory', EMPLOYEE_TABLES, build_employee_directory).get()
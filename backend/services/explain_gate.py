@@ -0,0 +1,223 @@
+import ast
+import importlib
+import os
+import re
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from models.models import db
+
+# 在 SQL 中加入此註解，代表該查詢刻意讀取整張（小型維度）表，例如列出所有分店
+FULL_SCAN_OK_MARKER = 'explain-gate: full-scan-ok'
+
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+BIND_PATTERN = re.compile(r'(?<![:\w\\]):(\w+)(?!:)')
+TABLE_REF_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+SQL_KEYWORDS = {'WHERE', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'ON', 'GROUP', 'ORDER', 'LIMIT', 'UNION', 'USING'}
+PREDICATE_PATTERN = re.compile(
+    r'(?:(\w+)\.)?(\w+)\s*(=|<=|>=|<|>|\bIN\b|\bBETWEEN\b|\bLIKE\b)\s*\(?\s*:', re.IGNORECASE)
+# 分區鍵 Time 直接與 bind 參數比較的範圍條件；包在函式中（如 DATE(Time) = :date）的條件無法修剪分區
+TIME_RANGE_PATTERN = re.compile(r'(?:(\w+)\.)?\bTime\s*(?:<=|>=|<|>|\bBETWEEN\b)\s*:', re.IGNORECASE)
+
+# 參數名稱對應的樣本值查詢；以種子資料中實際存在的值執行 EXPLAIN，估計列數才有意義
+SAMPLE_SQL = {
+    'branch': "SELECT Branch_Name FROM Shopping_Mall LIMIT 1",
+    'store': "SELECT Store_Name FROM Shops LIMIT 1",
+    'payment': "SELECT Payment FROM Shopping_Sheet LIMIT 1",
+    'method': "SELECT Method FROM Promotional_Campaign LIMIT 1",
+    'position': "SELECT Position FROM Shop_Employee LIMIT 1",
+    'supplier': "SELECT Name FROM Supplier LIMIT 1",
+    'goods': "SELECT Name FROM Goods LIMIT 1",
+    'date': "SELECT DATE(MIN(Time)) FROM Shopping_Sheet",
+}
+PARAM_ALIASES = {
+    'branch': 'branch', 'branch_name': 'branch',
+    'store': 'store', 'store_name': 'store', 'shop_name': 'store', 'name': 'store',
+    'payment': 'payment',
+    'method': 'method',
+    'pos': 'position', 'position': 'position',
+    'supplier': 'supplier', 'supplier_name': 'supplier',
+    'goods': 'goods', 'goods_name': 'goods',
+}
+
+
+class CollectedQuery:
+    __slots__ = ('sql', 'origin')
+
+    def __init__(self, sql, origin):
+        self.sql = sql
+        self.origin = origin
+
+
+def _is_text_call(node):
+    func = node.func
+    return (isinstance(func, ast.Name) and func.id == 'text') or \
+        (isinstance(func, ast.Attribute) and func.attr == 'text')
+
+
+def collect_queries(package_dir, package_name):
+    """
+    收集 package_dir 底下所有模組的 text() 查詢
+
+    函式內以字串常數呼叫 text() 的查詢由 AST 取得；模組層級預先組好的 TextClause
+    （包含放在 dict / list 中的查詢）則匯入模組後直接讀取。以 f-string 於請求中動態組出的查詢無法靜態取得，
+    以 skipped 回報。
+    """
+    queries = {}
+    skipped = []
+    for filename in sorted(os.listdir(package_dir)):
+        if not filename.endswith('.py'):
+            continue
+        path = os.path.join(package_dir, filename)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and _is_text_call(node) and node.args:
+                arg = node.args[0]
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                    queries.setdefault(arg.value.strip(), f"{filename}:{node.lineno}")
+
+        # 函式內動態組出的查詢；模組層級的動態查詢會在下方由匯入後的物件取得
+        for function in ast.walk(tree):
+            if isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for node in ast.walk(function):
+                    if isinstance(node, ast.Call) and _is_text_call(node) and node.args \
+                            and not isinstance(node.args[0], ast.Constant):
+                        skipped.append(f"{filename}:{node.lineno}")
+
+        module = importlib.import_module(f"{package_name}.{filename[:-3]}")
+        for attr, value in vars(module).items():
+            if isinstance(value, dict):
+                items = [(f"{attr}[{key}]", item) for key, item in value.items()]
+            elif isinstance(value, (list, tuple)):
+                items = [(f"{attr}[{index}]", item) for index, item in enumerate(value)]
+            else:
+                items = [(attr, value)]
+            for name, item in items:
+                if isinstance(item, TextClause):
+                    queries.setdefault(item.text.strip(), f"{filename}:{name}")
+
+    collected = [CollectedQuery(sql, origin) for sql, origin in queries.items()
+                 if sql.lstrip('( \n').upper().startswith(EXPLAINABLE)]
+    return collected, skipped
+
+
+def load_samples():
+    samples = {}
+    for key, sql in SAMPLE_SQL.items():
+        try:
+            samples[key] = db.session.execute(text(sql + ";")).scalar()
+        except Exception:
+            db.session.rollback()
+            samples[key] = None
+    return samples
+
+
+def sample_params(sql, samples):
+    """依參數名稱猜測樣本值；無法判斷的參數以 NULL 代入並回報"""
+    day = samples.get('date')
+    params = {}
+    unknown = []
+    for name in set(BIND_PATTERN.findall(sql)):
+        lowered = name.lower()
+        if lowered in PARAM_ALIASES:
+            params[name] = samples.get(PARAM_ALIASES[lowered])
+        elif lowered.endswith('s') and lowered[:-1] in PARAM_ALIASES:
+            # IN :shop_names 這類 expanding 參數；PyMySQL 會把 tuple 轉成 (v1, v2, ...)
+            params[name] = (samples.get(PARAM_ALIASES[lowered[:-1]]),)
+        elif lowered == 'limit':
+            params[name] = 101
+        elif lowered in ('date_start', 'from', 'date_from', 'cursor_time', 'hot_start'):
+            params[name] = str(day) if day else None
+        elif lowered in ('date_end', 'to', 'date_to'):
+            params[name] = f"{day} 23:59:59.999999" if day else None
+        elif lowered.startswith('cursor_') or lowered.endswith('_id'):
+            params[name] = 0
+        elif lowered in ('minute', 'minutes', 'query_minutes'):
+            params[name] = 720
+        elif lowered in ('quantity', 'amount'):
+            params[name] = 1
+        elif lowered == 'table_name':
+            params[name] = 'Shopping_Sheet'
+        elif lowered.endswith('_key'):
+            params[name] = ''
+        else:
+            params[name] = None
+            unknown.append(name)
+    return params, unknown
+
+
+def table_aliases(sql):
+    """由 FROM / JOIN 子句建立 別名 -> 資料表 的對照（EXPLAIN 的 table 欄位顯示的是別名）"""
+    aliases = {}
+    for table, alias in TABLE_REF_PATTERN.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def suggest_index(sql, table, alias):
+    """由 WHERE 中與 bind 參數比較的欄位推測索引：等值欄位在前，範圍欄位在後"""
+    equality, ranged = [], []
+    for qualifier, column, operator in PREDICATE_PATTERN.findall(sql):
+        if qualifier and qualifier not in (table, alias):
+            continue
+        target = equality if operator.strip().upper() in ('=', 'IN') else ranged
+        if column not in equality and column not in ranged:
+            target.append(column)
+    columns = equality + ranged
+    return f"INDEX ({', '.join(columns)})" if columns else None
+
+
+def filters_on_time(sql, table, alias):
+    return any(not qualifier or qualifier in (table, alias) for qualifier in TIME_RANGE_PATTERN.findall(sql))
+
+
+def explain(query, samples, max_rows, include_index_scans=False, partition_counts=None):
+    """
+    執行 EXPLAIN 並回傳 (違規清單, 未知參數, EXPLAIN 結果)
+
+    違規包含兩種：掃描整張表且估計列數超過 max_rows 的存取 (full_scan)，以及查詢以 Time 範圍篩選分區表，
+    EXPLAIN 的 partitions 欄位卻仍列出所有分區 (no_pruning)。partition_counts 為 {資料表: 分區數}，未提供時不檢查分區修剪。
+    """
+    params, unknown = sample_params(query.sql, samples)
+    statement = query.sql.rstrip().rstrip(';')
+    result = db.session.execute(text("EXPLAIN " + statement), params)
+    columns = list(result.keys())
+    rows = [dict(zip(columns, row)) for row in result.fetchall()]
+
+    full_scan_types = ('ALL', 'index') if include_index_scans else ('ALL',)
+    partition_counts = partition_counts or {}
+    full_scan_ok = FULL_SCAN_OK_MARKER in query.sql
+    violations = []
+    for row in rows:
+        table = row.get('table') or ''
+        if table.startswith('<'):
+            # <derivedN> / <unionM,N> 等暫存結果，成本已計入來源資料表
+            continue
+        real_table = table_aliases(query.sql).get(table, table)
+        if not full_scan_ok and row.get('type') in full_scan_types and (row.get('rows') or 0) > max_rows:
+            violations.append({
+                "kind": "full_scan",
+                "table": table,
+                "type": row.get('type'),
+                "rows": row.get('rows'),
+                "partitions": row.get('partitions'),
+                "suggestion": suggest_index(query.sql, real_table, table)
+            })
+
+        total = partition_counts.get(real_table, 0)
+        scanned = len(row['partitions'].split(',')) if row.get('partitions') else 0
+        if total > 1 and scanned >= total and filters_on_time(query.sql, real_table, table):
+            violations.append({
+                "kind": "no_pruning",
+                "table": table,
+                "type": row.get('type'),
+                "rows": row.get('rows'),
+                "partitions": row.get('partitions'),
+                "suggestion": "compare Time directly with a half-open range (Time >= :from AND Time < :to)"
+            })
+    return violations, unknown, rows
@@ -0,0 +1,84 @@
+from flask import current_app
+from sqlalchemy import bindparam, text
+
+from models.models import db
+from services.cache import versioned_resource
+
+# 價格只在新增 / 刪除商品或修改價格時遞增 Goods_Price 的版本號，庫存異動不會使價格表失效；
+# 商店刪除 / 改名經由外鍵連帶修改 Goods 時不會觸發觸發器，由 Shops 的版本號涵蓋
+PRICE_TABLES = ('Goods_Price', 'Shops')
+
+# 價格表涵蓋所有商品，刻意整張讀取；每個 worker 只在 PRICE_TABLES 的版本號改變時執行一次，請求只讀記憶體
+ALL_PRICES_SQL = text("""
+    SELECT Store_Name, Name, Price
+    FROM Goods /* explain-gate: full-scan-ok */;
+""")
+
+# 走主鍵 (Store_Name, Name) 的範圍讀取，結果已依商品名稱排序
+SHOP_STOCK_SQL = text("""
+    SELECT Name, Stock_Quantity
+    FROM Goods
+    WHERE Store_Name = :shop_name
+    ORDER BY Name;
+""")
+
+# 批次查詢：一個敘述讀取所有指定商店的庫存，依 (Store_Name, Name) 走主鍵排序
+SHOPS_STOCK_SQL = text("""
+    SELECT Store_Name, Name, Stock_Quantity
+    FROM Goods
+    WHERE Store_Name IN :shop_names
+    ORDER BY Store_Name, Name;
+""").bindparams(bindparam('shop_names', expanding=True))
+
+
+def build_price_map():
+    """一次讀出所有商品價格，回傳 {商店: {商品名稱: 價格}}"""
+    prices = {}
+    for store_name, name, price in db.session.execute(ALL_PRICES_SQL).fetchall():
+        prices.setdefault(store_name, {})[name] = price
+    return prices
+
+
+def get_price_map():
+    """目前 worker 的商品價格表；價格、商品或商店異動時自動重建"""
+    app = current_app._get_current_object()
+    return versioned_resource(app, 'goods_prices', PRICE_TABLES, build_price_map).get()
+
+
+def shop_goods(shop_name, prices=None):
+    """
+    指定商店的商品清單：庫存即時讀取，價格取自記憶體中的價格表
+
+    價格表尚未反映的新商品（版本檢查間隔內新增）價格為 None。
+    """
+    prices = (prices if prices is not None else get_price_map()).get(shop_name, {})
+    rows = db.session.execute(SHOP_STOCK_SQL, {"shop_name": shop_name}).fetchall()
+    return [
+        {
+            "name": name,
+            "price": prices.get(name),
+            "stock": stock
+        }
+        for name, stock in rows
+    ]
+
+
+def shops_goods(shop_names):
+    """
+    多家商店的商品清單，回傳 {商店: [商品...]}；結果依傳入順序排列，不存在的商店為空列表
+
+    所有商店的庫存以單一查詢讀取，共用同一份價格表。
+    """
+    prices = get_price_map()
+    goods = {shop_name: [] for shop_name in shop_names}
+    if not goods:
+        return goods
+    rows = db.session.execute(SHOPS_STOCK_SQL, {"shop_names": list(goods)}).fetchall()
+    for store_name, name, stock in rows:
+        # 比對依資料表定序（不分大小寫），回傳的名稱可能與傳入的寫法不同
+        goods.setdefault(store_name, []).append({
+            "name": name,
+            "price": prices.get(store_name, {}).get(name),
+            "stock": stock
+        })
+    return goods
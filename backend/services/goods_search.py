@@ -0,0 +1,223 @@
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.cache import CURSOR_REWIND, AppendCursor, versioned_resource
+
+# 每次追趕最多讀取的異動筆數；超過時分多次讀取
+CHANGE_BATCH_SIZE = 5000
+
+# 索引涵蓋所有商店的商品，刻意整張讀取；只在建立 / 重建索引時執行，之後的異動由 Goods_Change 以主鍵範圍增量讀取
+ALL_GOODS_SQL = text("""
+    SELECT Store_Name, Name, Stock_Quantity, Price
+    FROM Goods /* explain-gate: full-scan-ok */;
+""")
+
+# Shops 為小型維度表
+SHOP_LOCATIONS_SQL = text("""
+    SELECT Store_Name, Branch_Name, Floor_Location
+    FROM Shops /* explain-gate: full-scan-ok */;
+""")
+
+MAX_CHANGE_SQL = text("""
+    SELECT COALESCE(MAX(Change_ID), 0)
+    FROM Goods_Change;
+""")
+
+# 建立索引時 cursor 之後已可見的異動編號，以主鍵範圍讀取
+RECENT_CHANGE_IDS_SQL = text("""
+    SELECT Change_ID
+    FROM Goods_Change
+    WHERE Change_ID > :cursor_id;
+""")
+
+# 異動紀錄只記商品鍵，目前的庫存與價格以 LEFT JOIN 主鍵讀取；Goods 中已不存在代表該鍵已刪除或改名
+CHANGES_SQL = text("""
+    SELECT C.Change_ID, C.Store_Name, C.Name, G.Name IS NOT NULL AS Present, G.Stock_Quantity, G.Price
+    FROM Goods_Change C
+    LEFT JOIN Goods G ON G.Store_Name = C.Store_Name AND G.Name = C.Name
+    WHERE C.Change_ID > :cursor_id
+    ORDER BY C.Change_ID
+    LIMIT :limit;
+""")
+
+PRUNE_CHANGES_SQL = text("""
+    DELETE FROM Goods_Change
+    WHERE Changed_At < :date_end;
+""")
+
+
+def normalize(value):
+    """全形 / 半形、大小寫統一並移除空白，查詢字串與商品名稱以相同方式處理"""
+    return ''.join(unicodedata.normalize('NFKC', value or '').casefold().split())
+
+
+def ngrams(value):
+    """單字元與相鄰兩字元的 n-gram；單字元用於一個字的查詢（例如「茶」）"""
+    grams = set(value)
+    grams.update(value[i:i + 2] for i in range(len(value) - 1))
+    return grams
+
+
+class GoodsEntry:
+    __slots__ = ('store_name', 'name', 'key', 'stock', 'price')
+
+    def __init__(self, store_name, name, stock, price):
+        self.store_name = store_name
+        self.name = name
+        self.key = normalize(name)
+        self.stock = stock
+        self.price = price
+
+
+class GoodsSearchIndex:
+    """
+    所有商店商品名稱的字元 n-gram 倒排索引
+
+    查詢字串長度為 1 時直接取該字元的 posting，否則取所有相鄰兩字元 posting 的交集（由最短的開始），
+    再以子字串比對排除不連續的誤判。商品的新增、刪除、改名與庫存 / 價格異動由 Goods_Change 增量套用；
+    商店異動（分店、樓層、刪除）則由 Shops 版本號觸發整份重建。
+    """
+
+    def __init__(self, shops, rows, change_id, seen=()):
+        self.shops = shops
+        self.entries = {}
+        self.postings = {}
+        self.cursor = AppendCursor(change_id, seen=seen)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = time.monotonic()
+        for row in rows:
+            self._put(*row)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _put(self, store_name, name, stock, price):
+        key = (store_name, name)
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.stock = stock
+            entry.price = price
+            return
+        entry = GoodsEntry(store_name, name, stock, price)
+        self.entries[key] = entry
+        for gram in ngrams(entry.key):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def _drop(self, store_name, name):
+        entry = self.entries.pop((store_name, name), None)
+        if entry is None:
+            return
+        for gram in ngrams(entry.key):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard((store_name, name))
+                if not keys:
+                    del self.postings[gram]
+
+    def apply(self, changes):
+        """套用 (Change_ID, Store_Name, Name, Present, Stock_Quantity, Price) 異動列並推進 cursor"""
+        with self._lock:
+            for _, store_name, name, present, stock, price in self.cursor.consume(changes):
+                if present:
+                    self._put(store_name, name, stock, price)
+                else:
+                    self._drop(store_name, name)
+
+    def sync(self, check_interval, max_idle):
+        """
+        最多每 check_interval 秒讀取一次新的異動並套用；回傳 False 代表距上次追趕已超過 max_idle 秒，
+        中間的異動紀錄可能已被清除，呼叫端應整份重建
+        """
+        now = time.monotonic()
+        if now - self._synced_at < check_interval:
+            return True
+        if now - self._synced_at > max_idle:
+            return False
+        # 其他執行緒正在追趕時直接使用目前的內容
+        if not self._sync_lock.acquire(blocking=False):
+            return True
+        try:
+            after = self.cursor.position
+            while True:
+                changes = db.session.execute(CHANGES_SQL, {
+                    "cursor_id": after,
+                    "limit": CHANGE_BATCH_SIZE
+                }).fetchall()
+                self.apply(changes)
+                if len(changes) < CHANGE_BATCH_SIZE:
+                    break
+                after = changes[-1][0]
+            self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+        return True
+
+    def search(self, query, branch=None, limit=50):
+        """
+        回傳 (符合的總筆數, 前 limit 筆商品)
+
+        排序為完全相符、開頭相符、其餘，同一級依名稱長度、名稱與商店排序；branch 有值時只保留該分店的商店。
+        """
+        needle = normalize(query)
+        if not needle:
+            return 0, []
+        grams = [needle] if len(needle) == 1 else sorted(
+            {needle[i:i + 2] for i in range(len(needle) - 1)}, key=lambda g: len(self.postings.get(g, ())))
+        with self._lock:
+            keys = set(self.postings.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not keys:
+                    break
+                keys &= self.postings.get(gram, set())
+            matches = []
+            for key in keys:
+                entry = self.entries[key]
+                if needle not in entry.key:
+                    continue
+                if branch is not None and self.shops.get(entry.store_name, (None, None))[0] != branch:
+                    continue
+                matches.append(entry)
+        matches.sort(key=lambda e: (0 if e.key == needle else 1 if e.key.startswith(needle) else 2,
+                                    len(e.key), e.name, e.store_name))
+        return len(matches), matches[:limit]
+
+
+def build_goods_search_index():
+    # 先讀異動編號再讀商品，讀取期間的異動會在第一次追趕時重複套用；
+    # cursor 往回退 CURSOR_REWIND 筆，建立當下尚未提交、編號較小的異動提交後仍會被讀到
+    position = max(db.session.execute(MAX_CHANGE_SQL).scalar() - CURSOR_REWIND, 0)
+    seen = [row[0] for row in db.session.execute(RECENT_CHANGE_IDS_SQL, {"cursor_id": position}).fetchall()]
+    shops = {row[0]: (row[1], row[2]) for row in db.session.execute(SHOP_LOCATIONS_SQL).fetchall()}
+    rows = db.session.execute(ALL_GOODS_SQL).fetchall()
+    return GoodsSearchIndex(shops, rows, position, seen)
+
+
+def get_goods_search_index():
+    """目前 worker 的商品搜尋索引；商品異動增量套用，商店異動或閒置過久時整份重建"""
+    app = current_app._get_current_object()
+    resource = versioned_resource(app, 'goods_search', ('Shops',), build_goods_search_index)
+    index = resource.get()
+    max_idle = app.config['GOODS_CHANGE_RETENTION_HOURS'] * 3600 / 2
+    if not index.sync(app.config['CACHE_VERSION_CHECK_SECONDS'], max_idle):
+        resource.invalidate()
+        index = resource.get()
+    return index
+
+
+def prune_goods_changes(retention_hours):
+    """刪除超過 retention_hours 小時的 Goods_Change 紀錄，回傳刪除筆數"""
+    cutoff = datetime.now() - timedelta(hours=retention_hours)
+    try:
+        deleted = db.session.execute(PRUNE_CHANGES_SQL, {"date_end": cutoff}).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return deleted
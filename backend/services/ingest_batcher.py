@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import text
+
+from models.models import db
+
+
+# PyMySQL 的 executemany 會把 INSERT ... VALUES (...) 改寫成單一多列 INSERT，一個批次只需一次往返
+INSERT_TRANSACTIONS_SQL = text("""
+    INSERT INTO Shopping_Sheet (Store_Name, Time, Price, Payment)
+    VALUES (:store_name, :time, :price, :payment);
+""")
+
+
+class IngestQueueFull(Exception):
+    """佇列已滿，呼叫端應稍後重試"""
+
+
+class IngestTimeout(Exception):
+    """等待批次提交逾時，該批資料是否寫入未知"""
+
+
+class _Submission:
+    __slots__ = ('rows', 'enqueued_at', 'done', 'error')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.error = None
+
+
+class GroupCommitBatcher:
+    """
+    交易寫入的群組提交 (group commit) 佇列
+
+    各請求呼叫 submit() 把資料列放進行程內的佇列，背景執行緒在累積 batch_size 筆
+    或最舊的一筆等待超過 flush_ms 毫秒時，以一個多列 INSERT 與一次 COMMIT 寫入整批資料，
+    提交後才喚醒該批的所有呼叫端。佇列以資料列數量為上限 (max_queued_rows)，
+    滿載時 submit() 最多等待 enqueue_timeout 秒，仍無空間則拋出 IngestQueueFull 形成背壓。
+    """
+
+    def __init__(self, app, batch_size=500, flush_ms=20, max_queued_rows=20000,
+                 enqueue_timeout=0.5, insert_sql=INSERT_TRANSACTIONS_SQL):
+        self._app = app
+        self._batch_size = batch_size
+        self._flush_interval = flush_ms / 1000.0
+        self._max_queued_rows = max_queued_rows
+        self._enqueue_timeout = enqueue_timeout
+        self._insert_sql = insert_sql
+
+        self._pending = deque()
+        self._queued_rows = 0
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='ingest-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, rows, ack_timeout=10.0):
+        """將 rows 加入佇列並阻塞至所屬批次提交；寫入失敗時拋出該批的資料庫例外"""
+        submission = _Submission(rows)
+        deadline = time.monotonic() + self._enqueue_timeout
+
+        with self._condition:
+            # 單次送出超過佇列上限時，只要佇列為空仍允許進入，避免永遠無法寫入
+            while self._queued_rows and self._queued_rows + len(rows) > self._max_queued_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise IngestQueueFull(f"Ingest queue is full ({self._queued_rows} rows pending)")
+                self._condition.wait(remaining)
+            self._pending.append(submission)
+            self._queued_rows += len(rows)
+            self._condition.notify_all()
+
+        if not submission.done.wait(ack_timeout):
+            raise IngestTimeout("Timed out waiting for batch commit")
+        if submission.error is not None:
+            raise submission.error
+        return len(rows)
+
+    def _take_batch(self):
+        with self._condition:
+            while True:
+                if self._pending:
+                    age = time.monotonic() - self._pending[0].enqueued_at
+                    if self._queued_rows >= self._batch_size or age >= self._flush_interval:
+                        break
+                    self._condition.wait(self._flush_interval - age)
+                else:
+                    self._condition.wait()
+
+            batch = []
+            batch_rows = 0
+            while self._pending and (not batch or batch_rows + len(self._pending[0].rows) <= self._batch_size):
+                submission = self._pending.popleft()
+                batch.append(submission)
+                batch_rows += len(submission.rows)
+            self._queued_rows -= batch_rows
+            # 釋出空間，喚醒因背壓而等待的請求
+            self._condition.notify_all()
+            return batch
+
+    def _insert(self, rows):
+        with db.engine.begin() as conn:
+            conn.execute(self._insert_sql, rows)
+
+    def _flush(self, batch):
+        rows = [row for submission in batch for row in submission.rows]
+        try:
+            self._insert(rows)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+            else:
+                # 整批失敗時逐一重試各請求，讓一筆錯誤資料不會拖累同批的其他請求
+                for submission in batch:
+                    try:
+                        self._insert(submission.rows)
+                    except Exception as single_error:
+                        submission.error = single_error
+        for submission in batch:
+            submission.done.set()
+
+    def _run(self):
+        with self._app.app_context():
+            while True:
+                batch = self._take_batch()
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    for submission in batch:
+                        submission.error = submission.error or e
+                        submission.done.set()
+
+
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(app):
+    """取得（必要時建立）此 worker 行程的群組提交佇列"""
+    batcher = app.extensions.get('ingest_batcher')
+    if batcher is None:
+        with _batcher_lock:
+            batcher = app.extensions.get('ingest_batcher')
+            if batcher is None:
+                batcher = GroupCommitBatcher(
+                    app,
+                    batch_size=app.config['INGEST_BATCH_SIZE'],
+                    flush_ms=app.config['INGEST_FLUSH_MS'],
+                    max_queued_rows=app.config['INGEST_MAX_QUEUED_ROWS'],
+                    enqueue_timeout=app.config['INGEST_ENQUEUE_TIMEOUT'],
+                )
+                app.extensions['ingest_batcher'] = batcher
+    return batcher
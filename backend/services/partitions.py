@@ -0,0 +1,214 @@
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from models.models import db
+
+PARTITIONED_TABLES = ('Shopping_Sheet', 'Purchase_Detail')
+CATCH_ALL_PARTITION = 'p_max'
+
+LIST_PARTITIONS_SQL = text("""
+    SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = :table_name
+      AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION;
+""")
+
+PARTITION_COUNTS_SQL = text("""
+    SELECT TABLE_NAME, COUNT(*)
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND PARTITION_NAME IS NOT NULL
+    GROUP BY TABLE_NAME;
+""")
+
+IS_PARTITIONED_SQL = text("""
+    SELECT COUNT(*)
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = :table_name
+      AND PARTITION_NAME IS NOT NULL;
+""")
+
+BOUND_PATTERN = re.compile(r"'?(\d{4}-\d{2}-\d{2})")
+
+
+class Partition:
+    __slots__ = ('name', 'upper_bound', 'rows')
+
+    def __init__(self, name, upper_bound, rows):
+        self.name = name
+        self.upper_bound = upper_bound  # 不含的上界；MAXVALUE 分區為 None
+        self.rows = rows
+
+
+class PartitionAction:
+    """
+    一組依序執行的 DDL
+
+    checks 為 {敘述: check(conn)}，執行該敘述前先呼叫，回傳 False 時略過（前一次執行已完成此步驟），
+    狀態不允許繼續時由 check 拋出例外。
+    """
+    __slots__ = ('table', 'kind', 'partitions', 'statements', 'checks')
+
+    def __init__(self, table, kind, partitions, statements, checks=None):
+        self.table = table
+        self.kind = kind
+        self.partitions = partitions
+        self.statements = statements
+        self.checks = checks or {}
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def list_partitions(table_name):
+    """依序列出資料表的 RANGE 分區；RANGE COLUMNS 的上界在 information_schema 中為帶引號的日期時間字串"""
+    partitions = []
+    for name, description, rows in db.session.execute(LIST_PARTITIONS_SQL, {"table_name": table_name}):
+        match = BOUND_PATTERN.match(description or '')
+        upper_bound = date.fromisoformat(match.group(1)) if match else None
+        partitions.append(Partition(name, upper_bound, rows or 0))
+    return partitions
+
+
+def partition_counts():
+    """回傳 {資料表: 分區數}，只包含已分區的資料表"""
+    return {table: count for table, count in db.session.execute(PARTITION_COUNTS_SQL)}
+
+
+def _has_rows(conn, source):
+    return conn.exec_driver_sql(f"SELECT 1 FROM {source} LIMIT 1").first() is not None
+
+
+def _archive_checks(table_name, name, archive):
+    """
+    封存步驟的前置檢查，讓中途失敗後可以原樣重跑
+
+    封存表已不是分區表時略過 REMOVE PARTITIONING；封存表已有資料時，若分區已空代表上次已交換完成，
+    略過 EXCHANGE 直接刪除分區，否則拒絕交換（交換會把封存表的資料換回分區，接著被 DROP PARTITION 刪除）。
+    """
+    def is_partitioned(conn):
+        return conn.execute(IS_PARTITIONED_SQL, {"table_name": archive}).scalar() > 0
+
+    def archive_is_empty(conn):
+        if not _has_rows(conn, archive):
+            return True
+        if not _has_rows(conn, f"{table_name} PARTITION ({name})"):
+            return False
+        raise RuntimeError(f"{archive} already holds rows and partition {name} is not empty; "
+                           f"move or drop {archive} before archiving {name}")
+
+    return {
+        f"ALTER TABLE {archive} REMOVE PARTITIONING": is_partitioned,
+        f"ALTER TABLE {table_name} EXCHANGE PARTITION {name} WITH TABLE {archive}": archive_is_empty,
+    }
+
+
+def _partition_clause(name, upper_bound):
+    bound = f"'{upper_bound.isoformat()}'" if upper_bound else 'MAXVALUE'
+    return f"PARTITION {name} VALUES LESS THAN ({bound})"
+
+
+def plan_future_partitions(table_name, partitions, today, months_ahead):
+    """
+    從 MAXVALUE 分區切出到 today 所在月份之後 months_ahead 個月為止的月份分區
+
+    p_max 在正常情況下是空的，REORGANIZE 只改寫資料字典；若 p_max 已有資料（例如長期未執行維護），
+    落在新月份的資料會被搬移到對應分區，需要時間，請在離峰時段執行。
+    """
+    bounded = [p.upper_bound for p in partitions if p.upper_bound]
+    if not bounded:
+        return None
+    target = add_months(month_start(today), months_ahead + 1)
+    month = max(bounded)
+    clauses = []
+    while month < target:
+        clauses.append(_partition_clause(partition_name(month), add_months(month, 1)))
+        month = add_months(month, 1)
+    if not clauses:
+        return None
+
+    names = [clause.split()[1] for clause in clauses]
+    if any(p.name == CATCH_ALL_PARTITION for p in partitions):
+        clauses.append(_partition_clause(CATCH_ALL_PARTITION, None))
+        statement = (f"ALTER TABLE {table_name} REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO (\n    "
+                     + ",\n    ".join(clauses) + "\n)")
+    else:
+        statement = f"ALTER TABLE {table_name} ADD PARTITION (\n    " + ",\n    ".join(clauses) + "\n)"
+    return PartitionAction(table_name, 'create', names, [statement])
+
+
+def plan_expired_partitions(table_name, partitions, today, retain_months, action):
+    """
+    上界不晚於保留期限起點的分區視為過期
+
+    drop 直接刪除分區；archive 先以 EXCHANGE PARTITION 把分區資料原封不動換到 <table>_archive_<分區> 一般資料表，
+    再刪除已變空的分區。兩者都不會觸發 DELETE 觸發器，Store_Daily_Revenue 中的歷史彙總會保留下來。
+    """
+    cutoff = add_months(month_start(today), -retain_months)
+    expired = [p for p in partitions if p.upper_bound and p.upper_bound <= cutoff]
+    # 至少保留一個有上界的分區，否則 RANGE 分區表無法成立
+    if expired and len(expired) == len([p for p in partitions if p.upper_bound]):
+        expired = expired[:-1]
+    if not expired:
+        return None
+
+    names = [p.name for p in expired]
+    if action != 'archive':
+        return PartitionAction(table_name, action, names, [f"ALTER TABLE {table_name} DROP PARTITION {', '.join(names)}"])
+
+    # 逐一分區完成封存與刪除，中途失敗時已完成的分區不受影響，重跑時由 checks 略過已完成的步驟
+    statements = []
+    checks = {}
+    for name in names:
+        archive = f"{table_name}_archive_{name}"
+        statements += [
+            f"CREATE TABLE IF NOT EXISTS {archive} LIKE {table_name}",
+            f"ALTER TABLE {archive} REMOVE PARTITIONING",
+            f"ALTER TABLE {table_name} EXCHANGE PARTITION {name} WITH TABLE {archive}",
+            f"ALTER TABLE {table_name} DROP PARTITION {name}",
+        ]
+        checks.update(_archive_checks(table_name, name, archive))
+    return PartitionAction(table_name, action, names, statements, checks)
+
+
+def plan_maintenance(today=None, months_ahead=3, retention_months=None, action='archive'):
+    """產生所有分區事實表的維護動作；retention_months 為 {資料表: 保留月份數}，未列出的資料表不處理過期分區"""
+    today = today or datetime.now().date()
+    retention_months = retention_months or {}
+    actions = []
+    for table_name in PARTITIONED_TABLES:
+        partitions = list_partitions(table_name)
+        if not partitions:
+            continue
+        create = plan_future_partitions(table_name, partitions, today, months_ahead)
+        if create:
+            actions.append(create)
+        if table_name in retention_months:
+            expire = plan_expired_partitions(table_name, partitions, today, retention_months[table_name], action)
+            if expire:
+                actions.append(expire)
+    return actions
+
+
+def apply_action(partition_action):
+    """依序執行 DDL；MySQL 的 DDL 會隱含提交，每個敘述各自生效"""
+    with db.engine.connect() as conn:
+        for statement in partition_action.statements:
+            check = partition_action.checks.get(statement)
+            if check is None or check(conn):
+                conn.exec_driver_sql(statement)
@@ -0,0 +1,91 @@
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.cache import latest_transaction_id, versioned_resource
+
+# 所有活動一次計算：每個活動與 Store_Daily_Revenue 中「活動期間 + 活動前同樣天數」的日彙總做範圍 JOIN，
+# 再以條件加總分成活動期與基準期。範圍 JOIN 走彙總表主鍵 (Store_Name, Sale_Date, ...)。
+EFFECTIVENESS_SELECT = """
+    SELECT PC.Store_Name, S.Branch_Name, PC.Name, PC.Method, PC.Start_Time, PC.End_Time,
+           DATEDIFF(PC.End_Time, PC.Start_Time) + 1 AS Days,
+           COALESCE(SUM(CASE WHEN R.Sale_Date >= DATE(PC.Start_Time) THEN R.Revenue END), 0) AS Campaign_Revenue,
+           COALESCE(SUM(CASE WHEN R.Sale_Date >= DATE(PC.Start_Time) THEN R.Txn_Count END), 0) AS Campaign_Txns,
+           COALESCE(SUM(CASE WHEN R.Sale_Date < DATE(PC.Start_Time) THEN R.Revenue END), 0) AS Baseline_Revenue,
+           COALESCE(SUM(CASE WHEN R.Sale_Date < DATE(PC.Start_Time) THEN R.Txn_Count END), 0) AS Baseline_Txns
+    FROM Promotional_Campaign PC
+    JOIN Shops S ON PC.Store_Name = S.Store_Name
+    LEFT JOIN Store_Daily_Revenue R
+      ON R.Store_Name = PC.Store_Name
+     AND R.Sale_Date >= DATE(PC.Start_Time) - INTERVAL (DATEDIFF(PC.End_Time, PC.Start_Time) + 1) DAY
+     AND R.Sale_Date <= DATE(PC.End_Time)
+    WHERE PC.Start_Time IS NOT NULL
+      AND PC.End_Time IS NOT NULL
+      AND PC.End_Time >= PC.Start_Time
+      {filters}
+    GROUP BY PC.Store_Name, S.Branch_Name, PC.Name, PC.Method, PC.Start_Time, PC.End_Time
+    ORDER BY PC.Start_Time, PC.Store_Name, PC.Name;
+"""
+
+# 依 (是否指定 method, 是否指定 branch) 預先組好的查詢
+EFFECTIVENESS_QUERIES = {
+    (False, False): text(EFFECTIVENESS_SELECT.format(filters="")),
+    (True, False): text(EFFECTIVENESS_SELECT.format(filters="AND PC.Method = :method")),
+    (False, True): text(EFFECTIVENESS_SELECT.format(filters="AND S.Branch_Name = :branch")),
+    (True, True): text(EFFECTIVENESS_SELECT.format(filters="AND PC.Method = :method AND S.Branch_Name = :branch")),
+}
+
+
+def _uplift_pct(campaign, baseline):
+    if not baseline:
+        return None
+    return round(float((campaign - baseline) / baseline * 100), 2)
+
+
+def compute_effectiveness(method=None, branch=None):
+    """
+    計算每個促銷活動的成效：活動期間營收與活動開始前同樣天數（基準期）的營收比較
+
+    天數以日曆日計算（包含起訖兩天），營收與交易筆數取自 Store_Daily_Revenue，因此已封存月份同樣涵蓋在內。
+    基準期營收為 0 時 uplift_pct 為 None。
+    """
+    query = EFFECTIVENESS_QUERIES[(method is not None, branch is not None)]
+    rows = db.session.execute(query, {"method": method, "branch": branch}).fetchall()
+    return [
+        {
+            "store_name": row.Store_Name,
+            "branch_name": row.Branch_Name,
+            "promotion_name": row.Name,
+            "method": row.Method,
+            "start_time": str(row.Start_Time),
+            "end_time": str(row.End_Time),
+            "days": int(row.Days),
+            "campaign_revenue": float(row.Campaign_Revenue),
+            "campaign_txn_count": int(row.Campaign_Txns),
+            "baseline_revenue": float(row.Baseline_Revenue),
+            "baseline_txn_count": int(row.Baseline_Txns),
+            "uplift": float(row.Campaign_Revenue - row.Baseline_Revenue),
+            "uplift_pct": _uplift_pct(row.Campaign_Revenue, row.Baseline_Revenue)
+        }
+        for row in rows
+    ]
+
+
+def get_effectiveness(method=None, branch=None):
+    """
+    成效報表的快取版本；每組 (method, branch) 的結果保存在同一個 dict 中
+
+    促銷活動、商店、交易（新增 / 修改 / 刪除）或彙總表重建任一有異動時，整個 dict 會被換成新的空 dict。
+    """
+    app = current_app._get_current_object()
+    results = versioned_resource(
+        app, 'promotion_effectiveness',
+        ('Promotional_Campaign', 'Shops', 'Shopping_Sheet', 'Store_Daily_Revenue'),
+        dict, probe=latest_transaction_id
+    ).get()
+    key = (method, branch)
+    report = results.get(key)
+    if report is None:
+        report = compute_effectiveness(method, branch)
+        results[key] = report
+    return report
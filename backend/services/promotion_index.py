@@ -0,0 +1,187 @@
+from bisect import bisect_right
+
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.cache import versioned_resource
+
+ALL_CAMPAIGNS_SQL = text("""
+    SELECT PC.Store_Name, S.Branch_Name, PC.Name, PC.Start_Time, PC.End_Time, PC.Method
+    FROM Promotional_Campaign PC /* explain-gate: full-scan-ok */
+    LEFT JOIN Shops S ON PC.Store_Name = S.Store_Name
+    WHERE PC.Start_Time IS NOT NULL
+      AND PC.End_Time IS NOT NULL;
+""")
+
+
+class Campaign:
+    __slots__ = ('store_name', 'branch_name', 'name', 'start', 'end', 'method')
+
+    def __init__(self, store_name, branch_name, name, start, end, method):
+        self.store_name = store_name
+        self.branch_name = branch_name
+        self.name = name
+        self.start = start
+        self.end = end
+        self.method = method
+
+    def sort_key(self):
+        return self.start, self.store_name, self.name
+
+
+class _Node:
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+
+def _build_tree(intervals):
+    """以端點中位數為中心遞迴切分的 centered interval tree；每個節點保存跨過中心點的區間"""
+    if not intervals:
+        return None
+    points = sorted(p for interval in intervals for p in (interval.start, interval.end))
+    node = _Node()
+    node.center = points[len(points) // 2]
+    here, left, right = [], [], []
+    for interval in intervals:
+        if interval.end < node.center:
+            left.append(interval)
+        elif interval.start > node.center:
+            right.append(interval)
+        else:
+            here.append(interval)
+    node.by_start = sorted(here, key=lambda i: i.start)
+    node.by_end = sorted(here, key=lambda i: i.end, reverse=True)
+    node.left = _build_tree(left)
+    node.right = _build_tree(right)
+    return node
+
+
+class IntervalIndex:
+    """
+    閉區間 [start, end] 的靜態索引
+
+    stab(t) 以 centered interval tree 查詢包含 t 的區間；overlap(a, b) = 包含 a 的區間 ∪ 起點落在 (a, b] 的區間，
+    後者由依起點排序的陣列二分搜尋取得，兩者互斥不會重複。兩種查詢皆為 O(log n + k)。
+    """
+
+    def __init__(self, intervals):
+        self._root = _build_tree(intervals)
+        self._by_start = sorted(intervals, key=lambda i: i.start)
+        self._starts = [i.start for i in self._by_start]
+
+    def __len__(self):
+        return len(self._by_start)
+
+    def stab(self, t):
+        found = []
+        node = self._root
+        while node is not None:
+            if t < node.center:
+                for interval in node.by_start:
+                    if interval.start > t:
+                        break
+                    found.append(interval)
+                node = node.left
+            elif t > node.center:
+                for interval in node.by_end:
+                    if interval.end < t:
+                        break
+                    found.append(interval)
+                node = node.right
+            else:
+                found.extend(node.by_start)
+                break
+        return found
+
+    def overlap(self, start, end):
+        found = self.stab(start)
+        lo = bisect_right(self._starts, start)
+        hi = bisect_right(self._starts, end)
+        found.extend(self._by_start[lo:hi])
+        return found
+
+
+class PromotionIndex:
+    """全部促銷活動的區間索引，另依商店與分店各建一份，讓指定範圍的查詢只與該範圍的活動數相關"""
+
+    def __init__(self, campaigns):
+        self.campaigns = campaigns
+        self.all = IntervalIndex(campaigns)
+        by_store, by_branch = {}, {}
+        for campaign in campaigns:
+            by_store.setdefault(campaign.store_name, []).append(campaign)
+            by_branch.setdefault(campaign.branch_name, []).append(campaign)
+        self.by_store = {store: IntervalIndex(items) for store, items in by_store.items()}
+        self.by_branch = {branch: IntervalIndex(items) for branch, items in by_branch.items()}
+
+    def _scope(self, store=None, branch=None):
+        if store is not None:
+            return self.by_store.get(store)
+        if branch is not None:
+            return self.by_branch.get(branch)
+        return self.all
+
+    def active_at(self, at, store=None, branch=None):
+        index = self._scope(store, branch)
+        found = index.stab(at) if index else []
+        if store is not None and branch is not None:
+            found = [c for c in found if c.branch_name == branch]
+        return sorted(found, key=Campaign.sort_key)
+
+    def conflicts_with(self, store, start, end, method=None, exclude_name=None):
+        """與預定於 store 舉辦、期間 [start, end] 的活動重疊的既有活動；method 有值時只比對相同促銷方式"""
+        return [
+            c for c in self.overlapping(start, end, store=store)
+            if (method is None or c.method == method) and c.name != exclude_name
+        ]
+
+    def overlapping(self, start, end, store=None, branch=None):
+        index = self._scope(store, branch)
+        found = index.overlap(start, end) if index else []
+        if store is not None and branch is not None:
+            found = [c for c in found if c.branch_name == branch]
+        return sorted(found, key=Campaign.sort_key)
+
+
+def find_conflicts(campaigns, same_method=True):
+    """
+    以掃描線找出同一商店中時間重疊的活動組合，回傳 [(先開始的活動, 後開始的活動), ...]
+
+    每家商店的起訖事件排序後依序掃描，維護目前進行中的活動；活動開始時與進行中的活動（same_method 時只比對同
+    促銷方式者）各成一組。區間為閉區間，相同時間點先處理開始事件，因此首尾相接也算重疊。成本為 O(n log n + k)。
+    """
+    by_store = {}
+    for campaign in campaigns:
+        by_store.setdefault(campaign.store_name, []).append(campaign)
+
+    conflicts = []
+    for store in sorted(by_store):
+        items = sorted(by_store[store], key=Campaign.sort_key)
+        events = []
+        for i, campaign in enumerate(items):
+            events.append((campaign.start, 0, i))
+            events.append((campaign.end, 1, i))
+        events.sort()
+
+        active = {}
+        for _, kind, i in events:
+            campaign = items[i]
+            group = active.setdefault(campaign.method if same_method else None, {})
+            if kind == 0:
+                conflicts.extend((items[j], campaign) for j in sorted(group))
+                group[i] = campaign
+            else:
+                del group[i]
+    return conflicts
+
+
+def build_promotion_index():
+    rows = db.session.execute(ALL_CAMPAIGNS_SQL).fetchall()
+    return PromotionIndex([Campaign(*row) for row in rows])
+
+
+def get_promotion_index():
+    """目前 worker 的促銷活動索引；Promotional_Campaign 或 Shops 有異動時自動重建"""
+    app = current_app._get_current_object()
+    return versioned_resource(app, 'promotion_index', ('Promotional_Campaign', 'Shops'),
+                              build_promotion_index).get()
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.cache import latest_purchase_serial, report_cache
+
+# 各商品在觀察期間內的進貨次數、總量與第一次 / 最後一次進貨時間；依 (商店, 分店) 範圍各一個查詢
+PURCHASE_HISTORY_QUERIES = {
+    'store': text("""
+        SELECT Store_Name, Goods, COUNT(*) AS deliveries, SUM(Amount) AS delivered,
+               MIN(Time) AS first_time, MAX(Time) AS last_time
+        FROM Purchase_Detail
+        WHERE Store_Name = :store
+          AND Time >= :date_start
+          AND Goods IS NOT NULL
+        GROUP BY Store_Name, Goods;
+    """),
+    'branch': text("""
+        SELECT PD.Store_Name, PD.Goods, COUNT(*) AS deliveries, SUM(PD.Amount) AS delivered,
+               MIN(PD.Time) AS first_time, MAX(PD.Time) AS last_time
+        FROM Shops S
+        JOIN Purchase_Detail PD ON PD.Store_Name = S.Store_Name
+        WHERE S.Branch_Name = :branch
+          AND PD.Time >= :date_start
+          AND PD.Goods IS NOT NULL
+        GROUP BY PD.Store_Name, PD.Goods;
+    """),
+}
+
+# 目前庫存（結帳會持續變動）不進快取，每次以主鍵範圍讀取
+STOCK_QUERIES = {
+    'store': text("""
+        SELECT Store_Name, Name, Stock_Quantity
+        FROM Goods
+        WHERE Store_Name = :store;
+    """),
+    'branch': text("""
+        SELECT G.Store_Name, G.Name, G.Stock_Quantity
+        FROM Shops S
+        JOIN Goods G ON G.Store_Name = S.Store_Name
+        WHERE S.Branch_Name = :branch;
+    """),
+}
+
+
+def _days(moments):
+    """datetime 清單轉為自 epoch 起算的天數（浮點數）陣列"""
+    return np.array([moment.timestamp() / 86400 for moment in moments], dtype=float)
+
+
+def load_purchase_history(scope, name, date_start):
+    """
+    範圍內各商品的進貨彙總，回傳 {"keys": [(商店, 商品), ...], 以及與 keys 對齊的 numpy 陣列}
+
+    陣列包含 deliveries（進貨次數）、delivered（總量）、first / last（第一次與最後一次進貨，epoch 天數）。
+    """
+    rows = db.session.execute(PURCHASE_HISTORY_QUERIES[scope], {
+        scope: name,
+        "date_start": str(date_start)
+    }).fetchall()
+    return {
+        "keys": [(row.Store_Name, row.Goods) for row in rows],
+        "deliveries": np.array([row.deliveries for row in rows], dtype=float),
+        "delivered": np.array([float(row.delivered or 0) for row in rows], dtype=float),
+        "first": _days([row.first_time for row in rows]),
+        "last": _days([row.last_time for row in rows]),
+    }
+
+
+def get_purchase_history(scope, name, date_start):
+    """
+    進貨彙總的快取版本；每組 (範圍, 名稱, 起始日) 的結果保存在同一個 LRU 快取中（最多 REPORT_CACHE_SIZE 組）
+
+    新增進貨（MAX(Serial_Number) 變大）、進貨紀錄被修改 / 刪除或商店異動時，整個快取會被換成新的。
+    """
+    app = current_app._get_current_object()
+    histories = report_cache(app, 'purchase_history', ('Purchase_Detail', 'Shops'), probe=latest_purchase_serial)
+    key = (scope, name, date_start)
+    history = histories.get(key)
+    if history is None:
+        history = load_purchase_history(scope, name, date_start)
+        histories.put(key, history)
+    return history
+
+
+def reorder_metrics(stock, deliveries, delivered, first, last, now):
+    """
+    以陣列一次計算所有商品的消耗速度、補貨間隔與缺貨風險，回傳 dict of numpy 陣列
+
+    期初庫存未知，假設觀察期開始時接近 0：期間消耗量 ≈ 進貨總量 - 目前庫存，除以第一次進貨至今的天數即為每日消耗量。
+    補貨間隔為第一次到最後一次進貨的平均間隔（至少兩次進貨才有值，否則為 NaN）。
+    at_risk 為「依目前消耗速度，庫存撐不到下一次照慣例補貨」：下次補貨尚未到期時比較距下次補貨的天數，
+    已逾期時比較一個補貨間隔。
+    """
+    stock = np.maximum(stock, 0)
+    elapsed = np.maximum(now - first, 1.0)
+    rate = np.maximum(delivered - stock, 0) / elapsed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        interval = np.where(deliveries >= 2, (last - first) / np.maximum(deliveries - 1, 1), np.nan)
+        cover = np.where(rate > 0, stock / rate, np.inf)
+    until_restock = last + interval - now
+    horizon = np.where(until_restock > 0, until_restock, interval)
+    at_risk = (rate > 0) & ~np.isnan(interval) & (cover < horizon)
+    reorder_point = rate * np.nan_to_num(interval)
+    suggested = np.where(at_risk, np.ceil(np.maximum(reorder_point - stock, 0)), 0)
+    return {
+        "rate": rate,
+        "interval": interval,
+        "cover": cover,
+        "until_restock": until_restock,
+        "at_risk": at_risk,
+        "reorder_point": reorder_point,
+        "suggested": suggested,
+    }
+
+
+def _rounded(value, digits=2):
+    return None if not np.isfinite(value) else round(float(value), digits)
+
+
+def reorder_report(scope, name, include_all=False, now=None):
+    """
+    範圍內各商品的補貨建議；預設只列出 at_risk 的商品，依預計缺貨天數排序
+
+    沒有任何進貨紀錄的商品不列入（無法估計消耗速度）。
+    """
+    now = now or datetime.now()
+    history_days = current_app.config['REORDER_HISTORY_DAYS']
+    date_start = now.date() - timedelta(days=history_days)
+    history = get_purchase_history(scope, name, date_start)
+
+    stocks = {(row[0], row[1]): row[2] for row in db.session.execute(STOCK_QUERIES[scope], {scope: name}).fetchall()}
+    present = np.array([key in stocks for key in history["keys"]], dtype=bool)
+    keys = [key for key, keep in zip(history["keys"], present) if keep]
+    stock = np.array([float(stocks[key] or 0) for key in keys], dtype=float)
+    deliveries = history["deliveries"][present]
+
+    metrics = reorder_metrics(
+        stock, deliveries, history["delivered"][present],
+        history["first"][present], history["last"][present], now.timestamp() / 86400
+    )
+    selected = np.arange(len(keys)) if include_all else np.flatnonzero(metrics["at_risk"])
+    order = selected[np.lexsort((metrics["until_restock"][selected], metrics["cover"][selected]))]
+
+    items = []
+    for i in order:
+        store_name, goods_name = keys[i]
+        items.append({
+            "store_name": store_name,
+            "goods_name": goods_name,
+            "stock": int(stock[i]),
+            "deliveries": int(deliveries[i]),
+            "daily_consumption": _rounded(metrics["rate"][i], 3),
+            "restock_interval_days": _rounded(metrics["interval"][i], 1),
+            "days_of_cover": _rounded(metrics["cover"][i], 1),
+            "days_until_restock": _rounded(metrics["until_restock"][i], 1),
+            "reorder_point": _rounded(metrics["reorder_point"][i], 1),
+            "suggested_quantity": int(metrics["suggested"][i]),
+            "at_risk": bool(metrics["at_risk"][i])
+        })
+    return {
+        "as_of": now.strftime('%Y-%m-%d %H:%M:%S'),
+        "history_days": history_days,
+        "at_risk": int(metrics["at_risk"].sum()),
+        "items": items
+    }
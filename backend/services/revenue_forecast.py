@@ -0,0 +1,275 @@
+import json
+from datetime import date, timedelta
+from itertools import product
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+
+# 以每個商店的歷史資料挑選一組平滑參數；所有組合與所有商店一起以陣列運算
+ALPHAS = (0.1, 0.3, 0.5)
+BETAS = (0.01, 0.05)
+GAMMAS = (0.05, 0.2, 0.4)
+PARAMETER_GRID = np.array(list(product(ALPHAS, BETAS, GAMMAS)))
+# 初始化用掉前兩週，誤差由第三週開始計算
+WARMUP_DAYS = 14
+
+STORES_SQL = text("""
+    SELECT Store_Name
+    FROM Shops /* explain-gate: full-scan-ok */
+    ORDER BY Store_Name;
+""")
+
+DAILY_REVENUE_SQL = text("""
+    SELECT Store_Name, Sale_Date, SUM(Revenue) AS revenue
+    FROM Store_Daily_Revenue
+    WHERE Sale_Date >= :date_start
+      AND Sale_Date < :date_end
+    GROUP BY Store_Name, Sale_Date;
+""")
+
+LOAD_STATE_SQL = text("""
+    SELECT Store_Name, Last_Date, Level, Trend, Season, Alpha, Beta, Gamma, Fitted_On
+    FROM Forecast_State /* explain-gate: full-scan-ok */;
+""")
+
+SAVE_STATE_SQL = text("""
+    INSERT INTO Forecast_State (Store_Name, Last_Date, Level, Trend, Season, Alpha, Beta, Gamma, Fitted_On)
+    VALUES (:store_name, :last_date, :level, :trend, :season, :alpha, :beta, :gamma, :fitted_on)
+    ON DUPLICATE KEY UPDATE
+        Last_Date = VALUES(Last_Date),
+        Level = VALUES(Level),
+        Trend = VALUES(Trend),
+        Season = VALUES(Season),
+        Alpha = VALUES(Alpha),
+        Beta = VALUES(Beta),
+        Gamma = VALUES(Gamma),
+        Fitted_On = VALUES(Fitted_On);
+""")
+
+# 每次更新都整份換成所有商店的新預測（商店數 × 預測天數），刻意不加條件
+CLEAR_FORECASTS_SQL = text("""
+    DELETE FROM Revenue_Forecast /* explain-gate: full-scan-ok */;
+""")
+
+INSERT_FORECAST_SQL = text("""
+    INSERT INTO Revenue_Forecast (Store_Name, Forecast_Date, Holt_Winters, Moving_Average, As_Of)
+    VALUES (:store_name, :forecast_date, :holt_winters, :moving_average, :as_of);
+""")
+
+
+def daily_matrix(stores, date_start, date_end):
+    """[date_start, date_end) 的 商店 × 日 營業額矩陣，沒有交易的日子為 0"""
+    days = (date_end - date_start).days
+    matrix = np.zeros((len(stores), max(days, 0)))
+    if days <= 0:
+        return matrix
+    store_index = {store: i for i, store in enumerate(stores)}
+    rows = db.session.execute(DAILY_REVENUE_SQL, {
+        "date_start": str(date_start),
+        "date_end": str(date_end)
+    }).fetchall()
+    rows = [row for row in rows if row[0] in store_index]
+    if rows:
+        stores_at = np.array([store_index[row[0]] for row in rows])
+        days_at = np.array([(row[1] - date_start).days for row in rows])
+        np.add.at(matrix, (stores_at, days_at), np.array([float(row[2] or 0) for row in rows]))
+    return matrix
+
+
+def weekdays_from(start, days):
+    """start 起連續 days 天的星期（星期一為 0）"""
+    return (start.weekday() + np.arange(days)) % 7
+
+
+def holt_winters(values, weekdays, level, trend, season, alpha, beta, gamma, damping, warmup=0):
+    """
+    以加法季節、阻尼趨勢的 Holt-Winters 依序吸收每一天，回傳 (level, trend, season, 一步預測誤差平方和)
+
+    values 為 (商店數, 天數)；level / trend 的形狀可為 (商店數,) 或 (參數組數, 商店數)，
+    season 多一個長度 7 的星期維度，alpha / beta / gamma 需能與 level 廣播。迴圈只走時間軸，商店與參數組合皆為陣列運算。
+    """
+    level = level.copy()
+    trend = trend.copy()
+    season = season.copy()
+    sse = np.zeros(level.shape)
+    for t in range(values.shape[1]):
+        y = values[:, t]
+        w = weekdays[t]
+        seasonal = season[..., w]
+        predicted = level + damping * trend + seasonal
+        if t >= warmup:
+            sse += (y - predicted) ** 2
+        new_level = alpha * (y - seasonal) + (1 - alpha) * (level + damping * trend)
+        trend = beta * (new_level - level) + (1 - beta) * damping * trend
+        season[..., w] = gamma * (y - new_level) + (1 - gamma) * seasonal
+        level = new_level
+    return level, trend, season, sse
+
+
+def initial_state(values, weekdays):
+    """以前兩週估計初始水準、趨勢與各星期的季節項"""
+    first, second = values[:, :7], values[:, 7:14]
+    level = first.mean(axis=1)
+    trend = (second.mean(axis=1) - level) / 7
+    season = np.zeros((values.shape[0], 7))
+    season[:, weekdays[:7]] = first - level[:, None]
+    return level, trend, season
+
+
+def fit(values, start, damping):
+    """
+    對每個商店挑選誤差最小的平滑參數並回傳最後一天之後的狀態
+
+    回傳 (level, trend, season, params)，params 為 (商店數, 3) 的 alpha / beta / gamma。
+    """
+    stores = values.shape[0]
+    weekdays = weekdays_from(start, values.shape[1])
+    level, trend, season = initial_state(values, weekdays)
+    grid = len(PARAMETER_GRID)
+    alpha, beta, gamma = (PARAMETER_GRID[:, i][:, None] for i in range(3))
+    level, trend, season, sse = holt_winters(
+        values, weekdays,
+        np.broadcast_to(level, (grid, stores)), np.broadcast_to(trend, (grid, stores)),
+        np.broadcast_to(season, (grid, stores, 7)),
+        alpha, beta, gamma, damping, warmup=WARMUP_DAYS
+    )
+    best = sse.argmin(axis=0)
+    picked = np.arange(stores)
+    return level[best, picked], trend[best, picked], season[best, picked], PARAMETER_GRID[best]
+
+
+def forecast_holt_winters(level, trend, season, damping, start, horizon):
+    """start 起 horizon 天的預測，(商店數, horizon)；營業額不會小於 0"""
+    damped = np.cumsum(damping ** np.arange(1, horizon + 1))
+    seasonal = season[:, weekdays_from(start, horizon)]
+    return np.maximum(level[:, None] + damped[None, :] * trend[:, None] + seasonal, 0)
+
+
+def forecast_moving_average(values, end, start, horizon):
+    """以最近幾週同一星期的平均作為預測；values 為截至 end（不含）的 (商店數, 天數)"""
+    weekdays = weekdays_from(end - timedelta(days=values.shape[1]), values.shape[1])
+    onehot = np.eye(7)[weekdays]
+    means = values @ onehot / np.maximum(onehot.sum(axis=0), 1)
+    return means[:, weekdays_from(start, horizon)]
+
+
+def load_states():
+    states = {}
+    for row in db.session.execute(LOAD_STATE_SQL).fetchall():
+        season = row.Season if isinstance(row.Season, list) else json.loads(row.Season)
+        states[row.Store_Name] = {
+            "last_date": row.Last_Date,
+            "level": row.Level,
+            "trend": row.Trend,
+            "season": season,
+            "params": (row.Alpha, row.Beta, row.Gamma),
+            "fitted_on": row.Fitted_On
+        }
+    return states
+
+
+def refresh_forecasts(today=None, full=False, echo=print):
+    """
+    更新所有商店的營業額預測，預測起點為 today（只使用昨天以前已結束的日子）
+
+    已有模型狀態的商店只以上次之後新結束的日子增量更新狀態；沒有狀態、狀態已超過 FORECAST_REFIT_DAYS 天未重新挑選參數、
+    或指定 full 時，以最近 FORECAST_HISTORY_DAYS 天重新挑選參數並擬合。兩者都以陣列一次處理所有商店，
+    結果在同一個交易中寫回 Forecast_State 與 Revenue_Forecast。
+    """
+    config = current_app.config
+    today = today or date.today()
+    last_closed = today - timedelta(days=1)
+    history_start = today - timedelta(days=config['FORECAST_HISTORY_DAYS'])
+    ma_start = today - timedelta(days=7 * config['FORECAST_MA_WEEKS'])
+    refit_before = today - timedelta(days=config['FORECAST_REFIT_DAYS'])
+    damping = config['FORECAST_DAMPING']
+    horizon = config['FORECAST_HORIZON_DAYS']
+
+    stores = [row[0] for row in db.session.execute(STORES_SQL).fetchall()]
+    if not stores:
+        return {"stores": 0, "refit": 0, "incremental": 0, "as_of": str(last_closed)}
+    states = {} if full else load_states()
+
+    def needs_refit(store):
+        state = states.get(store)
+        return state is None or state["fitted_on"] <= refit_before or state["last_date"] < history_start \
+            or state["last_date"] > last_closed
+
+    refit = [i for i, store in enumerate(stores) if needs_refit(store)]
+    incremental = [i for i, store in enumerate(stores) if not needs_refit(store)]
+
+    load_start = min([ma_start] + ([history_start] if refit else []) +
+                     [states[stores[i]]["last_date"] + timedelta(days=1) for i in incremental])
+    values = daily_matrix(stores, load_start, today)
+
+    level = np.zeros(len(stores))
+    trend = np.zeros(len(stores))
+    season = np.zeros((len(stores), 7))
+    params = np.zeros((len(stores), 3))
+    fitted_on = [today] * len(stores)
+
+    if refit:
+        offset = (history_start - load_start).days
+        level[refit], trend[refit], season[refit], params[refit] = fit(
+            values[refit, offset:], history_start, damping)
+        echo(f"  refit {len(refit)} stores on {values.shape[1] - offset} days")
+
+    # 增量更新：依上次更新的日期分組，每組以陣列一次吸收之後新結束的日子
+    groups = {}
+    for i in incremental:
+        groups.setdefault(states[stores[i]]["last_date"], []).append(i)
+    for last_date, members in groups.items():
+        state_rows = [states[stores[i]] for i in members]
+        offset = (last_date + timedelta(days=1) - load_start).days
+        member_params = np.array([state["params"] for state in state_rows])
+        level[members], trend[members], season[members], _ = holt_winters(
+            values[members, offset:], weekdays_from(last_date + timedelta(days=1), values.shape[1] - offset),
+            np.array([state["level"] for state in state_rows]),
+            np.array([state["trend"] for state in state_rows]),
+            np.array([state["season"] for state in state_rows], dtype=float),
+            member_params[:, 0], member_params[:, 1], member_params[:, 2], damping
+        )
+        params[members] = member_params
+        for i, state in zip(members, state_rows):
+            fitted_on[i] = state["fitted_on"]
+        echo(f"  updated {len(members)} stores with {values.shape[1] - offset} new days since {last_date}")
+
+    holt = forecast_holt_winters(level, trend, season, damping, today, horizon)
+    moving = forecast_moving_average(values[:, (ma_start - load_start).days:], today, today, horizon)
+
+    try:
+        db.session.execute(SAVE_STATE_SQL, [
+            {
+                "store_name": store,
+                "last_date": str(last_closed),
+                "level": float(level[i]),
+                "trend": float(trend[i]),
+                "season": json.dumps([round(float(v), 6) for v in season[i]]),
+                "alpha": float(params[i, 0]),
+                "beta": float(params[i, 1]),
+                "gamma": float(params[i, 2]),
+                "fitted_on": str(fitted_on[i])
+            }
+            for i, store in enumerate(stores)
+        ])
+        db.session.execute(CLEAR_FORECASTS_SQL)
+        db.session.execute(INSERT_FORECAST_SQL, [
+            {
+                "store_name": store,
+                "forecast_date": str(today + timedelta(days=h)),
+                "holt_winters": round(float(holt[i, h]), 2),
+                "moving_average": round(float(moving[i, h]), 2),
+                "as_of": str(last_closed)
+            }
+            for i, store in enumerate(stores)
+            for h in range(horizon)
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"stores": len(stores), "refit": len(refit), "incremental": len(incremental), "as_of": str(last_closed)}
@@ -0,0 +1,70 @@
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.transaction_archive import get_archive
+
+
+# 由 Shopping_Sheet 重新計算指定區間的每日彙總
+REBUILD_RANGE_SQL = text("""
+    INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+    SELECT SS.Store_Name, S.Branch_Name, DATE(SS.Time), COALESCE(SS.Payment, ''),
+           SUM(COALESCE(SS.Price, 0)), COUNT(*)
+    FROM Shopping_Sheet SS
+    JOIN Shops S ON SS.Store_Name = S.Store_Name
+    WHERE SS.Time >= :date_start
+      AND SS.Time < :date_end
+    GROUP BY SS.Store_Name, S.Branch_Name, DATE(SS.Time), COALESCE(SS.Payment, '');
+""")
+
+DELETE_RANGE_SQL = text("""
+    DELETE FROM Store_Daily_Revenue
+    WHERE Sale_Date >= :date_start
+      AND Sale_Date < :date_end;
+""")
+
+BUMP_VERSION_SQL = text("""
+    CALL bump_table_version('Store_Daily_Revenue');
+""")
+
+DATA_RANGE_SQL = text("""
+    SELECT DATE(MIN(Time)), DATE(MAX(Time)) + INTERVAL 1 DAY
+    FROM Shopping_Sheet;
+""")
+
+
+def rebuild_store_daily_revenue(date_start=None, date_end=None):
+    """
+    重建 Store_Daily_Revenue 中 [date_start, date_end) 區間的彙總資料
+
+    未指定區間時以 Shopping_Sheet 的最早與最晚交易日為範圍。刪除與重算在同一個交易中完成，
+    INSERT ... SELECT 會鎖住讀取到的交易列，期間寫入的新交易會等到重建完成後再由觸發器累加。
+    封存 horizon 之前的交易已不在 Shopping_Sheet 中，區間起點會被提前到 horizon，保留已封存月份的彙總。
+    重建後遞增 Store_Daily_Revenue 的版本號，讓依彙總表計算的快取失效。
+    回傳重建後的彙總列數。
+    """
+
+    if date_start is None or date_end is None:
+        first_day, end_day = db.session.execute(DATA_RANGE_SQL).fetchone()
+        if first_day is None:
+            return 0
+        date_start = date_start or first_day
+        date_end = date_end or end_day
+
+    horizon = get_archive(current_app).horizon
+    if horizon is not None and str(date_start) < str(horizon):
+        date_start = horizon
+        if str(date_end) <= str(date_start):
+            return 0
+
+    params = {"date_start": str(date_start), "date_end": str(date_end)}
+    try:
+        db.session.execute(DELETE_RANGE_SQL, params)
+        result = db.session.execute(REBUILD_RANGE_SQL, params)
+        db.session.execute(BUMP_VERSION_SQL)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return result.rowcount
@@ -0,0 +1,148 @@
+import numpy as np
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.employee_index import SLOT_MINUTES, SLOTS_PER_DAY
+from services.transaction_archive import get_archive
+
+# 分店各小時（不分日期）的交易筆數與營業額
+BRANCH_HOURLY_SALES_SQL = text("""
+    SELECT HOUR(SS.Time) AS hour, COUNT(*) AS txn_count, SUM(SS.Price) AS revenue
+    FROM Shopping_Sheet SS
+    JOIN Shops S ON SS.Store_Name = S.Store_Name
+    WHERE S.Branch_Name = :branch
+      AND SS.Time >= :date_start
+      AND SS.Time < :date_end
+    GROUP BY hour;
+""")
+
+BRANCH_STORES_SQL = text("""
+    SELECT Store_Name
+    FROM Shops
+    WHERE Branch_Name = :branch;
+""")
+
+
+def slot_labels():
+    return [f"{slot * SLOT_MINUTES // 60:02d}:{slot * SLOT_MINUTES % 60:02d}" for slot in range(SLOTS_PER_DAY)]
+
+
+def headcount(starts, ends, groups, group_count):
+    """
+    以差分陣列計算各群組每個時段開始時的在班人數，回傳 shape (group_count, SLOTS_PER_DAY) 的陣列
+
+    starts / ends 為上下班分鐘數（閉區間），groups 為每位員工所屬群組的索引；跨夜班拆成
+    [start, 23:59] 與 [00:00, end] 兩段。每段在第一個涵蓋的時段 +1、最後一個涵蓋的時段之後 -1，
+    再沿時段方向 cumsum 即為人數。
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+    overnight = starts > ends
+    seg_starts = np.concatenate([starts, np.zeros(int(overnight.sum()), dtype=np.int64)])
+    seg_ends = np.concatenate([np.where(overnight, 24 * 60 - 1, ends), ends[overnight]])
+    seg_groups = np.concatenate([groups, groups[overnight]])
+
+    first = -(-seg_starts // SLOT_MINUTES)
+    last = np.minimum(seg_ends // SLOT_MINUTES, SLOTS_PER_DAY - 1)
+    valid = first <= last
+
+    diff = np.zeros((group_count, SLOTS_PER_DAY + 1), dtype=np.int64)
+    np.add.at(diff, (seg_groups[valid], first[valid]), 1)
+    np.add.at(diff, (seg_groups[valid], last[valid] + 1), -1)
+    return np.cumsum(diff, axis=1)[:, :SLOTS_PER_DAY]
+
+
+def branch_coverage(branch, employees):
+    """
+    分店整體與各地點（商場 / 各商店）依職位的每時段在班人數
+
+    回傳 (branch_total, locations)：branch_total 為 {"positions": {職位: [人數...]}, "total": [人數...]}，
+    locations 為商場員工在前、其次依商店名稱排序的同結構清單，另附 location 與 source。
+    排班無法解析的員工不列入。
+    """
+    staffed = [e for e in employees if e.shift_start is not None and e.shift_end is not None]
+    group_index = {}
+    groups = []
+    for employee in staffed:
+        key = (employee.source, employee.location, employee.position or '')
+        groups.append(group_index.setdefault(key, len(group_index)))
+    keys = list(group_index)
+    counts = headcount([e.shift_start for e in staffed], [e.shift_end for e in staffed], groups, len(keys))
+
+    positions = sorted({position for _, _, position in keys})
+    position_index = {position: i for i, position in enumerate(positions)}
+    by_position = np.zeros((len(positions), SLOTS_PER_DAY), dtype=np.int64)
+    np.add.at(by_position, [position_index[position] for _, _, position in keys], counts)
+
+    locations = {}
+    for (source, location, position), row in zip(keys, counts):
+        entry = locations.setdefault((source, location), {
+            "location": location,
+            "source": source,
+            "positions": {},
+            "total": np.zeros(SLOTS_PER_DAY, dtype=np.int64)
+        })
+        entry["positions"][position] = row.tolist()
+        entry["total"] += row
+
+    ordered = [locations[key] for key in sorted(locations, key=lambda k: (k[0], k[1] or ''))]
+    for entry in ordered:
+        entry["positions"] = dict(sorted(entry["positions"].items()))
+        entry["total"] = entry["total"].tolist()
+
+    branch_total = {
+        "positions": {position: row.tolist() for position, row in zip(positions, by_position)},
+        "total": by_position.sum(axis=0).tolist()
+    }
+    return branch_total, ordered
+
+
+def hourly_sales(branch, date_start, date_end):
+    """
+    [date_start, date_end) 期間分店各小時（不分日期）的交易筆數與營業額合計，回傳兩個長度 24 的 numpy 陣列
+
+    封存 horizon 之前的部分由封存檔計算。
+    """
+    counts = np.zeros(24)
+    revenue = np.zeros(24)
+    archive = get_archive(current_app._get_current_object())
+    horizon = archive.horizon
+    if horizon is not None and date_start < horizon:
+        stores = [row[0] for row in db.session.execute(BRANCH_STORES_SQL, {"branch": branch})]
+        for key, (amount, count) in archive.hourly(date_start, min(date_end, horizon), stores).items():
+            hour = int(key[11:13])
+            counts[hour] += count
+            revenue[hour] += amount
+        date_start = max(date_start, horizon)
+
+    if date_start < date_end:
+        rows = db.session.execute(BRANCH_HOURLY_SALES_SQL, {
+            "branch": branch,
+            "date_start": str(date_start),
+            "date_end": str(date_end)
+        }).fetchall()
+        for hour, count, amount in rows:
+            counts[int(hour)] += int(count)
+            revenue[int(hour)] += float(amount or 0)
+
+    return counts, revenue
+
+
+def sales_overlay(branch, date_start, date_end, total_headcount):
+    """各小時平均交易筆數、營業額與平均在班人數，以及每位在班人員分攤的交易筆數（人數為 0 時為 None）"""
+    counts, revenue = hourly_sales(branch, date_start, date_end)
+    days = max((date_end - date_start).days, 1)
+    staff = np.asarray(total_headcount, dtype=float).reshape(24, 60 // SLOT_MINUTES).mean(axis=1)
+    avg_counts = counts / days
+    hourly = []
+    for hour in range(24):
+        hourly.append({
+            "hour": f"{hour:02d}:00",
+            "avg_txn_count": round(float(avg_counts[hour]), 2),
+            "avg_revenue": round(float(revenue[hour] / days), 2),
+            "avg_staff": round(float(staff[hour]), 2),
+            "txn_per_staff": round(float(avg_counts[hour] / staff[hour]), 2) if staff[hour] else None
+        })
+    return {"days": days, "hourly": hourly}
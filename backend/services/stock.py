@@ -0,0 +1,130 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models.models import db
+
+# 條件式扣庫存：檢查與扣除在同一個 UPDATE 內完成，不需要先 SELECT 再寫回，
+# 同一商品的並行請求只在該列的 row lock 上排隊，不會超賣也不會遺失更新
+DECREMENT_STOCK_SQL = text("""
+    UPDATE Goods
+    SET Stock_Quantity = Stock_Quantity - :quantity
+    WHERE Store_Name = :store_name
+      AND Name = :goods_name
+      AND Stock_Quantity >= :quantity;
+""")
+
+# Stock_Quantity 為 INT；超過上限的入庫不更新，避免 DataError
+MAX_STOCK = 2147483647
+
+INCREMENT_STOCK_SQL = text(f"""
+    UPDATE Goods
+    SET Stock_Quantity = COALESCE(Stock_Quantity, 0) + :quantity
+    WHERE Store_Name = :store_name
+      AND Name = :goods_name
+      AND COALESCE(Stock_Quantity, 0) <= {MAX_STOCK} - :quantity;
+""")
+
+# 只在扣除 / 入庫失敗時讀取，用來區分商品不存在與庫存不足（或超過上限）
+STOCK_SQL = text("""
+    SELECT Stock_Quantity
+    FROM Goods
+    WHERE Store_Name = :store_name
+      AND Name = :goods_name;
+""")
+
+INSERT_PURCHASE_SQL = text("""
+    INSERT INTO Purchase_Detail (Supplier, Time, Store_Name, Goods, Amount)
+    VALUES (:supplier, :time, :store_name, :goods_name, :quantity);
+""")
+
+
+class GoodsNotFound(Exception):
+    """商店中沒有此商品"""
+
+    def __init__(self, store_name, goods_name):
+        super().__init__(f"Goods not found: {goods_name} in {store_name}")
+        self.store_name = store_name
+        self.goods_name = goods_name
+
+
+class InsufficientStock(Exception):
+    """庫存不足，整筆扣除已回滾"""
+
+    def __init__(self, store_name, goods_name, requested, available):
+        super().__init__(f"Insufficient stock for {goods_name} in {store_name}: "
+                         f"requested {requested}, available {available}")
+        self.store_name = store_name
+        self.goods_name = goods_name
+        self.requested = requested
+        self.available = available
+
+
+def merge_items(items):
+    """
+    合併同一商品的數量並依商品名稱排序，回傳 [(goods_name, quantity), ...]
+
+    所有請求以相同順序鎖定商品列，多品項的購物籃彼此之間不會死結。
+    """
+    merged = {}
+    for goods_name, quantity in items:
+        merged[goods_name] = merged.get(goods_name, 0) + quantity
+    return sorted(merged.items())
+
+
+def decrement_stock(store_name, items):
+    """
+    在同一個交易中扣除多項商品的庫存，任一項不足時全部回滾
+
+    items 為 [(goods_name, quantity), ...]，quantity 需為正整數。
+    商品不存在時拋出 GoodsNotFound，庫存不足時拋出 InsufficientStock。回傳扣除的品項數。
+    """
+    merged = merge_items(items)
+    try:
+        for goods_name, quantity in merged:
+            params = {"store_name": store_name, "goods_name": goods_name, "quantity": quantity}
+            if db.session.execute(DECREMENT_STOCK_SQL, params).rowcount == 1:
+                continue
+            row = db.session.execute(STOCK_SQL, params).first()
+            if row is None:
+                raise GoodsNotFound(store_name, goods_name)
+            raise InsufficientStock(store_name, goods_name, quantity, row[0] or 0)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(merged)
+
+
+def replenish_stock(store_name, supplier, items, received_at=None):
+    """
+    進貨入庫：在同一個交易中增加各商品庫存，並各寫入一筆 Purchase_Detail
+
+    items 為 [(goods_name, quantity), ...]；商品不存在時拋出 GoodsNotFound，入庫後庫存會超過 INT 上限時拋出 ValueError，
+    兩者都全部回滾；供應商不存在時由 Purchase_Detail 的觸發器拒絕（IntegrityError）。回傳入庫的品項數。
+    """
+    merged = merge_items(items)
+    received_at = received_at or datetime.now().replace(microsecond=0)
+    try:
+        for goods_name, quantity in merged:
+            params = {"store_name": store_name, "goods_name": goods_name, "quantity": quantity}
+            if db.session.execute(INCREMENT_STOCK_SQL, params).rowcount == 1:
+                continue
+            if db.session.execute(STOCK_SQL, params).first() is None:
+                raise GoodsNotFound(store_name, goods_name)
+            raise ValueError(f"Stock of {goods_name} in {store_name} would exceed {MAX_STOCK}")
+        db.session.execute(INSERT_PURCHASE_SQL, [
+            {
+                "supplier": supplier,
+                "time": received_at,
+                "store_name": store_name,
+                "goods_name": goods_name,
+                "quantity": quantity
+            }
+            for goods_name, quantity in merged
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(merged)
@@ -0,0 +1,237 @@
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import db
+from services.cache import CURSOR_REWIND, AppendCursor, latest_purchase_serial, report_cache, versioned_resource
+
+# 每次追趕最多讀取的新進貨筆數；超過時分多次讀取
+PURCHASE_BATCH_SIZE = 5000
+
+SUPPLIER_STATS_SELECT = """
+    SELECT Supplier, COUNT(*) AS deliveries, SUM(Amount) AS amount,
+           COUNT(DISTINCT Store_Name) AS stores, COUNT(DISTINCT Goods) AS goods,
+           COUNT(DISTINCT DATE(Time)) AS delivery_days, MIN(Time) AS first_time, MAX(Time) AS last_time
+    FROM Purchase_Detail
+    WHERE Time >= :date_start
+      AND Time < :date_end
+      AND Supplier IS NOT NULL
+      {filters}
+    GROUP BY Supplier
+    ORDER BY Supplier;
+"""
+
+SUPPLIER_STORES_SELECT = """
+    SELECT Supplier, Store_Name, COUNT(*) AS deliveries, SUM(Amount) AS amount, MAX(Time) AS last_time
+    FROM Purchase_Detail
+    WHERE Time >= :date_start
+      AND Time < :date_end
+      AND Supplier IS NOT NULL
+      {filters}
+    GROUP BY Supplier, Store_Name
+    ORDER BY Supplier, Store_Name;
+"""
+
+# 依是否指定供應商預先組好的查詢
+SUPPLIER_STATS_QUERIES = {
+    False: text(SUPPLIER_STATS_SELECT.format(filters="")),
+    True: text(SUPPLIER_STATS_SELECT.format(filters="AND Supplier = :supplier")),
+}
+SUPPLIER_STORES_QUERIES = {
+    False: text(SUPPLIER_STORES_SELECT.format(filters="")),
+    True: text(SUPPLIER_STORES_SELECT.format(filters="AND Supplier = :supplier")),
+}
+
+# 供應商 ↔ 商店的全期間彙總，建立供應鏈圖時讀取一次。圖本身就是全期間的彙總，刻意掃描整張 Purchase_Detail：
+# 每個 worker 只在圖重建（進貨被修改 / 刪除或商店異動）時執行，之後的新進貨由 NEW_PURCHASES_SQL 以主鍵範圍增量累加；
+# 表的大小受分區保留期限 (PARTITION_RETENTION_MONTHS) 限制
+SUPPLY_EDGES_SQL = text("""
+    SELECT Supplier, Store_Name, COUNT(*) AS deliveries, SUM(Amount) AS amount, MIN(Time) AS first_time, MAX(Time) AS last_time
+    FROM Purchase_Detail /* explain-gate: full-scan-ok */
+    WHERE Supplier IS NOT NULL
+      AND Store_Name IS NOT NULL
+    GROUP BY Supplier, Store_Name;
+""")
+
+# 建立之後新增的進貨；Serial_Number 為 AUTO_INCREMENT，由主鍵範圍讀取
+NEW_PURCHASES_SQL = text("""
+    SELECT Serial_Number, Supplier, Store_Name, Amount, Time
+    FROM Purchase_Detail
+    WHERE Serial_Number > :cursor_id
+    ORDER BY Serial_Number
+    LIMIT :limit;
+""")
+
+# 建立時 cursor 之後已可見的進貨編號；這些進貨已計入彙總，sync() 不可再累加
+RECENT_SERIALS_SQL = text("""
+    SELECT Serial_Number
+    FROM Purchase_Detail
+    WHERE Serial_Number > :cursor_id;
+""")
+
+
+def supplier_stats(date_start, date_end, supplier=None):
+    """
+    [date_start, date_end) 期間各供應商的進貨彙總與服務的商店
+
+    frequency_per_week 為期間內每週平均進貨次數；avg_interval_days 為有進貨的日子之間的平均間隔（少於兩天時為 None）。
+    """
+    params = {"date_start": str(date_start), "date_end": str(date_end), "supplier": supplier}
+    has_supplier = supplier is not None
+    stores = {}
+    for row in db.session.execute(SUPPLIER_STORES_QUERIES[has_supplier], params).fetchall():
+        stores.setdefault(row.Supplier, []).append({
+            "store_name": row.Store_Name,
+            "deliveries": int(row.deliveries),
+            "amount": int(row.amount or 0),
+            "last_delivery": str(row.last_time)
+        })
+
+    weeks = max((date_end - date_start).days, 1) / 7
+    stats = []
+    for row in db.session.execute(SUPPLIER_STATS_QUERIES[has_supplier], params).fetchall():
+        days = int(row.delivery_days)
+        span = (row.last_time.date() - row.first_time.date()).days
+        stats.append({
+            "supplier": row.Supplier,
+            "deliveries": int(row.deliveries),
+            "amount": int(row.amount or 0),
+            "store_count": int(row.stores),
+            "goods_count": int(row.goods),
+            "delivery_days": days,
+            "frequency_per_week": round(row.deliveries / weeks, 2),
+            "avg_interval_days": round(span / (days - 1), 1) if days > 1 else None,
+            "first_delivery": str(row.first_time),
+            "last_delivery": str(row.last_time),
+            "stores": stores.get(row.Supplier, [])
+        })
+    return stats
+
+
+def get_supplier_stats(date_start, date_end, supplier=None):
+    """供應商彙總的快取版本（LRU，最多 REPORT_CACHE_SIZE 組參數）；新增進貨或進貨紀錄被修改 / 刪除時整份失效"""
+    app = current_app._get_current_object()
+    results = report_cache(app, 'supplier_stats', ('Purchase_Detail',), probe=latest_purchase_serial)
+    key = (date_start, date_end, supplier)
+    stats = results.get(key)
+    if stats is None:
+        stats = supplier_stats(date_start, date_end, supplier)
+        results.put(key, stats)
+    return stats
+
+
+class SupplyEdge:
+    __slots__ = ('supplier', 'store_name', 'deliveries', 'amount', 'first', 'last')
+
+    def __init__(self, supplier, store_name, deliveries=0, amount=0, first=None, last=None):
+        self.supplier = supplier
+        self.store_name = store_name
+        self.deliveries = deliveries
+        self.amount = amount
+        self.first = first
+        self.last = last
+
+    def add(self, deliveries, amount, first, last):
+        self.deliveries += deliveries
+        self.amount += amount
+        self.first = first if self.first is None or first < self.first else self.first
+        self.last = last if self.last is None or last > self.last else self.last
+
+    def to_json(self):
+        return {
+            "supplier": self.supplier,
+            "store_name": self.store_name,
+            "deliveries": self.deliveries,
+            "amount": self.amount,
+            "first_delivery": str(self.first),
+            "last_delivery": str(self.last)
+        }
+
+
+class SupplyGraph:
+    """
+    供應商 ↔ 商店的二部圖，邊上保存全期間的進貨次數、總量與首末次進貨時間
+
+    建立時以一個 GROUP BY 查詢讀出所有邊，之後新增的進貨依 Serial_Number 增量累加；
+    進貨紀錄被修改或刪除時（Purchase_Detail 版本號改變）整份重建。
+    """
+
+    def __init__(self, rows, serial, seen=()):
+        self.by_supplier = {}
+        self.by_store = {}
+        self.cursor = AppendCursor(serial, seen=seen)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = time.monotonic()
+        for supplier, store_name, deliveries, amount, first, last in rows:
+            self._edge(supplier, store_name).add(int(deliveries), int(amount or 0), first, last)
+
+    def _edge(self, supplier, store_name):
+        edge = self.by_supplier.setdefault(supplier, {}).get(store_name)
+        if edge is None:
+            edge = SupplyEdge(supplier, store_name)
+            self.by_supplier[supplier][store_name] = edge
+            self.by_store.setdefault(store_name, {})[supplier] = edge
+        return edge
+
+    def apply(self, purchases):
+        """累加 (Serial_Number, Supplier, Store_Name, Amount, Time) 新進貨列；已累加過的編號會被略過"""
+        with self._lock:
+            for _, supplier, store_name, amount, at in self.cursor.consume(purchases):
+                if supplier is not None and store_name is not None:
+                    self._edge(supplier, store_name).add(1, int(amount or 0), at, at)
+
+    def sync(self, check_interval):
+        """最多每 check_interval 秒讀取一次新增的進貨並累加"""
+        if time.monotonic() - self._synced_at < check_interval:
+            return
+        # 其他執行緒正在追趕時直接使用目前的內容
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            after = self.cursor.position
+            while True:
+                purchases = db.session.execute(NEW_PURCHASES_SQL, {
+                    "cursor_id": after,
+                    "limit": PURCHASE_BATCH_SIZE
+                }).fetchall()
+                self.apply(purchases)
+                if len(purchases) < PURCHASE_BATCH_SIZE:
+                    break
+                after = purchases[-1][0]
+            self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def edges(self, supplier=None, store_name=None):
+        """依供應商、商店排序的邊；可只取某供應商或某商店的鄰接邊"""
+        with self._lock:
+            if supplier is not None:
+                found = list(self.by_supplier.get(supplier, {}).values())
+                if store_name is not None:
+                    found = [edge for edge in found if edge.store_name == store_name]
+            elif store_name is not None:
+                found = list(self.by_store.get(store_name, {}).values())
+            else:
+                found = [edge for edges in self.by_supplier.values() for edge in edges.values()]
+            edges = [edge.to_json() for edge in found]
+        return sorted(edges, key=lambda edge: (edge["supplier"], edge["store_name"]))
+
+
+def build_supply_graph():
+    # 所有查詢在同一個交易的一致性快照中讀取，彙總恰好涵蓋快照中可見的進貨；
+    # cursor 往回退 CURSOR_REWIND 筆並標記其中已可見的編號，建立當下尚未提交、編號較小的進貨提交後仍由 sync() 累加
+    serial = max((latest_purchase_serial() or 0) - CURSOR_REWIND, 0)
+    seen = [row[0] for row in db.session.execute(RECENT_SERIALS_SQL, {"cursor_id": serial}).fetchall()]
+    rows = db.session.execute(SUPPLY_EDGES_SQL).fetchall()
+    return SupplyGraph(rows, serial, seen)
+
+
+def get_supply_graph():
+    """目前 worker 的供應鏈圖；新增進貨增量累加，修改 / 刪除進貨或商店異動時整份重建"""
+    app = current_app._get_current_object()
+    graph = versioned_resource(app, 'supply_graph', ('Purchase_Detail', 'Shops'), build_supply_graph).get()
+    graph.sync(app.config['CACHE_VERSION_CHECK_SECONDS'])
+    return graph
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+
+def bucket_start(value, granularity):
+    """回傳 value 所在時間桶的起點（hour 回傳 datetime，其餘回傳 date；週以星期一為起點）"""
+    if granularity == 'hour':
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        return value.replace(minute=0, second=0, microsecond=0)
+
+    if isinstance(value, datetime):
+        value = value.date()
+    if granularity == 'day':
+        return value
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    raise ValueError(f"Invalid granularity: {granularity}")
+
+
+def next_bucket(value, granularity):
+    if granularity == 'hour':
+        return value + timedelta(hours=1)
+    if granularity == 'day':
+        return value + timedelta(days=1)
+    if granularity == 'week':
+        return value + timedelta(weeks=1)
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def bucket_key(value, granularity):
+    """時間桶的字串表示，與 SQL 端 DATE_FORMAT / DATE 的輸出一致"""
+    if granularity == 'hour':
+        return value.strftime('%Y-%m-%d %H:00:00')
+    return value.isoformat()
+
+
+def count_buckets(date_start, date_end, granularity):
+    """[date_start, date_end) 區間涵蓋的時間桶數量"""
+    days = (date_end - date_start).days
+    last_day = date_end - timedelta(days=1)
+    if granularity == 'hour':
+        return days * 24
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        return (bucket_start(last_day, 'week') - bucket_start(date_start, 'week')).days // 7 + 1
+    return (last_day.year - date_start.year) * 12 + (last_day.month - date_start.month) + 1
+
+
+def iter_bucket_keys(date_start, date_end, granularity):
+    """依序產生 [date_start, date_end) 區間內每個時間桶的字串鍵，用來補齊沒有交易的時段"""
+    current = bucket_start(date_start, granularity)
+    end = datetime(date_end.year, date_end.month, date_end.day) if granularity == 'hour' else date_end
+    while current < end:
+        yield bucket_key(current, granularity)
+        current = next_bucket(current, granularity)
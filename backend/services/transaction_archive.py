@@ -0,0 +1,358 @@
+import json
+import os
+import struct
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import text
+
+from models.models import db
+from services.partitions import list_partitions
+
+# 單一月份的欄式封存檔：
+#   MAGIC (8 bytes) | header 長度 (uint64, little-endian) | JSON header | 各欄位陣列（皆對齊 8 bytes）
+# header 記錄列數、商店與付款方式的字典，以及每個欄位的 dtype 與檔案內位移，讀取時以 np.memmap 直接對應，
+# 不需解壓縮或載入整個檔案。字串欄位以字典編碼（商店 uint16、付款方式 uint8），時間存為微秒整數、金額存為「分」，
+# 每筆交易固定 27 bytes，且檔內依 (Time, Transaction_ID) 排序，區間查詢以二分搜尋定位。
+MAGIC = b'SSARCH01'
+FILE_SUFFIX = '.ssa'
+MANIFEST = 'manifest.json'
+EPOCH = datetime(1970, 1, 1)
+NULL_PRICE = np.iinfo(np.int64).min
+COLUMNS = (
+    ('transaction_id', '<i8'),
+    ('time', '<i8'),
+    ('price', '<i8'),
+    ('store', '<u2'),
+    ('payment', '<u1'),
+)
+
+
+def to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def month_key(month):
+    return f"{month:%Y-%m}"
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+class ArchiveWriter:
+    """依 (Time, Transaction_ID) 順序逐筆加入交易，close() 時寫出單一月份的封存檔"""
+
+    def __init__(self, path):
+        self.path = path
+        self._stores = {}
+        self._payments = {}
+        self._columns = {name: [] for name, _ in COLUMNS}
+
+    def _code(self, dictionary, value, limit):
+        code = dictionary.get(value)
+        if code is None:
+            if len(dictionary) >= limit:
+                raise ValueError(f"Too many distinct values for dictionary column (limit {limit})")
+            code = dictionary[value] = len(dictionary)
+        return code
+
+    def append(self, transaction_id, store_name, time, price, payment):
+        columns = self._columns
+        columns['transaction_id'].append(transaction_id)
+        columns['time'].append(to_micros(time))
+        columns['price'].append(NULL_PRICE if price is None else int(Decimal(price) * 100))
+        columns['store'].append(self._code(self._stores, store_name, 65536))
+        columns['payment'].append(self._code(self._payments, payment, 256))
+
+    def close(self):
+        """寫入暫存檔後 fsync 再改名，讀取端不會看到寫到一半的檔案；回傳列數"""
+        rows = len(self._columns['time'])
+        arrays = [(name, np.asarray(self._columns[name], dtype=dtype)) for name, dtype in COLUMNS]
+
+        header = {
+            "rows": rows,
+            "stores": list(self._stores),
+            "payments": list(self._payments),
+            "columns": {},
+        }
+        # 先以暫定位移估算 header 長度，再預留空間讓實際位移寫回後長度不變
+        header_size = _align(len(json.dumps(header, ensure_ascii=False).encode('utf-8')) + 64 * len(COLUMNS))
+        offset = _align(len(MAGIC) + 8 + header_size)
+        for name, array in arrays:
+            header["columns"][name] = {"dtype": array.dtype.str, "offset": offset}
+            offset = _align(offset + array.nbytes)
+        encoded = json.dumps(header, ensure_ascii=False).encode('utf-8').ljust(header_size)
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', header_size))
+            f.write(encoded)
+            for name, array in arrays:
+                f.seek(header["columns"][name]["offset"])
+                f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return rows
+
+
+class MonthArchive:
+    """以 memmap 開啟的單月封存檔"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a transaction archive: {path}")
+            header_size, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_size).decode('utf-8'))
+
+        self.rows = header["rows"]
+        self.stores = header["stores"]
+        self.payments = header["payments"]
+        self._store_codes = {name: code for code, name in enumerate(self.stores)}
+        self._payment_codes = {name: code for code, name in enumerate(self.payments)}
+        for name, spec in header["columns"].items():
+            column = np.memmap(path, dtype=np.dtype(spec["dtype"]), mode='r',
+                               offset=spec["offset"], shape=(self.rows,)) if self.rows else np.empty(0, spec["dtype"])
+            setattr(self, name, column)
+
+    def span(self, start_us, end_us, after=None):
+        """回傳 [start_us, end_us) 且排序鍵大於 after=(time_us, transaction_id) 的列索引範圍"""
+        lo = int(np.searchsorted(self.time, start_us, 'left'))
+        hi = int(np.searchsorted(self.time, end_us, 'left'))
+        if after is not None:
+            after_time, after_id = after
+            same_lo = int(np.searchsorted(self.time, after_time, 'left'))
+            same_hi = int(np.searchsorted(self.time, after_time, 'right'))
+            cursor = same_lo + int(np.searchsorted(self.transaction_id[same_lo:same_hi], after_id, 'right'))
+            lo = max(lo, cursor)
+        return lo, max(lo, hi)
+
+    def mask(self, lo, hi, stores=None, payment=None):
+        """商店 / 付款方式篩選的布林陣列；None 代表不篩選。字典中不存在的值直接得到全 False"""
+        selected = np.ones(hi - lo, dtype=bool)
+        if stores is not None:
+            codes = [self._store_codes[s] for s in stores if s in self._store_codes]
+            selected &= np.isin(self.store[lo:hi], codes)
+        if payment is not None:
+            code = self._payment_codes.get(payment)
+            selected &= (self.payment[lo:hi] == code) if code is not None else False
+        return selected
+
+    def decode(self, indexes):
+        """把列索引還原成 (Transaction_ID, Store_Name, Time, Price, Payment)，欄位型別與 MySQL 查詢結果一致"""
+        rows = []
+        for transaction_id, time_us, price, store, payment in zip(
+                self.transaction_id[indexes].tolist(), self.time[indexes].tolist(), self.price[indexes].tolist(),
+                self.store[indexes].tolist(), self.payment[indexes].tolist()):
+            rows.append((
+                transaction_id,
+                self.stores[store],
+                from_micros(time_us),
+                None if price == NULL_PRICE else Decimal(price).scaleb(-2),
+                self.payments[payment],
+            ))
+        return rows
+
+
+class TransactionArchive:
+    """
+    Shopping_Sheet 的冷資料層：ARCHIVE_DIR 下每個月一個欄式檔案 (YYYY-MM.ssa)
+
+    manifest.json 的 horizon 之前的交易一律由封存檔提供，之後（含）的交易由 MySQL 提供。
+    搬移時先寫好檔案、推進 horizon，最後才刪除 MySQL 中的分區，因此任何時刻同一筆交易只會從一邊讀到。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        self._horizon = None
+        self._months = {}
+
+    def _refresh(self):
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return
+        with self._lock:
+            horizon = None
+            if mtime is not None:
+                with open(path, encoding='utf-8') as f:
+                    horizon = date.fromisoformat(json.load(f)["horizon"])
+            # 重新封存的月份會改寫檔案，manifest 變動時一併丟棄已開啟的 memmap
+            self._months = {}
+            self._horizon = horizon
+            self._manifest_mtime = mtime
+
+    @property
+    def horizon(self):
+        """封存與線上資料的分界（不含），尚未封存任何月份時為 None"""
+        self._refresh()
+        return self._horizon
+
+    def set_horizon(self, horizon):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({"horizon": horizon.isoformat()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def month_path(self, month):
+        return os.path.join(self.directory, month_key(month) + FILE_SUFFIX)
+
+    def _month(self, month):
+        key = month_key(month)
+        archive = self._months.get(key)
+        if archive is None:
+            path = self.month_path(month)
+            if not os.path.exists(path):
+                return None
+            with self._lock:
+                archive = self._months.get(key)
+                if archive is None:
+                    archive = self._months[key] = MonthArchive(path)
+        return archive
+
+    def _months_between(self, date_start, date_end):
+        """依序產生與 [date_start, date_end) ∩ [最早封存月, horizon) 重疊的月份封存檔"""
+        horizon = self.horizon
+        if horizon is None:
+            return
+        end = min(date_end, horizon) if date_end else horizon
+        if date_start is None:
+            months = sorted(name[:-len(FILE_SUFFIX)] for name in os.listdir(self.directory)
+                            if name.endswith(FILE_SUFFIX))
+            if not months:
+                return
+            date_start = date.fromisoformat(months[0] + '-01')
+        month = date(date_start.year, date_start.month, 1)
+        while month < end:
+            archive = self._month(month)
+            if archive is not None:
+                yield archive
+            month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+    def covers(self, date_start):
+        """查詢區間是否落到 horizon 之前；date_start 為 None 代表不限起點"""
+        horizon = self.horizon
+        return horizon is not None and (date_start is None or date_start < horizon)
+
+    def scan(self, date_start=None, date_end=None, stores=None, payment=None, after=None, chunk_rows=5000):
+        """
+        依 (Time, Transaction_ID) 順序逐批產生封存中的交易，每批最多 chunk_rows 筆
+
+        date_start / date_end 為 date（半開區間，None 代表不限）；after 為 keyset 分頁的 (time, transaction_id)。
+        """
+        start_us = to_micros(datetime.combine(date_start, datetime.min.time())) if date_start else np.iinfo(np.int64).min
+        end_us = to_micros(datetime.combine(date_end, datetime.min.time())) if date_end else np.iinfo(np.int64).max
+        after_us = (to_micros(after[0]), after[1]) if after else None
+        for archive in self._months_between(date_start, date_end):
+            lo, hi = archive.span(start_us, end_us, after_us)
+            for chunk_lo in range(lo, hi, chunk_rows):
+                chunk_hi = min(hi, chunk_lo + chunk_rows)
+                indexes = np.flatnonzero(archive.mask(chunk_lo, chunk_hi, stores, payment)) + chunk_lo
+                if len(indexes):
+                    yield archive.decode(indexes)
+
+    def hourly(self, date_start, date_end, stores=None):
+        """[date_start, date_end) 內每小時的 (營業額, 交易筆數)，鍵為 'YYYY-MM-DD HH:00:00'，與 SQL 的 SUM / COUNT(*) 一致"""
+        start_us = to_micros(datetime.combine(date_start, datetime.min.time()))
+        end_us = to_micros(datetime.combine(date_end, datetime.min.time()))
+        hour_us = 3600 * 1000000
+        totals = {}
+        for archive in self._months_between(date_start, date_end):
+            lo, hi = archive.span(start_us, end_us)
+            selected = archive.mask(lo, hi, stores)
+            hours = archive.time[lo:hi][selected] // hour_us
+            prices = archive.price[lo:hi][selected]
+            if not len(hours):
+                continue
+            buckets, inverse = np.unique(hours, return_inverse=True)
+            cents = np.bincount(inverse, weights=np.where(prices == NULL_PRICE, 0, prices))
+            counts = np.bincount(inverse)
+            for hour, revenue, count in zip(buckets.tolist(), cents.tolist(), counts.tolist()):
+                key = f"{EPOCH + timedelta(hours=hour):%Y-%m-%d %H:00:00}"
+                total_revenue, total_count = totals.get(key, (0.0, 0))
+                totals[key] = (total_revenue + revenue / 100, total_count + count)
+        return totals
+
+
+def archive_closed_partitions(archive, cutoff, dry_run=False, echo=print):
+    """
+    把上界不晚於 cutoff 的 Shopping_Sheet 月份分區搬進封存檔，回傳搬移的分區名稱
+
+    由最舊的分區依序處理，每個分區：串流讀出並寫成各月份檔案 -> 核對筆數 -> 推進 horizon -> DROP PARTITION。
+    若上次在推進 horizon 之後、刪除分區之前中斷，重新執行時會直接刪除該分區。
+    DROP PARTITION 不會觸發 DELETE 觸發器，Store_Daily_Revenue 中這些月份的彙總會保留下來。
+    """
+    moved = []
+    for partition in list_partitions('Shopping_Sheet'):
+        if partition.upper_bound is None or partition.upper_bound > cutoff:
+            break
+        horizon = archive.horizon
+        if dry_run:
+            echo(f"would archive {partition.name} (< {partition.upper_bound}, ~{partition.rows} rows)")
+            moved.append(partition.name)
+            continue
+
+        if horizon is None or partition.upper_bound > horizon:
+            written = 0
+            writers = {}
+            with db.engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=10000).execute(text(
+                    "SELECT Transaction_ID, Store_Name, Time, Price, Payment "
+                    f"FROM Shopping_Sheet PARTITION ({partition.name}) "
+                    "ORDER BY Time, Transaction_ID"
+                ))
+                for row in result:
+                    month = date(row[2].year, row[2].month, 1)
+                    writer = writers.get(month)
+                    if writer is None:
+                        writer = writers[month] = ArchiveWriter(archive.month_path(month))
+                    writer.append(*row)
+                count = conn.execute(text(
+                    f"SELECT COUNT(*) FROM Shopping_Sheet PARTITION ({partition.name})"
+                )).scalar()
+
+            os.makedirs(archive.directory, exist_ok=True)
+            for month, writer in sorted(writers.items()):
+                written += writer.close()
+            if written != count:
+                raise RuntimeError(f"{partition.name}: wrote {written} rows but partition holds {count}; "
+                                   "horizon not advanced")
+            archive.set_horizon(partition.upper_bound)
+            echo(f"archived {partition.name}: {written} rows in {len(writers)} file(s)")
+
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql(f"ALTER TABLE Shopping_Sheet DROP PARTITION {partition.name}")
+        moved.append(partition.name)
+    return moved
+
+
+_archive_lock = threading.Lock()
+
+
+def get_archive(app):
+    """取得（必要時建立）此 worker 行程的 TransactionArchive"""
+    archive = app.extensions.get('transaction_archive')
+    if archive is None:
+        with _archive_lock:
+            archive = app.extensions.get('transaction_archive')
+            if archive is None:
+                archive = TransactionArchive(app.config['ARCHIVE_DIR'])
+                app.extensions['transaction_archive'] = archive
+    return archive
@@ -50,19 +50,35 @@ CREATE TABLE IF NOT EXISTS Supplier (
 );
 
 -- Purchase Detail Table
+-- 依 Time 按月分區；分區表不支援外鍵，原外鍵的檢查與 CASCADE / SET NULL 改由檔案末端的觸發器處理
 CREATE TABLE IF NOT EXISTS Purchase_Detail (
-    Serial_Number INT PRIMARY KEY AUTO_INCREMENT,
+    Serial_Number INT AUTO_INCREMENT,
     Supplier VARCHAR(100),
-    Time DATETIME,
+    Time DATETIME NOT NULL,
     Store_Name VARCHAR(100),
     Goods VARCHAR(100),
     Amount INT,
-    FOREIGN KEY (Supplier) REFERENCES Supplier(Name)
-        ON DELETE SET NULL ON UPDATE CASCADE,
-    FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
-        ON DELETE CASCADE ON UPDATE CASCADE,
-    FOREIGN KEY (Store_Name, Goods) REFERENCES Goods(Store_Name, Name)
-        ON DELETE SET NULL ON UPDATE CASCADE
+    PRIMARY KEY (Serial_Number, Time),
+    INDEX idx_pd_store_time (Store_Name, Time, Serial_Number),
+    INDEX idx_pd_time (Time, Serial_Number),
+    INDEX idx_pd_supplier (Supplier),
+    INDEX idx_pd_goods (Store_Name, Goods)
+)
+PARTITION BY RANGE COLUMNS (Time) (
+    PARTITION p_old VALUES LESS THAN ('2024-01-01'),
+    PARTITION p202401 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p202402 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p202403 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p202404 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p202405 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p202406 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p202407 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p202408 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p202409 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p202410 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p202411 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p202412 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p_max VALUES LESS THAN (MAXVALUE)
 );
 
 
@@ -74,6 +90,9 @@ CREATE TABLE IF NOT EXISTS Promotional_Campaign (
     End_Time DATETIME,
     Method VARCHAR(50),
     PRIMARY KEY (Store_Name, Name),
+    INDEX idx_pc_method (Method),
+    INDEX idx_pc_period (Start_Time, End_Time),
+    INDEX idx_pc_end (End_Time),
     FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
         ON DELETE CASCADE ON UPDATE CASCADE
 );
@@ -84,8 +103,21 @@ CREATE TABLE IF NOT EXISTS Mall_Employee (
     Contact VARCHAR(20),
     Position VARCHAR(50),
     Shift_Time VARCHAR(50),
+    -- 由 Shift_Time（H:MM-H:MM，亦接受 ~ 與空白）解析出的上下班時間（自 00:00 起算的分鐘數），寫入時由 MySQL 計算；
+    -- Shift_Start_Min > Shift_End_Min 代表跨夜班，無法解析時為 NULL
+    Shift_Start_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', 1), 2) AS UNSIGNED) END) STORED,
+    Shift_End_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', -1), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), 2) AS UNSIGNED) END) STORED,
     Branch_Name VARCHAR(100),
     PRIMARY KEY (Name, Branch_Name),
+    INDEX idx_me_position (Position, Branch_Name),
+    INDEX idx_me_branch (Branch_Name),
+    INDEX idx_me_shift (Branch_Name, Shift_Start_Min, Shift_End_Min),
     FOREIGN KEY (Branch_Name) REFERENCES Shopping_Mall(Branch_Name)
         ON DELETE CASCADE ON UPDATE CASCADE
 );
@@ -96,23 +128,124 @@ CREATE TABLE IF NOT EXISTS Shop_Employee (
     Contact VARCHAR(20),
     Position VARCHAR(50),
     Shift_Time VARCHAR(50),
+    -- 由 Shift_Time（H:MM-H:MM，亦接受 ~ 與空白）解析出的上下班時間（自 00:00 起算的分鐘數），寫入時由 MySQL 計算；
+    -- Shift_Start_Min > Shift_End_Min 代表跨夜班，無法解析時為 NULL
+    Shift_Start_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', 1), 2) AS UNSIGNED) END) STORED,
+    Shift_End_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', -1), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), 2) AS UNSIGNED) END) STORED,
     Store_Name VARCHAR(100),
     PRIMARY KEY (Name, Store_Name),
+    INDEX idx_se_position (Position, Store_Name),
+    INDEX idx_se_store (Store_Name),
+    INDEX idx_se_shift (Store_Name, Shift_Start_Min, Shift_End_Min),
     FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
         ON DELETE CASCADE ON UPDATE CASCADE
 );
 
 -- Shopping Sheet Table
+-- 依 Time 按月分區（未來月份由 flask partitions maintain 預先建立）；外鍵改由觸發器處理
 CREATE TABLE IF NOT EXISTS Shopping_Sheet (
+    Transaction_ID BIGINT AUTO_INCREMENT,
     Store_Name VARCHAR(100),
-    Time DATETIME,
+    Time DATETIME(6) NOT NULL,
     Price DECIMAL(10, 2),
     Payment VARCHAR(50),
-    PRIMARY KEY (Store_Name, Time),
+    PRIMARY KEY (Transaction_ID, Time),
+    INDEX idx_ss_store_time (Store_Name, Time),
+    INDEX idx_ss_time (Time),
+    INDEX idx_ss_payment_time (Payment, Time)
+)
+PARTITION BY RANGE COLUMNS (Time) (
+    PARTITION p_old VALUES LESS THAN ('2024-01-01'),
+    PARTITION p202401 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p202402 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p202403 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p202404 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p202405 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p202406 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p202407 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p202408 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p202409 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p202410 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p202411 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p202412 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p_max VALUES LESS THAN (MAXVALUE)
+);
+
+-- Store Daily Revenue Table（Shopping_Sheet 的每日彙總，由觸發器維護）
+CREATE TABLE IF NOT EXISTS Store_Daily_Revenue (
+    Store_Name VARCHAR(100),
+    Branch_Name VARCHAR(100),
+    Sale_Date DATE,
+    Payment VARCHAR(50) NOT NULL DEFAULT '',
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    Txn_Count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Store_Name, Sale_Date, Payment),
+    INDEX idx_sdr_branch (Branch_Name, Store_Name),
+    INDEX idx_sdr_date (Sale_Date),
+    FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Load Checkpoint Table（flask load 大量載入的續傳進度）
+CREATE TABLE IF NOT EXISTS Load_Checkpoint (
+    Load_Key VARCHAR(255) PRIMARY KEY,
+    Target_Table VARCHAR(64),
+    Last_Record BIGINT NOT NULL,
+    Rows_Loaded BIGINT NOT NULL DEFAULT 0,
+    Updated_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Forecast State Table（flask forecast refresh 各商店 Holt-Winters 模型的狀態，新的一天結束後由此增量更新）
+CREATE TABLE IF NOT EXISTS Forecast_State (
+    Store_Name VARCHAR(100) PRIMARY KEY,
+    Last_Date DATE NOT NULL,
+    Level DOUBLE NOT NULL,
+    Trend DOUBLE NOT NULL,
+    -- 星期一 (0) ~ 星期日 (6) 的季節項
+    Season JSON NOT NULL,
+    Alpha DOUBLE NOT NULL,
+    Beta DOUBLE NOT NULL,
+    Gamma DOUBLE NOT NULL,
+    Fitted_On DATE NOT NULL,
     FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
         ON DELETE CASCADE ON UPDATE CASCADE
 );
 
+-- Revenue Forecast Table（各商店未來每日營業額預測，由 flask forecast refresh 整批寫入）
+CREATE TABLE IF NOT EXISTS Revenue_Forecast (
+    Store_Name VARCHAR(100),
+    Forecast_Date DATE,
+    Holt_Winters DECIMAL(14, 2) NOT NULL,
+    Moving_Average DECIMAL(14, 2) NOT NULL,
+    As_Of DATE NOT NULL,
+    PRIMARY KEY (Store_Name, Forecast_Date),
+    FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Table Version Table（各資料表的版本號，由觸發器在資料變動時遞增，供各 worker 判斷記憶體快取是否過期）
+CREATE TABLE IF NOT EXISTS Table_Version (
+    Table_Name VARCHAR(64) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0,
+    Updated_At TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+);
+
+-- Goods Change Table（Goods 每次寫入由觸發器記下異動的商品鍵，各 worker 的商品搜尋索引依 Change_ID 增量追上；
+-- flask goods prune-changes 清除過期紀錄）
+CREATE TABLE IF NOT EXISTS Goods_Change (
+    Change_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Store_Name VARCHAR(100) NOT NULL,
+    Name VARCHAR(100) NOT NULL,
+    Changed_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_gc_changed_at (Changed_At)
+);
+
 -- 初始化資料庫
 CREATE DATABASE IF NOT EXISTS SOGO;
 USE SOGO;
@@ -2791,3 +2924,298 @@ INSERT INTO Shopping_Sheet (Store_Name, Time, Price, Payment) VALUES
 ('a la sha_台北復興館', '2024-05-29 21:12:55', '1790', 'credit card'),
 ('adidas kids_新竹店', '2024-05-29 21:18:47', '1890', 'credit card');
 
+-- 由 Shopping_Sheet 一次性建立每日營業額彙總
+INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+SELECT SS.Store_Name, S.Branch_Name, DATE(SS.Time), COALESCE(SS.Payment, ''), SUM(COALESCE(SS.Price, 0)), COUNT(*)
+FROM Shopping_Sheet SS
+JOIN Shops S ON SS.Store_Name = S.Store_Name
+GROUP BY SS.Store_Name, S.Branch_Name, DATE(SS.Time), COALESCE(SS.Payment, '');
+
+-- 之後每筆交易寫入時由觸發器增量維護彙總
+DELIMITER $$
+
+CREATE TRIGGER trg_shopping_sheet_ai AFTER INSERT ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+    VALUES (NEW.Store_Name,
+            (SELECT Branch_Name FROM Shops WHERE Store_Name = NEW.Store_Name),
+            DATE(NEW.Time), COALESCE(NEW.Payment, ''), COALESCE(NEW.Price, 0), 1)
+    ON DUPLICATE KEY UPDATE
+        Revenue = Revenue + COALESCE(NEW.Price, 0),
+        Txn_Count = Txn_Count + 1;
+    -- 補傳前幾天的交易時使已結束區間的報表快取失效；當天的交易不影響
+    IF DATE(NEW.Time) < CURDATE() THEN
+        CALL bump_table_version('Shopping_Sheet_Backdated');
+    END IF;
+END$$
+
+CREATE TRIGGER trg_shopping_sheet_ad AFTER DELETE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    UPDATE Store_Daily_Revenue
+    SET Revenue = Revenue - COALESCE(OLD.Price, 0),
+        Txn_Count = Txn_Count - 1
+    WHERE Store_Name = OLD.Store_Name
+      AND Sale_Date = DATE(OLD.Time)
+      AND Payment = COALESCE(OLD.Payment, '');
+    CALL bump_table_version('Shopping_Sheet');
+END$$
+
+-- 商店改名時彙總表已由外鍵 ON UPDATE CASCADE 改名，trg_shops_au 會設定 @rollup_synced 略過重複調整
+CREATE TRIGGER trg_shopping_sheet_au AFTER UPDATE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    IF @rollup_synced IS NULL THEN
+        UPDATE Store_Daily_Revenue
+        SET Revenue = Revenue - COALESCE(OLD.Price, 0),
+            Txn_Count = Txn_Count - 1
+        WHERE Store_Name = OLD.Store_Name
+          AND Sale_Date = DATE(OLD.Time)
+          AND Payment = COALESCE(OLD.Payment, '');
+
+        INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+        VALUES (NEW.Store_Name,
+                (SELECT Branch_Name FROM Shops WHERE Store_Name = NEW.Store_Name),
+                DATE(NEW.Time), COALESCE(NEW.Payment, ''), COALESCE(NEW.Price, 0), 1)
+        ON DUPLICATE KEY UPDATE
+            Revenue = Revenue + COALESCE(NEW.Price, 0),
+            Txn_Count = Txn_Count + 1;
+    END IF;
+    CALL bump_table_version('Shopping_Sheet');
+END$$
+
+-- 商店改隸屬分店時同步彙總表中的 Branch_Name；商店改名時把名稱帶到兩張分區事實表（取代原本的 ON UPDATE CASCADE）
+CREATE TRIGGER trg_shops_au AFTER UPDATE ON Shops
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Branch_Name <=> OLD.Branch_Name) THEN
+        UPDATE Store_Daily_Revenue
+        SET Branch_Name = NEW.Branch_Name
+        WHERE Store_Name = NEW.Store_Name;
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name) THEN
+        SET @rollup_synced = 1;
+        UPDATE Shopping_Sheet SET Store_Name = NEW.Store_Name WHERE Store_Name = OLD.Store_Name;
+        SET @rollup_synced = NULL;
+        UPDATE Purchase_Detail SET Store_Name = NEW.Store_Name WHERE Store_Name = OLD.Store_Name;
+    END IF;
+    CALL bump_table_version('Shops');
+END$$
+
+-- 取代 ON DELETE CASCADE；經由 Shopping_Mall 外鍵連帶刪除的商店不會觸發此觸發器，由 trg_shopping_mall_bd 處理
+CREATE TRIGGER trg_shops_ad AFTER DELETE ON Shops
+FOR EACH ROW
+BEGIN
+    DELETE FROM Shopping_Sheet WHERE Store_Name = OLD.Store_Name;
+    DELETE FROM Purchase_Detail WHERE Store_Name = OLD.Store_Name;
+    CALL bump_table_version('Shops');
+END$$
+
+CREATE TRIGGER trg_shopping_mall_bd BEFORE DELETE ON Shopping_Mall
+FOR EACH ROW
+BEGIN
+    DELETE FROM Shopping_Sheet
+    WHERE Store_Name IN (SELECT Store_Name FROM Shops WHERE Branch_Name = OLD.Branch_Name);
+    DELETE FROM Purchase_Detail
+    WHERE Store_Name IN (SELECT Store_Name FROM Shops WHERE Branch_Name = OLD.Branch_Name);
+    CALL bump_table_version('Shops');
+END$$
+
+-- 分店改名經由外鍵連帶更新 Shops 時不會觸發 trg_shops_au，彙總表的 Branch_Name 在此同步
+CREATE TRIGGER trg_shopping_mall_au AFTER UPDATE ON Shopping_Mall
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Branch_Name <=> OLD.Branch_Name) THEN
+        UPDATE Store_Daily_Revenue
+        SET Branch_Name = NEW.Branch_Name
+        WHERE Branch_Name = OLD.Branch_Name;
+    END IF;
+    CALL bump_table_version('Shops');
+END$$
+
+-- 價格表只在新增 / 刪除商品、改名或改價時失效，單純的庫存異動不遞增 Goods_Price
+CREATE TRIGGER trg_goods_ai AFTER INSERT ON Goods
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Goods_Price');
+    INSERT INTO Goods_Change (Store_Name, Name) VALUES (NEW.Store_Name, NEW.Name);
+END$$
+
+-- 改名時新舊兩個鍵都記入 Goods_Change，搜尋索引據此移除舊鍵、加入新鍵
+CREATE TRIGGER trg_goods_au AFTER UPDATE ON Goods
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Name <=> OLD.Name) THEN
+        UPDATE Purchase_Detail
+        SET Store_Name = NEW.Store_Name, Goods = NEW.Name
+        WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+        INSERT INTO Goods_Change (Store_Name, Name) VALUES (OLD.Store_Name, OLD.Name);
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Name <=> OLD.Name AND NEW.Price <=> OLD.Price) THEN
+        CALL bump_table_version('Goods_Price');
+    END IF;
+    INSERT INTO Goods_Change (Store_Name, Name) VALUES (NEW.Store_Name, NEW.Name);
+END$$
+
+CREATE TRIGGER trg_goods_ad AFTER DELETE ON Goods
+FOR EACH ROW
+BEGIN
+    UPDATE Purchase_Detail SET Goods = NULL
+    WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+    CALL bump_table_version('Goods_Price');
+    INSERT INTO Goods_Change (Store_Name, Name) VALUES (OLD.Store_Name, OLD.Name);
+END$$
+
+CREATE TRIGGER trg_supplier_au AFTER UPDATE ON Supplier
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Name <=> OLD.Name) THEN
+        UPDATE Purchase_Detail SET Supplier = NEW.Name WHERE Supplier = OLD.Name;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_supplier_ad AFTER DELETE ON Supplier
+FOR EACH ROW
+BEGIN
+    UPDATE Purchase_Detail SET Supplier = NULL WHERE Supplier = OLD.Name;
+END$$
+
+-- 取代外鍵的參照檢查；SQLSTATE 23000 讓應用程式與原本一樣收到 IntegrityError
+CREATE TRIGGER trg_shopping_sheet_bi BEFORE INSERT ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    IF NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Shopping_Sheet.Store_Name references an unknown store';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_shopping_sheet_bu BEFORE UPDATE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name) AND NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Shopping_Sheet.Store_Name references an unknown store';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_purchase_detail_bi BEFORE INSERT ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    IF NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Store_Name references an unknown store';
+    END IF;
+    IF NEW.Supplier IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Supplier WHERE Name = NEW.Supplier) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Supplier references an unknown supplier';
+    END IF;
+    IF NEW.Store_Name IS NOT NULL AND NEW.Goods IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Goods WHERE Store_Name = NEW.Store_Name AND Name = NEW.Goods) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Goods references unknown goods';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_purchase_detail_bu BEFORE UPDATE ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name) AND NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Store_Name references an unknown store';
+    END IF;
+    IF NOT (NEW.Supplier <=> OLD.Supplier) AND NEW.Supplier IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Supplier WHERE Name = NEW.Supplier) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Supplier references an unknown supplier';
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Goods <=> OLD.Goods)
+       AND NEW.Store_Name IS NOT NULL AND NEW.Goods IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Goods WHERE Store_Name = NEW.Store_Name AND Name = NEW.Goods) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Goods references unknown goods';
+    END IF;
+END$$
+
+-- 資料表版本號：促銷活動與商店（含經由外鍵連帶變動的情況）任何寫入都會遞增版本號；
+-- Shopping_Sheet 只在 UPDATE / DELETE 時遞增，新增交易由 MAX(Transaction_ID) 判斷；
+-- 新增日期早於今天的交易時另外遞增 Shopping_Sheet_Backdated，供已結束區間的報表快取使用
+CREATE PROCEDURE bump_table_version(IN p_table VARCHAR(64))
+BEGIN
+    INSERT INTO Table_Version (Table_Name, Version) VALUES (p_table, 1)
+    ON DUPLICATE KEY UPDATE Version = Version + 1;
+END$$
+
+CREATE TRIGGER trg_shops_ai AFTER INSERT ON Shops
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shops');
+END$$
+
+CREATE TRIGGER trg_promotional_campaign_ai AFTER INSERT ON Promotional_Campaign
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Promotional_Campaign');
+END$$
+
+CREATE TRIGGER trg_promotional_campaign_au AFTER UPDATE ON Promotional_Campaign
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Promotional_Campaign');
+END$$
+
+CREATE TRIGGER trg_promotional_campaign_ad AFTER DELETE ON Promotional_Campaign
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Promotional_Campaign');
+END$$
+
+-- 員工排班異動時遞增版本號，各 worker 據此重建記憶體中的在職索引
+CREATE TRIGGER trg_mall_employee_ai AFTER INSERT ON Mall_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Mall_Employee');
+END$$
+
+CREATE TRIGGER trg_mall_employee_au AFTER UPDATE ON Mall_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Mall_Employee');
+END$$
+
+CREATE TRIGGER trg_mall_employee_ad AFTER DELETE ON Mall_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Mall_Employee');
+END$$
+
+CREATE TRIGGER trg_shop_employee_ai AFTER INSERT ON Shop_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shop_Employee');
+END$$
+
+CREATE TRIGGER trg_shop_employee_au AFTER UPDATE ON Shop_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shop_Employee');
+END$$
+
+CREATE TRIGGER trg_shop_employee_ad AFTER DELETE ON Shop_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shop_Employee');
+END$$
+
+-- 進貨紀錄的修改與刪除遞增版本號；新增進貨由 MAX(Serial_Number) 判斷
+CREATE TRIGGER trg_purchase_detail_au AFTER UPDATE ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Purchase_Detail');
+END$$
+
+CREATE TRIGGER trg_purchase_detail_ad AFTER DELETE ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Purchase_Detail');
+END$$
+
+DELIMITER ;
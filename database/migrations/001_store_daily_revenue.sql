@@ -0,0 +1,84 @@
+-- 001: 每日營業額彙總表 Store_Daily_Revenue
+-- 套用方式: mysql -u root -p SOGO < database/migrations/001_store_daily_revenue.sql
+USE SOGO;
+-- 回填與建立觸發器之間若仍有交易寫入，套用後再執行一次 `flask rollup rebuild` 校正
+
+-- Store Daily Revenue Table（Shopping_Sheet 的每日彙總，由觸發器維護）
+CREATE TABLE IF NOT EXISTS Store_Daily_Revenue (
+    Store_Name VARCHAR(100),
+    Branch_Name VARCHAR(100),
+    Sale_Date DATE,
+    Payment VARCHAR(50) NOT NULL DEFAULT '',
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    Txn_Count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Store_Name, Sale_Date, Payment),
+    INDEX idx_sdr_branch (Branch_Name, Store_Name),
+    INDEX idx_sdr_date (Sale_Date),
+    FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- 由 Shopping_Sheet 一次性建立每日營業額彙總
+INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+SELECT SS.Store_Name, S.Branch_Name, DATE(SS.Time), COALESCE(SS.Payment, ''), SUM(COALESCE(SS.Price, 0)), COUNT(*)
+FROM Shopping_Sheet SS
+JOIN Shops S ON SS.Store_Name = S.Store_Name
+GROUP BY SS.Store_Name, S.Branch_Name, DATE(SS.Time), COALESCE(SS.Payment, '');
+
+-- 之後每筆交易寫入時由觸發器增量維護彙總
+DELIMITER $$
+
+CREATE TRIGGER trg_shopping_sheet_ai AFTER INSERT ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+    VALUES (NEW.Store_Name,
+            (SELECT Branch_Name FROM Shops WHERE Store_Name = NEW.Store_Name),
+            DATE(NEW.Time), COALESCE(NEW.Payment, ''), COALESCE(NEW.Price, 0), 1)
+    ON DUPLICATE KEY UPDATE
+        Revenue = Revenue + COALESCE(NEW.Price, 0),
+        Txn_Count = Txn_Count + 1;
+END$$
+
+CREATE TRIGGER trg_shopping_sheet_ad AFTER DELETE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    UPDATE Store_Daily_Revenue
+    SET Revenue = Revenue - COALESCE(OLD.Price, 0),
+        Txn_Count = Txn_Count - 1
+    WHERE Store_Name = OLD.Store_Name
+      AND Sale_Date = DATE(OLD.Time)
+      AND Payment = COALESCE(OLD.Payment, '');
+END$$
+
+CREATE TRIGGER trg_shopping_sheet_au AFTER UPDATE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    UPDATE Store_Daily_Revenue
+    SET Revenue = Revenue - COALESCE(OLD.Price, 0),
+        Txn_Count = Txn_Count - 1
+    WHERE Store_Name = OLD.Store_Name
+      AND Sale_Date = DATE(OLD.Time)
+      AND Payment = COALESCE(OLD.Payment, '');
+
+    INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+    VALUES (NEW.Store_Name,
+            (SELECT Branch_Name FROM Shops WHERE Store_Name = NEW.Store_Name),
+            DATE(NEW.Time), COALESCE(NEW.Payment, ''), COALESCE(NEW.Price, 0), 1)
+    ON DUPLICATE KEY UPDATE
+        Revenue = Revenue + COALESCE(NEW.Price, 0),
+        Txn_Count = Txn_Count + 1;
+END$$
+
+-- 商店改隸屬分店時同步彙總表中的 Branch_Name
+CREATE TRIGGER trg_shops_branch_au AFTER UPDATE ON Shops
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Branch_Name <=> OLD.Branch_Name) THEN
+        UPDATE Store_Daily_Revenue
+        SET Branch_Name = NEW.Branch_Name
+        WHERE Store_Name = NEW.Store_Name;
+    END IF;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,11 @@
+-- 002: 交易與進貨明細 keyset 分頁所需的索引
+-- 索引欄位順序與各查詢的 WHERE 等值條件 + ORDER BY 排序鍵一致，翻到任何一頁都只需一次索引範圍掃描
+USE SOGO;
+
+ALTER TABLE Shopping_Sheet
+    ADD INDEX idx_ss_time (Time, Store_Name),
+    ADD INDEX idx_ss_payment_time (Payment, Time, Store_Name);
+
+ALTER TABLE Purchase_Detail
+    ADD INDEX idx_pd_store_time (Store_Name, Time, Serial_Number),
+    ADD INDEX idx_pd_time (Time, Serial_Number);
@@ -0,0 +1,16 @@
+-- 003: Shopping_Sheet 改用自動遞增的 Transaction_ID 為主鍵，Time 改為微秒精度 DATETIME(6)
+-- 原主鍵 (Store_Name, Time) 讓同一櫃台同一秒內的兩筆交易互相衝突，改為一般索引後不再限制唯一。
+-- 既有資料會依原主鍵 (Store_Name, Time) 的順序配發 Transaction_ID，Time 的小數部分補 0。
+-- ALTER 會複製整張表並阻擋寫入，請於離峰時段停止 POS 上傳後執行；觸發器與外鍵維持不變。
+USE SOGO;
+
+ALTER TABLE Shopping_Sheet
+    DROP PRIMARY KEY,
+    ADD COLUMN Transaction_ID BIGINT NOT NULL AUTO_INCREMENT FIRST,
+    ADD PRIMARY KEY (Transaction_ID),
+    MODIFY COLUMN Time DATETIME(6),
+    ADD INDEX idx_ss_store_time (Store_Name, Time),
+    DROP INDEX idx_ss_time,
+    ADD INDEX idx_ss_time (Time),
+    DROP INDEX idx_ss_payment_time,
+    ADD INDEX idx_ss_payment_time (Payment, Time);
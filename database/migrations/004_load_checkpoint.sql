@@ -0,0 +1,12 @@
+-- 004: 大量載入指令 (flask load) 的續傳進度表
+-- 每個載入批次與其進度在同一個交易中提交，當機後可由最後提交的位置繼續
+USE SOGO;
+
+-- Load Checkpoint Table（flask load 大量載入的續傳進度）
+CREATE TABLE IF NOT EXISTS Load_Checkpoint (
+    Load_Key VARCHAR(255) PRIMARY KEY,
+    Target_Table VARCHAR(64),
+    Last_Record BIGINT NOT NULL,
+    Rows_Loaded BIGINT NOT NULL DEFAULT 0,
+    Updated_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
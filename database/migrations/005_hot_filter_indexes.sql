@@ -0,0 +1,19 @@
+-- 005: API 熱門篩選條件的索引
+-- Shopping_Sheet.Time / Payment 與 Purchase_Detail.Time 已於 002、003 建立；此處補上其餘篩選欄位。
+-- 以 flask explain gate 驗證所有 API 查詢皆未對大表做全表掃描。
+USE SOGO;
+
+-- /promotions/method 與 /promotions/date
+ALTER TABLE Promotional_Campaign
+    ADD INDEX idx_pc_method (Method),
+    ADD INDEX idx_pc_period (Start_Time, End_Time),
+    ADD INDEX idx_pc_end (End_Time);
+
+-- /employees/position；外鍵原本只靠主鍵 (Name, ...) 的第二欄，依分店 / 店鋪查詢需獨立索引
+ALTER TABLE Mall_Employee
+    ADD INDEX idx_me_position (Position, Branch_Name),
+    ADD INDEX idx_me_branch (Branch_Name);
+
+ALTER TABLE Shop_Employee
+    ADD INDEX idx_se_position (Position, Store_Name),
+    ADD INDEX idx_se_store (Store_Name);
@@ -0,0 +1,237 @@
+-- 006: Shopping_Sheet 與 Purchase_Detail 依 Time 按月 RANGE 分區
+-- 分區鍵必須包含在主鍵中，因此主鍵改為 (Transaction_ID, Time) / (Serial_Number, Time)，Time 改為 NOT NULL
+-- （套用前請先確認兩張表沒有 Time 為 NULL 的資料）。InnoDB 分區表不支援外鍵，先移除外鍵，
+-- 參照檢查與 CASCADE / SET NULL 改由觸發器處理。
+-- 2024 年以後的月份由 p_max 承接，套用後執行 `flask partitions maintain` 切出各月份分區並預先建立未來分區。
+-- ALTER 會複製整張表並阻擋寫入，請於離峰時段停止 POS 上傳後執行。
+USE SOGO;
+
+-- 外鍵名稱由 MySQL 自動產生，從 information_schema 取得後動態移除
+SELECT CONCAT('ALTER TABLE Shopping_Sheet ',
+              GROUP_CONCAT(CONCAT('DROP FOREIGN KEY `', CONSTRAINT_NAME, '`') SEPARATOR ', '))
+INTO @drop_fk
+FROM information_schema.REFERENTIAL_CONSTRAINTS
+WHERE CONSTRAINT_SCHEMA = 'SOGO' AND TABLE_NAME = 'Shopping_Sheet';
+SET @drop_fk = COALESCE(@drop_fk, 'DO 0');
+PREPARE stmt FROM @drop_fk;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT CONCAT('ALTER TABLE Purchase_Detail ',
+              GROUP_CONCAT(CONCAT('DROP FOREIGN KEY `', CONSTRAINT_NAME, '`') SEPARATOR ', '))
+INTO @drop_fk
+FROM information_schema.REFERENTIAL_CONSTRAINTS
+WHERE CONSTRAINT_SCHEMA = 'SOGO' AND TABLE_NAME = 'Purchase_Detail';
+SET @drop_fk = COALESCE(@drop_fk, 'DO 0');
+PREPARE stmt FROM @drop_fk;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- 外鍵自動建立的索引會保留下來；以 SHOW CREATE TABLE Purchase_Detail 確認後，
+-- 可刪除與 idx_pd_supplier / idx_pd_goods 重複的舊索引
+ALTER TABLE Shopping_Sheet
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Transaction_ID, Time),
+    MODIFY COLUMN Time DATETIME(6) NOT NULL;
+
+ALTER TABLE Purchase_Detail
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Serial_Number, Time),
+    MODIFY COLUMN Time DATETIME NOT NULL,
+    ADD INDEX idx_pd_supplier (Supplier),
+    ADD INDEX idx_pd_goods (Store_Name, Goods);
+
+ALTER TABLE Shopping_Sheet
+PARTITION BY RANGE COLUMNS (Time) (
+    PARTITION p_old VALUES LESS THAN ('2024-01-01'),
+    PARTITION p202401 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p202402 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p202403 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p202404 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p202405 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p202406 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p202407 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p202408 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p202409 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p202410 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p202411 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p202412 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p_max VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE Purchase_Detail
+PARTITION BY RANGE COLUMNS (Time) (
+    PARTITION p_old VALUES LESS THAN ('2024-01-01'),
+    PARTITION p202401 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p202402 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p202403 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p202404 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p202405 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p202406 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p202407 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p202408 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p202409 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p202410 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p202411 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p202412 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p_max VALUES LESS THAN (MAXVALUE)
+);
+
+DROP TRIGGER IF EXISTS trg_shopping_sheet_au;
+DROP TRIGGER IF EXISTS trg_shops_branch_au;
+
+DELIMITER $$
+
+-- 商店改名時彙總表已由外鍵 ON UPDATE CASCADE 改名，trg_shops_au 會設定 @rollup_synced 略過重複調整
+CREATE TRIGGER trg_shopping_sheet_au AFTER UPDATE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    IF @rollup_synced IS NULL THEN
+        UPDATE Store_Daily_Revenue
+        SET Revenue = Revenue - COALESCE(OLD.Price, 0),
+            Txn_Count = Txn_Count - 1
+        WHERE Store_Name = OLD.Store_Name
+          AND Sale_Date = DATE(OLD.Time)
+          AND Payment = COALESCE(OLD.Payment, '');
+
+        INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+        VALUES (NEW.Store_Name,
+                (SELECT Branch_Name FROM Shops WHERE Store_Name = NEW.Store_Name),
+                DATE(NEW.Time), COALESCE(NEW.Payment, ''), COALESCE(NEW.Price, 0), 1)
+        ON DUPLICATE KEY UPDATE
+            Revenue = Revenue + COALESCE(NEW.Price, 0),
+            Txn_Count = Txn_Count + 1;
+    END IF;
+END$$
+
+-- 商店改隸屬分店時同步彙總表中的 Branch_Name；商店改名時把名稱帶到兩張分區事實表（取代原本的 ON UPDATE CASCADE）
+CREATE TRIGGER trg_shops_au AFTER UPDATE ON Shops
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Branch_Name <=> OLD.Branch_Name) THEN
+        UPDATE Store_Daily_Revenue
+        SET Branch_Name = NEW.Branch_Name
+        WHERE Store_Name = NEW.Store_Name;
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name) THEN
+        SET @rollup_synced = 1;
+        UPDATE Shopping_Sheet SET Store_Name = NEW.Store_Name WHERE Store_Name = OLD.Store_Name;
+        SET @rollup_synced = NULL;
+        UPDATE Purchase_Detail SET Store_Name = NEW.Store_Name WHERE Store_Name = OLD.Store_Name;
+    END IF;
+END$$
+
+-- 取代 ON DELETE CASCADE；經由 Shopping_Mall 外鍵連帶刪除的商店不會觸發此觸發器，由 trg_shopping_mall_bd 處理
+CREATE TRIGGER trg_shops_ad AFTER DELETE ON Shops
+FOR EACH ROW
+BEGIN
+    DELETE FROM Shopping_Sheet WHERE Store_Name = OLD.Store_Name;
+    DELETE FROM Purchase_Detail WHERE Store_Name = OLD.Store_Name;
+END$$
+
+CREATE TRIGGER trg_shopping_mall_bd BEFORE DELETE ON Shopping_Mall
+FOR EACH ROW
+BEGIN
+    DELETE FROM Shopping_Sheet
+    WHERE Store_Name IN (SELECT Store_Name FROM Shops WHERE Branch_Name = OLD.Branch_Name);
+    DELETE FROM Purchase_Detail
+    WHERE Store_Name IN (SELECT Store_Name FROM Shops WHERE Branch_Name = OLD.Branch_Name);
+END$$
+
+-- 分店改名經由外鍵連帶更新 Shops 時不會觸發 trg_shops_au，彙總表的 Branch_Name 在此同步
+CREATE TRIGGER trg_shopping_mall_au AFTER UPDATE ON Shopping_Mall
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Branch_Name <=> OLD.Branch_Name) THEN
+        UPDATE Store_Daily_Revenue
+        SET Branch_Name = NEW.Branch_Name
+        WHERE Branch_Name = OLD.Branch_Name;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_goods_au AFTER UPDATE ON Goods
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Name <=> OLD.Name) THEN
+        UPDATE Purchase_Detail
+        SET Store_Name = NEW.Store_Name, Goods = NEW.Name
+        WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_goods_ad AFTER DELETE ON Goods
+FOR EACH ROW
+BEGIN
+    UPDATE Purchase_Detail SET Goods = NULL
+    WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+END$$
+
+CREATE TRIGGER trg_supplier_au AFTER UPDATE ON Supplier
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Name <=> OLD.Name) THEN
+        UPDATE Purchase_Detail SET Supplier = NEW.Name WHERE Supplier = OLD.Name;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_supplier_ad AFTER DELETE ON Supplier
+FOR EACH ROW
+BEGIN
+    UPDATE Purchase_Detail SET Supplier = NULL WHERE Supplier = OLD.Name;
+END$$
+
+-- 取代外鍵的參照檢查；SQLSTATE 23000 讓應用程式與原本一樣收到 IntegrityError
+CREATE TRIGGER trg_shopping_sheet_bi BEFORE INSERT ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    IF NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Shopping_Sheet.Store_Name references an unknown store';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_shopping_sheet_bu BEFORE UPDATE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name) AND NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Shopping_Sheet.Store_Name references an unknown store';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_purchase_detail_bi BEFORE INSERT ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    IF NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Store_Name references an unknown store';
+    END IF;
+    IF NEW.Supplier IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Supplier WHERE Name = NEW.Supplier) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Supplier references an unknown supplier';
+    END IF;
+    IF NEW.Store_Name IS NOT NULL AND NEW.Goods IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Goods WHERE Store_Name = NEW.Store_Name AND Name = NEW.Goods) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Goods references unknown goods';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_purchase_detail_bu BEFORE UPDATE ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name) AND NEW.Store_Name IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Shops WHERE Store_Name = NEW.Store_Name) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Store_Name references an unknown store';
+    END IF;
+    IF NOT (NEW.Supplier <=> OLD.Supplier) AND NEW.Supplier IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Supplier WHERE Name = NEW.Supplier) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Supplier references an unknown supplier';
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Goods <=> OLD.Goods)
+       AND NEW.Store_Name IS NOT NULL AND NEW.Goods IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Goods WHERE Store_Name = NEW.Store_Name AND Name = NEW.Goods) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'Purchase_Detail.Goods references unknown goods';
+    END IF;
+END$$
+
+DELIMITER ;
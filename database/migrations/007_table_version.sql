@@ -0,0 +1,100 @@
+-- 007: 資料表版本號 Table_Version
+-- 促銷活動與商店的任何寫入（包含由外鍵連帶更新 / 刪除的情況）都會遞增對應的版本號，
+-- 各 worker 以此判斷記憶體中的促銷活動區間索引是否需要重建。
+USE SOGO;
+
+-- Table Version Table（各資料表的版本號，由觸發器在資料變動時遞增，供各 worker 判斷記憶體快取是否過期）
+CREATE TABLE IF NOT EXISTS Table_Version (
+    Table_Name VARCHAR(64) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0,
+    Updated_At TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+);
+
+DROP TRIGGER IF EXISTS trg_shops_au;
+DROP TRIGGER IF EXISTS trg_shops_ad;
+DROP TRIGGER IF EXISTS trg_shopping_mall_bd;
+DROP TRIGGER IF EXISTS trg_shopping_mall_au;
+
+DELIMITER $$
+
+-- 資料表版本號：促銷活動與商店（含經由外鍵連帶變動的情況）任何寫入都會遞增版本號
+CREATE PROCEDURE bump_table_version(IN p_table VARCHAR(64))
+BEGIN
+    INSERT INTO Table_Version (Table_Name, Version) VALUES (p_table, 1)
+    ON DUPLICATE KEY UPDATE Version = Version + 1;
+END$$
+
+CREATE TRIGGER trg_shops_ai AFTER INSERT ON Shops
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shops');
+END$$
+
+CREATE TRIGGER trg_promotional_campaign_ai AFTER INSERT ON Promotional_Campaign
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Promotional_Campaign');
+END$$
+
+CREATE TRIGGER trg_promotional_campaign_au AFTER UPDATE ON Promotional_Campaign
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Promotional_Campaign');
+END$$
+
+CREATE TRIGGER trg_promotional_campaign_ad AFTER DELETE ON Promotional_Campaign
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Promotional_Campaign');
+END$$
+
+-- 商店改隸屬分店時同步彙總表中的 Branch_Name；商店改名時把名稱帶到兩張分區事實表（取代原本的 ON UPDATE CASCADE）
+CREATE TRIGGER trg_shops_au AFTER UPDATE ON Shops
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Branch_Name <=> OLD.Branch_Name) THEN
+        UPDATE Store_Daily_Revenue
+        SET Branch_Name = NEW.Branch_Name
+        WHERE Store_Name = NEW.Store_Name;
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name) THEN
+        SET @rollup_synced = 1;
+        UPDATE Shopping_Sheet SET Store_Name = NEW.Store_Name WHERE Store_Name = OLD.Store_Name;
+        SET @rollup_synced = NULL;
+        UPDATE Purchase_Detail SET Store_Name = NEW.Store_Name WHERE Store_Name = OLD.Store_Name;
+    END IF;
+    CALL bump_table_version('Shops');
+END$$
+
+-- 取代 ON DELETE CASCADE；經由 Shopping_Mall 外鍵連帶刪除的商店不會觸發此觸發器，由 trg_shopping_mall_bd 處理
+CREATE TRIGGER trg_shops_ad AFTER DELETE ON Shops
+FOR EACH ROW
+BEGIN
+    DELETE FROM Shopping_Sheet WHERE Store_Name = OLD.Store_Name;
+    DELETE FROM Purchase_Detail WHERE Store_Name = OLD.Store_Name;
+    CALL bump_table_version('Shops');
+END$$
+
+CREATE TRIGGER trg_shopping_mall_bd BEFORE DELETE ON Shopping_Mall
+FOR EACH ROW
+BEGIN
+    DELETE FROM Shopping_Sheet
+    WHERE Store_Name IN (SELECT Store_Name FROM Shops WHERE Branch_Name = OLD.Branch_Name);
+    DELETE FROM Purchase_Detail
+    WHERE Store_Name IN (SELECT Store_Name FROM Shops WHERE Branch_Name = OLD.Branch_Name);
+    CALL bump_table_version('Shops');
+END$$
+
+-- 分店改名經由外鍵連帶更新 Shops 時不會觸發 trg_shops_au，彙總表的 Branch_Name 在此同步
+CREATE TRIGGER trg_shopping_mall_au AFTER UPDATE ON Shopping_Mall
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Branch_Name <=> OLD.Branch_Name) THEN
+        UPDATE Store_Daily_Revenue
+        SET Branch_Name = NEW.Branch_Name
+        WHERE Branch_Name = OLD.Branch_Name;
+    END IF;
+    CALL bump_table_version('Shops');
+END$$
+
+DELIMITER ;
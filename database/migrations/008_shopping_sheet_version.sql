@@ -0,0 +1,45 @@
+-- 008: Shopping_Sheet 的 UPDATE / DELETE 遞增 Table_Version 中的版本號
+-- 新增交易由 MAX(Transaction_ID) 判斷，兩者合起來作為促銷成效報表等快取的失效條件。
+USE SOGO;
+
+DROP TRIGGER IF EXISTS trg_shopping_sheet_ad;
+DROP TRIGGER IF EXISTS trg_shopping_sheet_au;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_shopping_sheet_ad AFTER DELETE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    UPDATE Store_Daily_Revenue
+    SET Revenue = Revenue - COALESCE(OLD.Price, 0),
+        Txn_Count = Txn_Count - 1
+    WHERE Store_Name = OLD.Store_Name
+      AND Sale_Date = DATE(OLD.Time)
+      AND Payment = COALESCE(OLD.Payment, '');
+    CALL bump_table_version('Shopping_Sheet');
+END$$
+
+-- 商店改名時彙總表已由外鍵 ON UPDATE CASCADE 改名，trg_shops_au 會設定 @rollup_synced 略過重複調整
+CREATE TRIGGER trg_shopping_sheet_au AFTER UPDATE ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    IF @rollup_synced IS NULL THEN
+        UPDATE Store_Daily_Revenue
+        SET Revenue = Revenue - COALESCE(OLD.Price, 0),
+            Txn_Count = Txn_Count - 1
+        WHERE Store_Name = OLD.Store_Name
+          AND Sale_Date = DATE(OLD.Time)
+          AND Payment = COALESCE(OLD.Payment, '');
+
+        INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+        VALUES (NEW.Store_Name,
+                (SELECT Branch_Name FROM Shops WHERE Store_Name = NEW.Store_Name),
+                DATE(NEW.Time), COALESCE(NEW.Payment, ''), COALESCE(NEW.Price, 0), 1)
+        ON DUPLICATE KEY UPDATE
+            Revenue = Revenue + COALESCE(NEW.Price, 0),
+            Txn_Count = Txn_Count + 1;
+    END IF;
+    CALL bump_table_version('Shopping_Sheet');
+END$$
+
+DELIMITER ;
@@ -0,0 +1,26 @@
+-- 009: Mall_Employee / Shop_Employee 新增由 Shift_Time 解析出的上下班分鐘數（STORED 生成欄位）
+-- 新增 / 修改員工時由 MySQL 自動計算，ALTER 時也會為既有資料回填；Shift_Start_Min > Shift_End_Min 代表跨夜班。
+-- 搭配 (Store_Name / Branch_Name, Shift_Start_Min, Shift_End_Min) 索引，在職查詢以範圍條件取得，不再讀出整店員工。
+USE SOGO;
+
+ALTER TABLE Mall_Employee
+    ADD COLUMN Shift_Start_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', 1), 2) AS UNSIGNED) END) STORED AFTER Shift_Time,
+    ADD COLUMN Shift_End_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', -1), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), 2) AS UNSIGNED) END) STORED AFTER Shift_Start_Min,
+    ADD INDEX idx_me_shift (Branch_Name, Shift_Start_Min, Shift_End_Min);
+
+ALTER TABLE Shop_Employee
+    ADD COLUMN Shift_Start_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', 1), 2) AS UNSIGNED) END) STORED AFTER Shift_Time,
+    ADD COLUMN Shift_End_Min SMALLINT UNSIGNED AS (
+        CASE WHEN REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-') REGEXP '^[0-9]{1,2}:[0-9]{2}-[0-9]{1,2}:[0-9]{2}$'
+            THEN CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), '-', -1), ':', 1) AS UNSIGNED) * 60
+               + CAST(RIGHT(REPLACE(REPLACE(Shift_Time, ' ', ''), '~', '-'), 2) AS UNSIGNED) END) STORED AFTER Shift_Start_Min,
+    ADD INDEX idx_se_shift (Store_Name, Shift_Start_Min, Shift_End_Min);
@@ -0,0 +1,50 @@
+-- 010: Mall_Employee / Shop_Employee 的任何寫入都會遞增 Table_Version 中的版本號
+-- 各 worker 以此判斷記憶體中的分店在職索引是否需要重建；分店或商店刪除 / 改名連帶的變動由 Shops 的版本號涵蓋。
+USE SOGO;
+
+DROP TRIGGER IF EXISTS trg_mall_employee_ai;
+DROP TRIGGER IF EXISTS trg_mall_employee_au;
+DROP TRIGGER IF EXISTS trg_mall_employee_ad;
+DROP TRIGGER IF EXISTS trg_shop_employee_ai;
+DROP TRIGGER IF EXISTS trg_shop_employee_au;
+DROP TRIGGER IF EXISTS trg_shop_employee_ad;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_mall_employee_ai AFTER INSERT ON Mall_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Mall_Employee');
+END$$
+
+CREATE TRIGGER trg_mall_employee_au AFTER UPDATE ON Mall_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Mall_Employee');
+END$$
+
+CREATE TRIGGER trg_mall_employee_ad AFTER DELETE ON Mall_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Mall_Employee');
+END$$
+
+CREATE TRIGGER trg_shop_employee_ai AFTER INSERT ON Shop_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shop_Employee');
+END$$
+
+CREATE TRIGGER trg_shop_employee_au AFTER UPDATE ON Shop_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shop_Employee');
+END$$
+
+CREATE TRIGGER trg_shop_employee_ad AFTER DELETE ON Shop_Employee
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Shop_Employee');
+END$$
+
+DELIMITER ;
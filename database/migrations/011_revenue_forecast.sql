@@ -0,0 +1,31 @@
+-- 011: 營業額預測 (flask forecast refresh) 的模型狀態與預測結果
+-- Forecast_State 保存各商店 Holt-Winters 模型的狀態，每天只需以新結束的日子更新；Revenue_Forecast 供 /revenue/forecast 直接讀取。
+USE SOGO;
+
+-- Forecast State Table（flask forecast refresh 各商店 Holt-Winters 模型的狀態，新的一天結束後由此增量更新）
+CREATE TABLE IF NOT EXISTS Forecast_State (
+    Store_Name VARCHAR(100) PRIMARY KEY,
+    Last_Date DATE NOT NULL,
+    Level DOUBLE NOT NULL,
+    Trend DOUBLE NOT NULL,
+    -- 星期一 (0) ~ 星期日 (6) 的季節項
+    Season JSON NOT NULL,
+    Alpha DOUBLE NOT NULL,
+    Beta DOUBLE NOT NULL,
+    Gamma DOUBLE NOT NULL,
+    Fitted_On DATE NOT NULL,
+    FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Revenue Forecast Table（各商店未來每日營業額預測，由 flask forecast refresh 整批寫入）
+CREATE TABLE IF NOT EXISTS Revenue_Forecast (
+    Store_Name VARCHAR(100),
+    Forecast_Date DATE,
+    Holt_Winters DECIMAL(14, 2) NOT NULL,
+    Moving_Average DECIMAL(14, 2) NOT NULL,
+    As_Of DATE NOT NULL,
+    PRIMARY KEY (Store_Name, Forecast_Date),
+    FOREIGN KEY (Store_Name) REFERENCES Shops(Store_Name)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
@@ -0,0 +1,38 @@
+-- 012: Goods 新增 / 刪除、改名或改價時遞增 Table_Version 中 Goods_Price 的版本號
+-- 各 worker 以此判斷記憶體中的商品價格表是否需要重新載入；單純的庫存異動不會使價格表失效。
+USE SOGO;
+
+DROP TRIGGER IF EXISTS trg_goods_ai;
+DROP TRIGGER IF EXISTS trg_goods_au;
+DROP TRIGGER IF EXISTS trg_goods_ad;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_goods_ai AFTER INSERT ON Goods
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Goods_Price');
+END$$
+
+CREATE TRIGGER trg_goods_au AFTER UPDATE ON Goods
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Name <=> OLD.Name) THEN
+        UPDATE Purchase_Detail
+        SET Store_Name = NEW.Store_Name, Goods = NEW.Name
+        WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Name <=> OLD.Name AND NEW.Price <=> OLD.Price) THEN
+        CALL bump_table_version('Goods_Price');
+    END IF;
+END$$
+
+CREATE TRIGGER trg_goods_ad AFTER DELETE ON Goods
+FOR EACH ROW
+BEGIN
+    UPDATE Purchase_Detail SET Goods = NULL
+    WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+    CALL bump_table_version('Goods_Price');
+END$$
+
+DELIMITER ;
@@ -0,0 +1,51 @@
+-- 013: Goods 異動紀錄表；Goods 每次寫入由觸發器記下異動的 (Store_Name, Name)，
+-- 各 worker 的商品搜尋索引依 Change_ID 增量追上。過期紀錄由 flask goods prune-changes 清除。
+USE SOGO;
+
+CREATE TABLE IF NOT EXISTS Goods_Change (
+    Change_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Store_Name VARCHAR(100) NOT NULL,
+    Name VARCHAR(100) NOT NULL,
+    Changed_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_gc_changed_at (Changed_At)
+);
+
+DROP TRIGGER IF EXISTS trg_goods_ai;
+DROP TRIGGER IF EXISTS trg_goods_au;
+DROP TRIGGER IF EXISTS trg_goods_ad;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_goods_ai AFTER INSERT ON Goods
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Goods_Price');
+    INSERT INTO Goods_Change (Store_Name, Name) VALUES (NEW.Store_Name, NEW.Name);
+END$$
+
+-- 改名時新舊兩個鍵都記入 Goods_Change，搜尋索引據此移除舊鍵、加入新鍵
+CREATE TRIGGER trg_goods_au AFTER UPDATE ON Goods
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Name <=> OLD.Name) THEN
+        UPDATE Purchase_Detail
+        SET Store_Name = NEW.Store_Name, Goods = NEW.Name
+        WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+        INSERT INTO Goods_Change (Store_Name, Name) VALUES (OLD.Store_Name, OLD.Name);
+    END IF;
+    IF NOT (NEW.Store_Name <=> OLD.Store_Name AND NEW.Name <=> OLD.Name AND NEW.Price <=> OLD.Price) THEN
+        CALL bump_table_version('Goods_Price');
+    END IF;
+    INSERT INTO Goods_Change (Store_Name, Name) VALUES (NEW.Store_Name, NEW.Name);
+END$$
+
+CREATE TRIGGER trg_goods_ad AFTER DELETE ON Goods
+FOR EACH ROW
+BEGIN
+    UPDATE Purchase_Detail SET Goods = NULL
+    WHERE Store_Name = OLD.Store_Name AND Goods = OLD.Name;
+    CALL bump_table_version('Goods_Price');
+    INSERT INTO Goods_Change (Store_Name, Name) VALUES (OLD.Store_Name, OLD.Name);
+END$$
+
+DELIMITER ;
@@ -0,0 +1,22 @@
+-- 014: Purchase_Detail 的 UPDATE / DELETE 遞增 Table_Version 中的版本號
+-- 新增進貨由 MAX(Serial_Number) 判斷（flask load purchases 完成時另外遞增版本號），兩者合起來作為補貨報表等快取的失效條件。
+USE SOGO;
+
+DROP TRIGGER IF EXISTS trg_purchase_detail_au;
+DROP TRIGGER IF EXISTS trg_purchase_detail_ad;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_purchase_detail_au AFTER UPDATE ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Purchase_Detail');
+END$$
+
+CREATE TRIGGER trg_purchase_detail_ad AFTER DELETE ON Purchase_Detail
+FOR EACH ROW
+BEGIN
+    CALL bump_table_version('Purchase_Detail');
+END$$
+
+DELIMITER ;
@@ -0,0 +1,24 @@
+-- 015: 寫入日期早於今天的交易（補傳前幾天的交易）時遞增 Table_Version 中 Shopping_Sheet_Backdated 的版本號
+-- 已結束區間的報表快取只以此（加上修改 / 刪除時的 Shopping_Sheet 版本號）判斷失效，當天的一般交易不會使其失效。
+USE SOGO;
+
+DROP TRIGGER IF EXISTS trg_shopping_sheet_ai;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_shopping_sheet_ai AFTER INSERT ON Shopping_Sheet
+FOR EACH ROW
+BEGIN
+    INSERT INTO Store_Daily_Revenue (Store_Name, Branch_Name, Sale_Date, Payment, Revenue, Txn_Count)
+    VALUES (NEW.Store_Name,
+            (SELECT Branch_Name FROM Shops WHERE Store_Name = NEW.Store_Name),
+            DATE(NEW.Time), COALESCE(NEW.Payment, ''), COALESCE(NEW.Price, 0), 1)
+    ON DUPLICATE KEY UPDATE
+        Revenue = Revenue + COALESCE(NEW.Price, 0),
+        Txn_Count = Txn_Count + 1;
+    IF DATE(NEW.Time) < CURDATE() THEN
+        CALL bump_table_version('Shopping_Sheet_Backdated');
+    END IF;
+END$$
+
+DELIMITER ;